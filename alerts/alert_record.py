@@ -0,0 +1,110 @@
+"""
+Alert Record Module
+
+Structured alerts produced by generate_alerts(). An AlertRecord carries the
+alert's fields from the alert engine to the frame overlay, the database
+writer, the email notifier and the APIs, so none of them has to recover the
+type or track ID from the message text.
+
+Records use __slots__ (no per-instance dict): a crowded frame can raise
+many of them.
+
+Usage:
+    alert = AlertRecord(RESTRICTED_ZONE, "CAM_01", track_id=7, zone="No Entry")
+    alert.message    # "Restricted Zone Violation (No Entry) - Track 7"
+    alert.to_dict()  # JSON-ready (analytics, events)
+"""
+from utils.latency import wall_clock
+
+# Alert types (stored as Alert.alert_type)
+STATIONARY = "STATIONARY"
+RESTRICTED_ZONE = "RESTRICTED_ZONE"
+UNKNOWN_PERSON = "UNKNOWN_PERSON"
+
+# Email subject per alert type
+ALERT_SUBJECTS = {
+    STATIONARY: "Stationary Person Alert",
+    RESTRICTED_ZONE: "Restricted Zone Alert",
+    UNKNOWN_PERSON: "Unknown Person Alert"
+}
+
+
+class AlertRecord:
+    """
+    One alert raised for a tracked person.
+
+    Args:
+        alert_type: STATIONARY, RESTRICTED_ZONE or UNKNOWN_PERSON
+        camera_id: Camera identifier
+        track_id: DeepSORT track ID (optional)
+        zone: Restricted zone name (RESTRICTED_ZONE alerts)
+        person_id: Matched face ID (see face_matcher.match_face), None if
+            the person is unknown or their face was not seen
+        confidence: Detection confidence of the person
+        captured_at: time.monotonic() capture stamp of the frame (see
+            utils.latency.read_stamped)
+        bbox: Person bounding box [x1, y1, x2, y2]
+    """
+
+    __slots__ = ("alert_type", "camera_id", "track_id", "zone", "person_id",
+                 "confidence", "captured_at", "bbox")
+
+    def __init__(self, alert_type, camera_id, track_id=None, zone=None, person_id=None,
+                 confidence=None, captured_at=None, bbox=None):
+        self.alert_type = alert_type
+        self.camera_id = camera_id
+        self.track_id = track_id
+        self.zone = zone
+        self.person_id = person_id
+        self.confidence = confidence
+        self.captured_at = captured_at
+        self.bbox = bbox
+
+    @property
+    def message(self):
+        """Human-readable description (overlay, console, Alert.description)."""
+        if self.alert_type == RESTRICTED_ZONE:
+            text = f"Restricted Zone Violation ({self.zone})"
+        elif self.alert_type == STATIONARY:
+            text = "Person Loitering"
+        elif self.alert_type == UNKNOWN_PERSON:
+            text = "Unknown Person"
+        else:
+            text = self.alert_type
+        return text if self.track_id is None else f"{text} - Track {self.track_id}"
+
+    @property
+    def subject(self):
+        """Email subject line."""
+        return ALERT_SUBJECTS.get(self.alert_type, "Surveillance Alert")
+
+    def captured_wall_clock(self):
+        """Capture time as a naive UTC datetime (Alert.captured_at), or None."""
+        return wall_clock(self.captured_at)
+
+    def bbox_text(self):
+        """Bounding box as "x1,y1,x2,y2" (Alert.bbox), or None."""
+        if self.bbox is None:
+            return None
+        return ",".join(str(int(v)) for v in self.bbox)
+
+    def to_dict(self):
+        """JSON-ready view (analytics and events)."""
+        captured_at = self.captured_wall_clock()
+        return {
+            "alert_type": self.alert_type,
+            "camera_id": self.camera_id,
+            "track_id": self.track_id,
+            "zone": self.zone,
+            "person_id": self.person_id,
+            "confidence": None if self.confidence is None else round(float(self.confidence), 3),
+            "captured_at": captured_at.isoformat() if captured_at else None,
+            "bbox": None if self.bbox is None else [int(v) for v in self.bbox],
+            "description": self.message
+        }
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return f"AlertRecord({self.alert_type}, {self.camera_id}, track={self.track_id})"
@@ -4,9 +4,15 @@ Alert generation system for three types:
 2. Restricted Zone violation
 3. Unknown Person
 """
+from alerts.alert_record import AlertRecord, STATIONARY, RESTRICTED_ZONE, UNKNOWN_PERSON
 from alerts.stationary import check_stationary
 from alerts.zone_check import check_restricted_zone, RESTRICTED_ZONES
 from app.pipelines.face_matcher import match_face
+from app.pipelines.face_quality import FACE_QUALITY_MIN
+
+# Minimum face quality for an Unknown Person alert: the same bar as embedding
+# (app/pipelines/face_quality.py), so no embedded face is wasted
+UNKNOWN_PERSON_MIN_QUALITY = FACE_QUALITY_MIN
 
 # Email service - now configured with credentials
 try:
@@ -21,7 +27,28 @@ except Exception as e:
     def send_email(subject, message):
         print(f"Email (error): {subject} - {message} - Error: {e}")
 
-def generate_alerts(tracked_people, face_embeddings, db_people, camera_id):
+def notify(alert):
+    """
+    Email an alert.
+    
+    Args:
+        alert: AlertRecord
+    """
+    lines = [alert.message, "", f"Camera: {alert.camera_id}", f"Type: {alert.alert_type}"]
+    if alert.track_id is not None:
+        lines.append(f"Track: {alert.track_id}")
+    if alert.zone:
+        lines.append(f"Zone: {alert.zone}")
+    if alert.person_id is not None:
+        lines.append(f"Matched face ID: {alert.person_id}")
+    captured_at = alert.captured_wall_clock()
+    if captured_at is not None:
+        lines.append(f"Frame captured: {captured_at.isoformat()} UTC")
+    send_email(alert.subject, "\n".join(lines))
+
+
+def generate_alerts(tracked_people, face_embeddings, db_people, camera_id, face_scores=None,
+                    captured_at=None):
     """
     Generate alerts for three types:
     - Stationary: Person loitering in one place
@@ -33,9 +60,12 @@ def generate_alerts(tracked_people, face_embeddings, db_people, camera_id):
         face_embeddings: Dictionary mapping track_id to face embedding
         db_people: Database of known people (optional)
         camera_id: Camera identifier
+        face_scores: Optional dictionary mapping track_id to face quality score;
+            faces below UNKNOWN_PERSON_MIN_QUALITY never raise Unknown Person
+        captured_at: time.monotonic() capture stamp of the frame (optional)
     
     Returns:
-        List of alert messages
+        List of AlertRecord objects
     """
     alerts = []
     
@@ -45,32 +75,37 @@ def generate_alerts(tracked_people, face_embeddings, db_people, camera_id):
     for person in tracked_people:
         tid = person["track_id"]
         bbox = person["bbox"]
+        fields = {"track_id": tid, "confidence": person.get("confidence"),
+                  "captured_at": captured_at, "bbox": bbox}
+
+        # Match the face once; the identity goes on every alert of the track
+        pid = None
+        face_usable = False
+        if tid in face_embeddings:
+            # Faces too poor to tell "unknown" from "not recognised" are not matched
+            face_usable = face_scores is None or face_scores.get(tid, 0.0) >= UNKNOWN_PERSON_MIN_QUALITY
+            if face_usable:
+                pid, distance = match_face(face_embeddings[tid], db_people)
+        fields["person_id"] = pid
 
         # Alert Type 1: Restricted Zone Violation
         # Check if person's bounding box intersects any restricted zone
         zone = check_restricted_zone(bbox, zones_list)
         if zone:
-            msg = f"Restricted Zone Violation ({zone}) - Track {tid}"
-            if EMAIL_ENABLED:
-                send_email("Restricted Zone Alert", msg)
-            alerts.append(msg)
+            alerts.append(AlertRecord(RESTRICTED_ZONE, camera_id, zone=zone, **fields))
 
         # Alert Type 2: Stationary/Loitering Detection
         # Check if person has been stationary for extended period
         if check_stationary(tid, bbox):
-            msg = f"Person Loitering - Track {tid}"
-            if EMAIL_ENABLED:
-                send_email("Stationary Person Alert", msg)
-            alerts.append(msg)
+            alerts.append(AlertRecord(STATIONARY, camera_id, **fields))
 
         # Alert Type 3: Unknown Person Detection
-        # Match face embedding against database of known persons
-        if tid in face_embeddings:
-            pid, distance = match_face(face_embeddings[tid], db_people)
-            if pid is None:  # No match found - unknown person
-                msg = f"Unknown Person - Track {tid}"
-                if EMAIL_ENABLED:
-                    send_email("Unknown Person Alert", msg)
-                alerts.append(msg)
+        # Usable face with no match in the database of known persons
+        if face_usable and pid is None:
+            alerts.append(AlertRecord(UNKNOWN_PERSON, camera_id, **fields))
+
+    if EMAIL_ENABLED:
+        for alert in alerts:
+            notify(alert)
 
     return alerts
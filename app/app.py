@@ -3,17 +3,28 @@ FastAPI application for surveillance pipeline web interface.
 Modified for Render deployment (no webcam access - uses uploaded video files).
 """
 from fastapi import FastAPI, Request, UploadFile, File, Query
-from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse, PlainTextResponse
+import asyncio
 from fastapi.templating import Jinja2Templates
 import cv2
 import threading
 import os
 import tempfile
+import time
+from datetime import datetime
 
 from app.full_pipeline import process_frame
-from app.models_loader import load_all_models
-from app.pipelines.db_writer import get_alerts
+from app.model_registry import ModelRegistry
+from app.preload import PRELOAD_MODELS, preload_models, process_memory
+from app.pipelines.db_writer import get_alerts, encode_cursor, decode_cursor
+from app.pipelines.alert_stats import get_alert_stats, get_alert_timeline
+from app.events import broker, format_sse, start_db_watcher, EVENT_HEARTBEAT
 from utils.db import SessionLocal, Alert, Person
+from utils.lowlight import get_lighting_estimator
+from app.pipelines.load_shedder import get_load_shedder
+from utils.metrics import stage_timer, render_prometheus, stage_summary
+from utils.latency import read_stamped, latency_report
+from utils.retention import start_retention, retention_status, query_archive, list_partitions
 
 app = FastAPI(title="Surveillance System", description="AI-powered surveillance system with object detection, tracking, and face recognition")
 templates = Jinja2Templates(directory="templates")
@@ -22,15 +33,28 @@ templates = Jinja2Templates(directory="templates")
 current_video_path = None
 latest_analytics = {}
 lock = threading.Lock()
+# Draw the capture-to-output latency on streamed frames (it is always sent
+# as the X-Pipeline-Latency-Ms header of each multipart part)
+LATENCY_OVERLAY = os.getenv("LATENCY_OVERLAY", "0") == "1"
+MAX_ALERTS_PAGE = 1000  # Largest page /api/alerts returns
 
-# Load models once at startup
-print("Loading models for FastAPI app...")
-try:
-    models = load_all_models()
-    print("Models loaded!")
-except Exception as e:
-    print(f"Warning: Could not load models: {e}")
-    models = None
+if PRELOAD_MODELS:
+    # Preload-then-fork (gunicorn.conf.py): load everything now in the parent
+    # so forked workers share the weights copy-on-write
+    models = preload_models()
+else:
+    # Load models in the background so the server can bind and answer /health
+    # immediately; optional models (Mask2Former, GAN) load on first use
+    print("Loading models for FastAPI app (background)...")
+    models = ModelRegistry().start()
+
+
+@app.on_event("startup")
+def start_background_jobs():
+    # Archive and delete expired rows (one process at a time, see utils/retention.py)
+    start_retention()
+    # Publish alerts/persons written by other processes to /events subscribers
+    start_db_watcher()
 
 
 @app.get("/", response_class=HTMLResponse)
@@ -97,14 +121,14 @@ def video_generator():
 
     try:
         while True:
-            ret, frame = cap.read()
+            ret, frame, captured_at, pts = read_stamped(cap)
             if not ret:
                 # Loop video or break
                 cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
                 frame_count = 0
                 continue
 
-            if models is None:
+            if not models.ready():
                 # If models not loaded, just return original frame with message
                 output_frame = frame.copy()
                 cv2.putText(output_frame, "Models loading...", (10, 30),
@@ -116,7 +140,9 @@ def video_generator():
                     models,
                     camera_id="CAM_01",
                     frame_count=frame_count,
-                    db_people=None
+                    db_people=None,
+                    captured_at=captured_at,
+                    pts=pts
                 )
 
                 # Update analytics
@@ -124,16 +150,29 @@ def video_generator():
                     global latest_analytics
                     latest_analytics = {
                         "frame_count": frame_count,
-                        "alerts": alerts,
+                        "alerts": [alert.to_dict() for alert in alerts],
                         "scene_features_available": scene_features is not None,
-                        "alerts_count": len(alerts)
+                        "alerts_count": len(alerts),
+                        "lighting": get_lighting_estimator("CAM_01").state(),
+                        "load_shedding": get_load_shedder("CAM_01").state(),
+                        "stage_latency": stage_summary("CAM_01").get("CAM_01", {})
                     }
+                    broker.publish("analytics", latest_analytics)
 
             # Encode frame as JPEG
-            _, buffer = cv2.imencode(".jpg", output_frame)
+            latency_ms = (time.monotonic() - captured_at) * 1000.0
+            if LATENCY_OVERLAY:
+                cv2.putText(output_frame, f"Latency: {latency_ms:.0f} ms", (10, output_frame.shape[0] - 10),
+                           cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2)
+            with stage_timer("CAM_01", "encode"):
+                _, buffer = cv2.imencode(".jpg", output_frame)
+            latency_ms = (time.monotonic() - captured_at) * 1000.0
             yield (
                 b"--frame\r\n"
-                b"Content-Type: image/jpeg\r\n\r\n" +
+                b"Content-Type: image/jpeg\r\n" +
+                f"X-Pipeline-Latency-Ms: {latency_ms:.1f}\r\n".encode() +
+                (f"X-Frame-Pts-Ms: {pts:.1f}\r\n".encode() if pts is not None else b"") +
+                b"\r\n" +
                 buffer.tobytes() +
                 b"\r\n"
             )
@@ -141,7 +180,6 @@ def video_generator():
             frame_count += 1
             
             # Limit frame rate for performance (30 FPS)
-            import time
             time.sleep(0.033)
 
     finally:
@@ -164,6 +202,53 @@ def get_analytics():
         return JSONResponse(latest_analytics)
 
 
+@app.get("/events")
+async def events(request: Request, types: str = Query(None)):
+    """
+    Server-sent events: "analytics" (every processed frame), "alert" (every
+    saved alert) and "person" (new registrations); alerts and persons are
+    picked up from the database by the worker's watcher (app/events.py). Filter with
+    ?types=alert,person. Reconnecting browsers send Last-Event-ID and get
+    the buffered events they missed.
+    """
+    last_event_id = request.headers.get("last-event-id")
+    subscription = broker.subscribe(
+        types=[t.strip() for t in types.split(",") if t.strip()] if types else None,
+        last_event_id=int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    )
+
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), EVENT_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            broker.unsubscribe(subscription)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Pipeline metrics (stage latencies, queue depth, dropped frames, FAISS/DB times) for Prometheus."""
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/api/latency")
+def get_latency(camera_id: str = Query(None)):
+    """Rolling capture-to-output latency and per-stage breakdown per camera (ms)."""
+    return JSONResponse(latency_report(camera_id))
+
+
 @app.get("/database", response_class=HTMLResponse)
 def database_viewer(request: Request):
     """Database viewer page."""
@@ -171,20 +256,31 @@ def database_viewer(request: Request):
 
 
 @app.get("/api/alerts")
-def get_alerts_api(camera_id: str = Query(None), limit: int = Query(100)):
-    """Get alerts from database as JSON."""
-    alerts = get_alerts(camera_id=camera_id, limit=limit)
-    return JSONResponse([
-        {
-            "id": alert.id,
-            "camera_id": alert.camera_id,
-            "track_id": alert.track_id,
-            "alert_type": alert.alert_type,
-            "description": alert.description,
-            "created_at": alert.created_at.isoformat() if alert.created_at else None
-        }
-        for alert in alerts
-    ])
+def get_alerts_api(camera_id: str = Query(None), limit: int = Query(100), since_id: int = Query(None),
+                   alert_type: str = Query(None), track_id: int = Query(None),
+                   start: str = Query(None), end: str = Query(None), cursor: str = Query(None)):
+    """
+    Get alerts from database as JSON, newest first.
+    
+    Filters: camera_id, alert_type, track_id, start/end (ISO datetimes, UTC).
+    Pages: pass the X-Next-Cursor header of a response as `cursor` to get the
+    next (older) page; the header is absent on the last page.
+    since_id: only newer alerts, oldest first (dashboard catch-up).
+    """
+    try:
+        start_at = datetime.fromisoformat(start) if start else None
+        end_at = datetime.fromisoformat(end) if end else None
+        before = decode_cursor(cursor) if cursor else None
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid parameter: {e}"}, status_code=400)
+    limit = max(1, min(limit, MAX_ALERTS_PAGE))
+    alerts = get_alerts(camera_id=camera_id, limit=limit, since_id=since_id, alert_type=alert_type,
+                        track_id=track_id, start=start_at, end=end_at, before=before, rows=True)
+    headers = {}
+    if since_id is None and len(alerts) == limit:
+        last = alerts[-1]
+        headers["X-Next-Cursor"] = encode_cursor(datetime.fromisoformat(last["created_at"]), last["id"])
+    return JSONResponse(alerts, headers=headers)
 
 
 @app.get("/api/persons")
@@ -207,29 +303,48 @@ def get_persons_api():
 
 
 @app.get("/api/stats")
-def get_stats():
-    """Get database statistics."""
+def get_stats(camera_id: str = Query(None)):
+    """Get database statistics (from the alert rollups, cached briefly)."""
     try:
-        db = SessionLocal()
-        total_alerts = db.query(Alert).count()
-        total_persons = db.query(Person).count()
-        
-        # Count by alert type
-        stationary = db.query(Alert).filter(Alert.alert_type == "STATIONARY").count()
-        restricted = db.query(Alert).filter(Alert.alert_type == "RESTRICTED_ZONE").count()
-        unknown = db.query(Alert).filter(Alert.alert_type == "UNKNOWN_PERSON").count()
-        
-        db.close()
-        
-        return JSONResponse({
-            "total_alerts": total_alerts,
-            "total_persons": total_persons,
-            "alerts_by_type": {
-                "stationary": stationary,
-                "restricted_zone": restricted,
-                "unknown_person": unknown
-            }
-        })
+        return JSONResponse(get_alert_stats(camera_id))
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.get("/api/stats/hourly")
+def get_hourly_stats(camera_id: str = Query(None), hours: int = Query(24)):
+    """Alert counts per hour and type for the last `hours` hours."""
+    try:
+        return JSONResponse(get_alert_timeline(camera_id, hours))
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.get("/api/archive")
+def get_archive_status():
+    """Retention limits, database size and archived partitions."""
+    try:
+        status = retention_status()
+        status["alert_partitions"] = list_partitions("alerts")
+        return JSONResponse(status)
+    except Exception as e:
+        return JSONResponse({"error": str(e)}, status_code=500)
+
+
+@app.get("/api/archive/alerts")
+def get_archived_alerts(camera_id: str = Query(None), alert_type: str = Query(None),
+                        track_id: int = Query(None), start: str = Query(None), end: str = Query(None),
+                        limit: int = Query(100)):
+    """Archived alerts (removed from the database by retention) as JSON, newest first."""
+    try:
+        start_at = datetime.fromisoformat(start) if start else None
+        end_at = datetime.fromisoformat(end) if end else None
+    except ValueError as e:
+        return JSONResponse({"error": f"Invalid parameter: {e}"}, status_code=400)
+    try:
+        alerts = query_archive("alerts", start=start_at, end=end_at, limit=max(1, min(limit, MAX_ALERTS_PAGE)),
+                               camera_id=camera_id, alert_type=alert_type, track_id=track_id)
+        return JSONResponse(alerts)
     except Exception as e:
         return JSONResponse({"error": str(e)}, status_code=500)
 
@@ -237,8 +352,11 @@ def get_stats():
 @app.get("/health")
 def health_check():
     """Health check endpoint for Render."""
+    failed = models.failed()
     return {
-        "status": "healthy",
-        "models_loaded": models is not None,
+        "status": "degraded" if failed else "healthy",
+        "models_loaded": models.ready(),
+        "models": models.status(),
+        "memory": process_memory(),
         "video_uploaded": current_video_path is not None and os.path.exists(current_video_path) if current_video_path else False
     }
@@ -0,0 +1,282 @@
+"""
+Event Broker Module
+
+Pushes alerts and analytics to dashboards as server-sent events (SSE)
+instead of having every open browser poll the database.
+
+- Producers call publish() from any thread: the web pipeline thread
+  publishes "analytics"; "alert" and "person" events come from a database
+  watcher (start_db_watcher), because alerts and registrations are written
+  by other processes (app/run_pipeline.py, video processors) whose
+  brokers no browser is connected to. One watcher per web process polls
+  the database every DB_WATCH_INTERVAL seconds, and only while someone is
+  subscribed, so the database load does not grow with open browsers.
+- Each /events connection subscribes with its asyncio loop; events are
+  handed to it with loop.call_soon_threadsafe(), so producers never block.
+- Recent events are kept per event type (EVENT_HISTORY), so a reconnecting
+  browser (Last-Event-ID header) gets what it missed without a database
+  query. Analytics is a snapshot published every frame: only the latest
+  one is kept, so it never pushes alerts out of the replay buffer.
+- A slow client's queue is bounded (EVENT_QUEUE_SIZE); its oldest events
+  are dropped rather than slowing the pipeline down.
+
+The broker lives in one process: with several gunicorn workers, a browser
+only sees "analytics" of the worker that serves its stream (every worker
+runs its own database watcher, so alerts reach all of them).
+
+Usage:
+    broker.publish("alert", {"id": 12, "alert_type": "STATIONARY", ...})
+    subscription = broker.subscribe(types=["alert"], last_event_id=40)
+    event_id, event_type, data = await subscription.queue.get()
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# Configuration
+# Events kept for Last-Event-ID replay, per event type ("default" for types not listed)
+EVENT_HISTORY = {
+    "default": 500,
+    "analytics": 1   # Snapshot: older ones are superseded by the newest
+}
+EVENT_QUEUE_SIZE = 200   # Pending events per subscriber before the oldest are dropped
+EVENT_HEARTBEAT = 15.0   # Seconds between keep-alive comments on idle streams
+DB_WATCH_INTERVAL = float(os.getenv("DB_WATCH_INTERVAL", "2"))  # Seconds between database polls for new alerts/persons
+DB_WATCH_BATCH = 500     # Alerts read per query
+
+
+class Subscription:
+    """
+    One SSE client.
+
+    Args:
+        loop: asyncio loop of the client's stream
+        types: Optional set of event types to receive (None = all)
+        queue_size: Maximum pending events
+    """
+
+    def __init__(self, loop, types=None, queue_size=EVENT_QUEUE_SIZE):
+        self.loop = loop
+        self.types = set(types) if types else None
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def wants(self, event_type):
+        return self.types is None or event_type in self.types
+
+    def _put(self, event):
+        # Runs on the subscriber's loop
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    def push(self, event):
+        """Hand an event to the subscriber's loop (thread-safe, never blocks)."""
+        if not self.wants(event[1]):
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # Loop already closed; the stream is being torn down
+
+
+class EventBroker:
+    """
+    Thread-safe fan-out of events to SSE subscribers.
+
+    Args:
+        history: Recent events kept for replay per event type (see EVENT_HISTORY)
+    """
+
+    def __init__(self, history=None):
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._history_sizes = dict(EVENT_HISTORY if history is None else history)
+        self._histories = {}
+        self._subscribers = set()
+
+    def _history(self, event_type):
+        """Replay buffer of an event type (created on first use)."""
+        history = self._histories.get(event_type)
+        if history is None:
+            size = self._history_sizes.get(event_type, self._history_sizes.get("default", 0))
+            history = self._histories[event_type] = deque(maxlen=size)
+        return history
+
+    def publish(self, event_type, data):
+        """
+        Send an event to all subscribers.
+
+        Args:
+            event_type: Event name (e.g. "alert", "analytics")
+            data: JSON-serialisable payload
+
+        Returns:
+            int: Event ID
+        """
+        payload = json.dumps(data, default=str)
+        with self._lock:
+            event = (self._next_id, event_type, payload)
+            self._next_id += 1
+            self._history(event_type).append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(event)
+        return event[0]
+
+    def subscribe(self, types=None, last_event_id=None):
+        """
+        Register a subscriber (call from the client's event loop).
+
+        Args:
+            types: Optional list of event types to receive
+            last_event_id: Replay buffered events after this ID (reconnects)
+
+        Returns:
+            Subscription
+        """
+        subscription = Subscription(asyncio.get_running_loop(), types)
+        with self._lock:
+            # Register and snapshot under the same lock: no gap, no duplicate
+            self._subscribers.add(subscription)
+            missed = []
+            if last_event_id is not None:
+                for history in self._histories.values():
+                    missed.extend(e for e in history if e[0] > last_event_id)
+        for event in sorted(missed):
+            if subscription.wants(event[1]):
+                subscription._put(event)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+
+def format_sse(event):
+    """Format an (id, type, json payload) event as an SSE message."""
+    event_id, event_type, payload = event
+    return f"id: {event_id}\nevent: {event_type}\ndata: {payload}\n\n"
+
+
+# Global broker (one per process)
+broker = EventBroker()
+
+
+def publish(event_type, data):
+    """Publish an event on the global broker (see EventBroker.publish)."""
+    return broker.publish(event_type, data)
+
+
+class DatabaseWatcher:
+    """
+    Publishes alerts and persons added to the database (by any process)
+    as "alert" and "person" events on a broker.
+
+    Polls only while the broker has subscribers. When the first subscriber
+    arrives after an idle period, it starts from the newest rows: browsers
+    load the current state over the REST API and catch up with
+    /api/alerts?since_id=... after reconnecting.
+
+    Args:
+        event_broker: Broker to publish on
+        interval: Seconds between polls
+    """
+
+    def __init__(self, event_broker, interval=DB_WATCH_INTERVAL):
+        self.broker = event_broker
+        self.interval = interval
+        self.last_alert_id = None
+        self.last_person_id = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _latest_ids(self):
+        from sqlalchemy import func
+        from utils.db import SessionLocal, Alert, Person
+
+        db = SessionLocal()
+        try:
+            return (db.query(func.max(Alert.id)).scalar() or 0,
+                    db.query(func.max(Person.id)).scalar() or 0)
+        finally:
+            db.close()
+
+    def poll(self):
+        """
+        Publish rows added since the last poll.
+
+        Returns:
+            int: Events published
+        """
+        from app.pipelines.db_writer import get_alerts
+        from utils.db import SessionLocal, Person
+
+        if self.last_alert_id is None:
+            self.last_alert_id, self.last_person_id = self._latest_ids()
+            return 0
+
+        published = 0
+        while True:
+            alerts = get_alerts(since_id=self.last_alert_id, limit=DB_WATCH_BATCH, rows=True)
+            for alert in alerts:
+                self.broker.publish("alert", alert)
+                self.last_alert_id = alert["id"]
+            published += len(alerts)
+            if len(alerts) < DB_WATCH_BATCH:
+                break
+
+        db = SessionLocal()
+        try:
+            persons = (db.query(Person.id, Person.name)
+                       .filter(Person.id > self.last_person_id)
+                       .order_by(Person.id)
+                       .all())
+        finally:
+            db.close()
+        for person_id, name in persons:
+            self.broker.publish("person", {"id": person_id, "name": name})
+            self.last_person_id = person_id
+        return published + len(persons)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if self.broker.subscriber_count() == 0:
+                self.last_alert_id = self.last_person_id = None  # Restart from the newest rows
+                continue
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"Warning: Event database watcher failed: {e}")
+                time.sleep(self.interval)
+
+    def start(self):
+        """Start the polling thread (once)."""
+        if self._thread is not None and self._thread.is_alive():
+            return self
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="db-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+_db_watcher = None
+
+
+def start_db_watcher(interval=DB_WATCH_INTERVAL):
+    """Start the database watcher of the global broker (one per process)."""
+    global _db_watcher
+    if _db_watcher is None:
+        _db_watcher = DatabaseWatcher(broker, interval)
+    return _db_watcher.start()
@@ -3,18 +3,25 @@ Main Pipeline following the exact flow:
 Frame → Zero-DCE → YOLO → DeepSORT (OUTPUT 1) → Mask2Former → ResNet (OUTPUT 2) 
 → Face Pipeline (if person) → Alerts
 """
+import time
+
 import cv2
 import torch
 import numpy as np
-from utils.lowlight import is_low_light
+from utils.lowlight import get_lighting_estimator
 from app.models.zeroDce import zerodce_enhance
 from app.pipelines.detect_n_track import detect_and_track
 from app.pipelines.scene_understanding import run_scene_models
 from app.pipelines.face_pipeline import process_faces
+from app.pipelines.frame_context import FrameContext
+from app.pipelines.load_shedder import get_load_shedder
 from alerts.alerts import generate_alerts
+from utils.metrics import stage_timer, observe, inc
+from utils.latency import record_frame
 
 
-def process_frame(frame, models, camera_id="CAM_01", frame_count=0, db_people=None):
+def process_frame(frame, models, camera_id="CAM_01", frame_count=0, db_people=None,
+                  captured_at=None, pts=None):
     """
     Process a single frame through the complete pipeline.
     
@@ -24,26 +31,45 @@ def process_frame(frame, models, camera_id="CAM_01", frame_count=0, db_people=No
         camera_id: Camera identifier
         frame_count: Current frame number
         db_people: Database of known people for face matching
+        captured_at: time.monotonic() when the frame was captured (see
+            utils.latency.read_stamped); default: now, so queueing before
+            this call is not counted
+        pts: Optional stream position of the frame in ms
     
     Returns:
         output_frame: Frame with visualizations (OUTPUT 1 - shown after DeepSORT)
         scene_features: Scene understanding features (OUTPUT 2)
-        alerts: List of generated alerts
+        alerts: List of AlertRecord objects (alerts/alert_record.py)
     """
+    started_at = time.monotonic()
+    frame_start = time.perf_counter()
     device = models.get("device", "cpu")
     alerts = []
     scene_features = None
+    # Degrades optional stages when the camera is over its latency budget
+    shedder = get_load_shedder(camera_id)
     
     # ==========================================
     # 1️⃣ Frame Input
     # ==========================================
-    original_frame = frame.copy()
+    # The input frame is never modified, so it may be read-only (e.g. a
+    # frame from utils/frame_ring.FrameRingBuffer) - no defensive copy.
+    # All stages share one FrameContext so colour conversions and resized
+    # copies are computed at most once per frame.
+    # The capture timestamp travels with the context (utils/latency.py).
+    ctx = FrameContext(frame, camera_id=camera_id, frame_count=frame_count,
+                       captured_at=captured_at, pts=pts)
     
     # ==========================================
     # 2️⃣ Zero-DCE (low-light enhancement)
     # ==========================================
-    if is_low_light(frame):
-        frame = zerodce_enhance(frame)
+    # Smoothed, hysteresis-based per-camera check on a pixel subsample
+    with stage_timer(camera_id, "lowlight", ctx.timings):
+        low_light = get_lighting_estimator(camera_id).update(ctx)
+    if low_light:
+        with stage_timer(camera_id, "zerodce", ctx.timings):
+            ctx.replace(zerodce_enhance(ctx))
+    frame = ctx.bgr
     
     # ==========================================
     # 3️⃣ YOLO (detect objects)
@@ -54,9 +80,13 @@ def process_frame(frame, models, camera_id="CAM_01", frame_count=0, db_people=No
     # ==========================================
     # 4️⃣ DeepSORT (track IDs) ← 🔴 OUTPUT SHOWN HERE (REAL-TIME)
     # ==========================================
-    tracked_objects = detect_and_track(frame, yolo, deepsort)
+    # "yolo" and "deepsort" stage timings are recorded inside detect_and_track
+    tracked_objects = detect_and_track(ctx, yolo, deepsort, camera_id,
+                                       input_size=shedder.detection_size())
     
     # Visualize tracked objects (OUTPUT 1 - Real-time display)
+    # The only frame copy: drawing must not touch the frame the models read
+    draw_start = time.perf_counter()
     output_frame = frame.copy()
     for obj in tracked_objects:
         x1, y1, x2, y2 = map(int, obj["bbox"])
@@ -74,15 +104,16 @@ def process_frame(frame, models, camera_id="CAM_01", frame_count=0, db_people=No
             label += f' ({conf:.2f})'
         cv2.putText(output_frame, label, (x1, y1 - 5),
                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
+    draw_seconds = time.perf_counter() - draw_start
     
     # ==========================================
     # 5️⃣ Mask2Former (scene / zone semantics) - Optional
     # 6️⃣ ResNet (scene / object context features)
     # ==========================================
     # Run heavy models every 15 frames for performance
-    if frame_count % 15 == 0:
+    if frame_count % 15 == 0 and not shedder.sheds("resnet"):
         resnet = models["resnet"]
-        mask2former = models.get("mask2former", None)
+        mask2former = None if shedder.sheds("mask2former") else models.get("mask2former", None)
         
         # Only run scene models if ResNet is available
         if resnet is not None:
@@ -92,16 +123,17 @@ def process_frame(frame, models, camera_id="CAM_01", frame_count=0, db_people=No
             if mask2former is not None:
                 mask2former_model, mask2former_processor = mask2former
             
-            scene_features = run_scene_models(
-                frame, 
-                mask2former_model, 
-                mask2former_processor,
-                resnet, 
-                device
-            )
+            with stage_timer(camera_id, "scene", ctx.timings):
+                scene_features = run_scene_models(
+                    ctx, 
+                    mask2former_model, 
+                    mask2former_processor,
+                    resnet, 
+                    device
+                )
             
             # Display scene info on frame
-            scene_text = f'Scene Features: {len(scene_features.get("scene_features", []))} dims'
+            scene_text = f'Scene Features: {scene_features["scene_features"].shape[-1]} dims'
             if mask2former is None:
                 scene_text += " (Mask2Former disabled)"
             cv2.putText(output_frame, scene_text, (10, 30),
@@ -111,26 +143,29 @@ def process_frame(frame, models, camera_id="CAM_01", frame_count=0, db_people=No
     # 7️⃣ Face Pipeline (ONLY if class == person)
     # ==========================================
     face_embeddings = {}
+    face_scores = {}
     person_objects = [obj for obj in tracked_objects if obj["class"] == "person"]
     
-    if person_objects:
+    if person_objects and shedder.run_faces(frame_count):
         mtcnn = models["mtcnn"]
-        gan = models.get("gan", None)
+        gan = None if shedder.sheds("gan") else models.get("gan", None)
         facenet = models["facenet"]
         
-        face_embeddings = process_faces(
-            frame,
-            person_objects,
-            mtcnn,
-            gan,
-            facenet,
-            device
-        )
+        with stage_timer(camera_id, "faces", ctx.timings):
+            face_embeddings, face_scores = process_faces(
+                ctx,
+                person_objects,
+                mtcnn,
+                gan,
+                facenet,
+                device,
+                return_scores=True
+            )
         
-        # Display face IDs on frame
+        # Display face IDs (and face quality) on frame
         y_offset = 60
         for track_id, emb in face_embeddings.items():
-            cv2.putText(output_frame, f'FaceID: {track_id}',
+            cv2.putText(output_frame, f'FaceID: {track_id} (q={face_scores.get(track_id, 0.0):.2f})',
                        (10, y_offset), cv2.FONT_HERSHEY_SIMPLEX,
                        0.6, (0, 0, 255), 2)
             y_offset += 25
@@ -146,29 +181,59 @@ def process_frame(frame, models, camera_id="CAM_01", frame_count=0, db_people=No
         except:
             db_people = {}
     
-    alerts = generate_alerts(
-        person_objects,
-        face_embeddings,
-        db_people,
-        camera_id
-    )
+    with stage_timer(camera_id, "alerts", ctx.timings):
+        alerts = generate_alerts(
+            person_objects,
+            face_embeddings,
+            db_people,
+            camera_id,
+            face_scores,
+            captured_at=ctx.captured_at
+        )
     
     # Display alerts on frame
+    draw_start = time.perf_counter()
     if alerts:
+        # Outline every alerted person in red
+        for alert in alerts:
+            if alert.bbox is not None:
+                x1, y1, x2, y2 = map(int, alert.bbox)
+                cv2.rectangle(output_frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
         alert_y = max(100, output_frame.shape[0] - len(alerts) * 30 - 20)
         for i, alert in enumerate(alerts[:3]):  # Show max 3 alerts
             # Truncate long alerts for display
-            alert_text = alert[:60] if len(alert) > 60 else alert
+            alert_text = alert.message[:60]
             cv2.putText(output_frame, alert_text, (10, alert_y + i * 30),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
+    draw_seconds += time.perf_counter() - draw_start
     
+    now = time.perf_counter()
+    ctx.timings["draw"] = draw_seconds
+    observe("pipeline_stage_seconds", draw_seconds, camera=camera_id, stage="draw")
+    observe("pipeline_stage_seconds", now - frame_start, camera=camera_id, stage="total")
+    inc("frames_processed_total", camera=camera_id)
+    # Capture-to-output latency and stage breakdown into the rolling report
+    record_frame(ctx, started_at)
+    
+    # Load shedding: only stages that are actually running can be shed
+    available = {"resnet", "faces", "detector"}
+    if models.get("gan") is not None:
+        available.add("gan")
+    if models.get("mask2former") is not None:
+        available.add("mask2former")
+    shedder.update((now - frame_start) * 1000.0, available)
+    
+    # Buffers go back to the camera's pool; output_frame is a copy, not a view
+    ctx.release()
     return output_frame, scene_features, alerts
 
 
-def full_pipeline(frame, camera_id="CAM_01", models=None, frame_count=0, db_people=None):
+def full_pipeline(frame, camera_id="CAM_01", models=None, frame_count=0, db_people=None,
+                  captured_at=None, pts=None):
     """
     Wrapper function for compatibility with existing code.
     Returns detections and alerts format.
+    captured_at / pts are the capture stamp of the frame (see process_frame).
     
     Note: This function processes the frame twice (once for output, once for detections).
     For better performance, use process_frame() directly.
@@ -179,7 +244,7 @@ def full_pipeline(frame, camera_id="CAM_01", models=None, frame_count=0, db_peop
     
     # Process frame to get face embeddings
     output_frame, scene_features, alerts = process_frame(
-        frame, models, camera_id, frame_count, db_people
+        frame, models, camera_id, frame_count, db_people, captured_at, pts
     )
     
     # Get tracked objects (we need to run detection again to get current state)
@@ -187,7 +252,8 @@ def full_pipeline(frame, camera_id="CAM_01", models=None, frame_count=0, db_peop
     tracked_objects = detect_and_track(
         frame, 
         models["yolo"], 
-        models["deepsort"]
+        models["deepsort"],
+        camera_id
     )
     
     # Get face embeddings by processing faces again
@@ -196,14 +262,16 @@ def full_pipeline(frame, camera_id="CAM_01", models=None, frame_count=0, db_peop
     face_embeddings = {}
     if person_objects:
         device = models.get("device", "cpu")
+        face_ctx = FrameContext(frame, camera_id=camera_id, frame_count=frame_count)
         face_embeddings = process_faces(
-            frame,
+            face_ctx,
             person_objects,
             models["mtcnn"],
             models.get("gan", None),
             models["facenet"],
             device
         )
+        face_ctx.release()
     
     # Convert tracked objects to detections format
     detections = []
@@ -0,0 +1,266 @@
+"""
+Model Registry Module
+
+Loads the pipeline models concurrently in a background thread pool so the
+web server can start serving (and answer /health) while models load.
+
+- Required models are loaded eagerly and in parallel. Accessing one
+  (models["yolo"]) blocks until it is ready.
+- Optional models (Mask2Former, GAN by default) are loaded lazily the first
+  time they are requested. Until they are ready, models.get() returns None,
+  so the pipeline simply runs without them for the first frames.
+- Every model gets a dummy forward pass after loading (warm-up) so the first
+  real frame does not pay for lazy initialization.
+
+The registry can be used anywhere the dict from load_all_models() is
+expected (models["yolo"], models.get("gan", None)).
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+from app.models_loader import (
+    MODEL_NAMES,
+    REQUIRED_MODELS,
+    get_device,
+    load_model,
+)
+
+# Configuration
+MODEL_LOAD_WORKERS = int(os.getenv("MODEL_LOAD_WORKERS", "4"))
+# Optional models loaded on first use instead of at startup
+LAZY_MODELS = ("mask2former", "gan")
+
+# Load states
+STATE_IDLE = "idle"          # Lazy model, not requested yet
+STATE_PENDING = "pending"    # Queued for loading
+STATE_LOADING = "loading"
+STATE_WARMING = "warming_up"
+STATE_READY = "ready"
+STATE_FAILED = "failed"
+
+
+@torch.no_grad()
+def warm_up(name, model, device="cpu"):
+    """
+    Run a dummy forward pass so lazy initialization happens before the first frame.
+
+    Args:
+        name: Model key
+        model: Loaded model
+        device: Device string
+    """
+    if model is None:
+        return
+    if name == "yolo":
+        model(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+    elif name == "resnet":
+        model(torch.zeros(1, 3, 224, 224, device=device))
+    elif name == "facenet":
+        model(torch.zeros(1, 3, 160, 160, device=device))
+    elif name == "mtcnn":
+        model.detect(np.zeros((160, 160, 3), dtype=np.uint8))
+    elif name == "mask2former":
+        from PIL import Image
+        m2f_model, processor = model
+        inputs = processor(images=Image.new("RGB", (384, 384)), return_tensors="pt")
+        m2f_model(**{k: v.to(device) for k, v in inputs.items()})
+    # DeepSORT (stateful tracker), GAN and Zero-DCE are not warmed up
+
+
+class ModelRegistry:
+    """
+    Concurrent, lazy model container with per-model load state.
+
+    Args:
+        device: Device string (default: "cuda" if available, else "cpu")
+        backends: Optional dict of inference backend per model
+        quantization: Optional dict of INT8 mode per model
+        lazy: Model keys to load on first use instead of at start()
+        warmup: Whether to run a dummy forward pass after loading
+        max_workers: Size of the loading thread pool
+    """
+
+    def __init__(self, device=None, backends=None, quantization=None,
+                 lazy=LAZY_MODELS, warmup=True, max_workers=MODEL_LOAD_WORKERS):
+        self.device = device or get_device()
+        self.backends = backends
+        self.quantization = quantization
+        self.lazy = tuple(lazy)
+        self.warmup = warmup
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="model-loader")
+        self._lock = threading.Lock()
+        self._models = {}
+        self._futures = {}
+        self._status = {
+            name: {"state": STATE_IDLE, "load_time": None, "warmup_time": None, "error": None}
+            for name in MODEL_NAMES
+        }
+        self._started_at = None
+
+    # ------------------------------------------------------------------
+    # Loading
+    # ------------------------------------------------------------------
+    def start(self):
+        """Start loading all non-lazy models in the background. Returns immediately."""
+        self._started_at = time.time()
+        print(f"Loading models in background on device: {self.device}")
+        for name in MODEL_NAMES:
+            if name not in self.lazy:
+                self._submit(name)
+        return self
+
+    def _submit(self, name):
+        """Queue a model for loading (no-op if already queued)."""
+        with self._lock:
+            if name in self._futures:
+                return self._futures[name]
+            self._status[name]["state"] = STATE_PENDING
+            future = self._executor.submit(self._load, name)
+            self._futures[name] = future
+            return future
+
+    def _set_state(self, name, **fields):
+        with self._lock:
+            self._status[name].update(fields)
+
+    def _load(self, name):
+        """Load and warm up a single model (runs in the thread pool)."""
+        display_name = MODEL_NAMES[name]
+        self._set_state(name, state=STATE_LOADING)
+        start = time.time()
+        try:
+            model = load_model(name, self.device, self.backends, self.quantization)
+        except Exception as e:
+            self._set_state(name, state=STATE_FAILED, error=str(e),
+                            load_time=time.time() - start)
+            if name in REQUIRED_MODELS:
+                print(f"ERROR: Failed to load {display_name}: {e}")
+            else:
+                print(f"WARNING: Failed to load {display_name}: {e}")
+                print(f"Continuing without {display_name}")
+            return None
+        load_time = time.time() - start
+
+        if self.warmup:
+            self._set_state(name, state=STATE_WARMING, load_time=load_time)
+            start = time.time()
+            try:
+                warm_up(name, model, self.device)
+            except Exception as e:
+                print(f"Warning: Warm-up of {display_name} failed: {e}")
+            self._set_state(name, warmup_time=time.time() - start)
+
+        with self._lock:
+            self._models[name] = model
+            self._status[name].update(state=STATE_READY, load_time=load_time)
+        print(f"{display_name} ready ({load_time:.1f}s)")
+        return model
+
+    def wait(self, timeout=None, include_optional=False):
+        """
+        Block until all required models have finished loading.
+
+        Args:
+            timeout: Maximum seconds to wait (None waits forever)
+            include_optional: Also load and wait for optional/lazy models
+
+        Returns:
+            True if all required models are ready
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        names = list(MODEL_NAMES) if include_optional else list(REQUIRED_MODELS)
+        for name in names:
+            future = self._submit(name)
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            try:
+                future.result(timeout=remaining)
+            except Exception:
+                return False
+        return self.ready()
+
+    def load_now(self, name):
+        """Load a (lazy) model and block until it is ready. Returns the model or None."""
+        return self._submit(name).result()
+
+    # ------------------------------------------------------------------
+    # Readiness
+    # ------------------------------------------------------------------
+    def ready(self):
+        """True once every required model is loaded."""
+        with self._lock:
+            return all(self._status[n]["state"] == STATE_READY for n in REQUIRED_MODELS)
+
+    def failed(self):
+        """List of required models that failed to load."""
+        with self._lock:
+            return [n for n in REQUIRED_MODELS if self._status[n]["state"] == STATE_FAILED]
+
+    def status(self):
+        """
+        Per-model load state for health reporting.
+
+        Returns:
+            dict: model name -> {"state", "load_time", "warmup_time", "error", "required"}
+        """
+        with self._lock:
+            report = {}
+            for name, entry in self._status.items():
+                report[name] = dict(entry, required=name in REQUIRED_MODELS)
+                for key in ("load_time", "warmup_time"):
+                    if report[name][key] is not None:
+                        report[name][key] = round(report[name][key], 3)
+            return report
+
+    # ------------------------------------------------------------------
+    # dict-like access (compatible with load_all_models() result)
+    # ------------------------------------------------------------------
+    def __getitem__(self, name):
+        if name == "device":
+            return self.device
+        if name not in MODEL_NAMES:
+            raise KeyError(name)
+        if name in self.lazy:
+            return self.get(name)
+
+        # Required / eager models: block until loaded
+        model = self._submit(name).result()
+        with self._lock:
+            if self._status[name]["state"] == STATE_FAILED and name in REQUIRED_MODELS:
+                raise RuntimeError(f"{MODEL_NAMES[name]} failed to load: "
+                                   f"{self._status[name]['error']}")
+        return model
+
+    def get(self, name, default=None):
+        """
+        Non-blocking access for lazy models (triggers loading on first call),
+        blocking access for eager models.
+        """
+        if name == "device":
+            return self.device
+        if name not in MODEL_NAMES:
+            return default
+        if name in self.lazy:
+            self._submit(name)
+            with self._lock:
+                return self._models.get(name, default)
+        try:
+            return self[name]
+        except RuntimeError:
+            return default
+
+    def __contains__(self, name):
+        return name == "device" or name in MODEL_NAMES
+
+    def keys(self):
+        return list(MODEL_NAMES) + ["device"]
+
+    def shutdown(self, wait=False):
+        """Stop the loading thread pool (pending loads are cancelled)."""
+        self._executor.shutdown(wait=wait, cancel_futures=True)
@@ -1,19 +1,70 @@
-def load_deepsort():
+import os
+
+import cv2
+import numpy as np
+
+# ReID appearance embedder used by DeepSORT:
+# - "mobilenet": deep_sort_realtime's MobileNetV2 ReID model
+# - "torchreid": a torchreid model (TORCHREID_MODEL, default the light osnet_x0_25)
+# - "histogram": HSV colour histograms of the detection crops (no network)
+# - "none": no appearance features; the appearance cascade is switched off
+#   (NO_APPEARANCE_COSINE) and tracks are associated by IoU only, as in SORT
+DEEPSORT_EMBEDDERS = ("mobilenet", "torchreid", "histogram", "none")
+DEEPSORT_EMBEDDER = os.getenv("DEEPSORT_EMBEDDER", "mobilenet")
+TORCHREID_MODEL = os.getenv("TORCHREID_MODEL", "osnet_x0_25")
+
+# Colour histogram embedder
+HIST_CROP_SIZE = (32, 64)  # (width, height) crops are resized to before binning
+HIST_BINS = (16, 8)        # Hue x saturation bins
+
+# "none": a cosine gate no distance can pass (distances are >= 0), so the
+# matching cascade matches nothing and every association goes to DeepSORT's
+# IoU stage (tracks missed for more than one frame are not re-identified)
+NO_APPEARANCE_COSINE = -1.0
+
+
+def load_deepsort(embedder=None, device="cpu"):
     """
     Load DeepSORT tracker.
+
+    Args:
+        embedder: Appearance embedder (see DEEPSORT_EMBEDDERS, default DEEPSORT_EMBEDDER)
+        device: Device string; half precision and GPU embedding only on "cuda"
     """
+    embedder = (embedder or DEEPSORT_EMBEDDER).lower()
+    if embedder not in DEEPSORT_EMBEDDERS:
+        print(f"Warning: Unknown DeepSORT embedder '{embedder}', using mobilenet")
+        embedder = "mobilenet"
+    use_gpu = device == "cuda"
+
     try:
         from deep_sort_realtime.deepsort_tracker import DeepSort
-        tracker = DeepSort(
-            max_age=30,                # frames to keep track alive
-            n_init=3,                  # frames before confirming track
-            max_iou_distance=0.7,
-            max_cosine_distance=0.4,
-            embedder="mobilenet",      # pretrained ReID model
-            half=True,
-            bgr=True
-        )
-        print("DeepSORT tracker loaded successfully")
+
+        def create(name):
+            builtin = name in ("mobilenet", "torchreid")
+            return DeepSort(
+                max_age=30,                # frames to keep track alive
+                n_init=3,                  # frames before confirming track
+                max_iou_distance=0.7,
+                max_cosine_distance=NO_APPEARANCE_COSINE if name == "none" else 0.4,
+                embedder=name if builtin else None,  # None: embeddings computed in appearance_embeds()
+                embedder_model_name=TORCHREID_MODEL if name == "torchreid" else None,
+                half=use_gpu,              # fp16 only helps on GPU
+                embedder_gpu=use_gpu,
+                bgr=True
+            )
+
+        try:
+            tracker = create(embedder)
+        except Exception as e:
+            if embedder != "torchreid":
+                raise
+            print(f"Warning: torchreid embedder unavailable ({e}), using mobilenet")
+            embedder = "mobilenet"
+            tracker = create(embedder)
+
+        tracker.appearance = embedder
+        print(f"DeepSORT tracker loaded successfully (embedder: {embedder})")
         return tracker
     except ImportError as e:
         raise ImportError(f"deep_sort_realtime not installed or incorrect import. Error: {e}. Install with: pip install deep-sort-realtime")
@@ -21,4 +72,62 @@ def load_deepsort():
         raise Exception(f"Error loading DeepSORT: {e}")
 
 
-    
+def histogram_embeds(frame, boxes):
+    """
+    HSV hue/saturation histograms of detection crops, computed as one batch.
+
+    Args:
+        frame: BGR frame
+        boxes: List of [x, y, w, h] boxes (positive size)
+
+    Returns:
+        (N, bins) float32 array of L2-normalised histograms
+    """
+    n_bins = HIST_BINS[0] * HIST_BINS[1]
+    if len(boxes) == 0:
+        return np.zeros((0, n_bins), dtype=np.float32)
+
+    frame_h, frame_w = frame.shape[:2]
+    crop_w, crop_h = HIST_CROP_SIZE
+    crops = np.empty((len(boxes) * crop_h, crop_w, 3), dtype=np.uint8)
+    for i, (x, y, w, h) in enumerate(boxes):
+        x1, y1 = max(0, int(x)), max(0, int(y))
+        x2, y2 = min(frame_w, int(x + w)), min(frame_h, int(y + h))
+        tile = crops[i * crop_h:(i + 1) * crop_h]
+        if x2 <= x1 or y2 <= y1:
+            tile[:] = 0
+            continue
+        cv2.resize(frame[y1:y2, x1:x2], (crop_w, crop_h), dst=tile, interpolation=cv2.INTER_AREA)
+
+    # One colour conversion for all crops (stacked vertically)
+    hsv = cv2.cvtColor(crops, cv2.COLOR_BGR2HSV).reshape(len(boxes), -1, 3)
+    hue = hsv[:, :, 0].astype(np.int64) * HIST_BINS[0] // 180
+    sat = hsv[:, :, 1].astype(np.int64) * HIST_BINS[1] // 256
+    bins = hue * HIST_BINS[1] + sat + (np.arange(len(boxes)) * n_bins)[:, None]
+
+    hist = np.bincount(bins.ravel(), minlength=len(boxes) * n_bins).reshape(len(boxes), n_bins)
+    hist = hist.astype(np.float32)
+    hist /= np.maximum(np.linalg.norm(hist, axis=1, keepdims=True), 1e-6)
+    return hist
+
+
+def appearance_embeds(tracker, frame, boxes):
+    """
+    Embeddings for trackers created without a built-in embedder.
+
+    Args:
+        tracker: DeepSORT tracker from load_deepsort
+        frame: BGR frame
+        boxes: List of [x, y, w, h] detection boxes
+
+    Returns:
+        List of embeddings, or None if the tracker embeds crops itself
+    """
+    appearance = getattr(tracker, "appearance", None)
+    if appearance == "histogram":
+        return list(histogram_embeds(frame, boxes))
+    if appearance == "none":
+        # Placeholder features (DeepSort needs one per detection); the tracker's
+        # cosine gate (NO_APPEARANCE_COSINE) rejects them all, so only IoU matches
+        return [np.ones(1, dtype=np.float32)] * len(boxes)
+    return None
@@ -1,10 +1,17 @@
-def load_facenet():
+def load_facenet(backend="torch"):
     """
     Load FaceNet model for face embeddings.
+
+    Args:
+        backend: Inference backend ("torch", "onnx" or "openvino")
     """
     try:
         from facenet_pytorch import InceptionResnetV1
         model = InceptionResnetV1(pretrained="vggface2").eval()
+        if backend != "torch":
+            import torch
+            from app.models.onnx_backend import wrap_model
+            model = wrap_model(model, torch.rand(1, 3, 160, 160), "facenet", backend)
         print("FaceNet model loaded successfully")
         return model
     except ImportError:
@@ -1,3 +1,5 @@
+import cv2
+import numpy as np
 import torch
 
 def load_srgan(device="cpu"):
@@ -24,3 +26,52 @@ def load_srgan(device="cpu"):
     except Exception as e:
         print(f"Warning: Error loading RealESRGAN model: {e}. Face enhancement will be disabled.")
         return None
+
+
+def sr_input_size(gan, output_size=160):
+    """Side of the GAN input for a given output size (40 for x4 and 160)."""
+    return max(1, output_size // getattr(gan, "scale", 4))
+
+
+def upscale_faces(gan, faces, device="cpu", output_size=160):
+    """
+    Super-resolve a batch of face crops in a single forward pass.
+
+    Every crop is resized to sr_input_size() so they can be stacked into one
+    batch; the network output then already has the FaceNet input size. Only
+    crops around that size or smaller should be sent here: a larger crop
+    would be shrunk first, losing detail the GAN then has to invent.
+
+    Args:
+        gan: RealESRGAN model (from load_srgan)
+        faces: List of RGB uint8 face crops (any size)
+        device: Device to run on
+        output_size: Side of the square output faces
+
+    Returns:
+        Float tensor (N, 3, output_size, output_size) with values in [0, 1]
+    """
+    input_size = sr_input_size(gan, output_size)
+    batch = np.stack([
+        cv2.resize(face, (input_size, input_size),
+                   interpolation=cv2.INTER_AREA if min(face.shape[:2]) > input_size else cv2.INTER_CUBIC)
+        for face in faces
+    ])
+
+    net = getattr(gan, "model", None)
+    with torch.no_grad():
+        if isinstance(net, torch.nn.Module):
+            net.eval()
+            x = torch.from_numpy(batch).permute(0, 3, 1, 2).float().div_(255.0).to(device)
+            out = net(x).clamp_(0.0, 1.0)
+        else:
+            # No batched network exposed: fall back to one predict() call per face
+            from PIL import Image
+            outs = [np.asarray(gan.predict(Image.fromarray(face))) for face in batch]
+            out = torch.from_numpy(np.stack(outs)).permute(0, 3, 1, 2).float().div_(255.0).to(device)
+
+        if out.shape[-2:] != (output_size, output_size):
+            out = torch.nn.functional.interpolate(
+                out, size=(output_size, output_size), mode="bilinear", align_corners=False
+            )
+    return out
@@ -0,0 +1,311 @@
+"""
+ONNX Runtime / OpenVINO Inference Backend
+
+Optional CPU-optimised backend for the PyTorch models in the pipeline.
+Each model is exported to ONNX once, the exported file is cached on disk
+under a name derived from a hash of its weights, and inference is run
+through ONNX Runtime (or OpenVINO when it is installed).
+
+Wrapped models keep the PyTorch call signature (tensor in, tensor out),
+so the pipelines do not need to know which backend is active. If the
+runtime is missing, export fails or the outputs do not match PyTorch,
+the original PyTorch model is returned instead.
+"""
+import hashlib
+import os
+import shutil
+
+import numpy as np
+import torch
+
+# Configuration
+ONNX_CACHE_DIR = os.getenv("ONNX_CACHE_DIR", "onnx_cache")  # Exported model cache
+ONNX_OPSET = 17
+PARITY_ATOL = 1e-3  # Max absolute difference allowed vs PyTorch outputs
+SUPPORTED_BACKENDS = ("torch", "onnx", "openvino")
+
+
+def weights_hash(model):
+    """
+    Compute a short hash of a PyTorch model's weights.
+
+    Args:
+        model: torch.nn.Module
+
+    Returns:
+        str: 16-character hex digest identifying the weights
+    """
+    digest = hashlib.sha256()
+    for name, tensor in model.state_dict().items():
+        digest.update(name.encode("utf-8"))
+        digest.update(tensor.detach().cpu().contiguous().numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def file_hash(path):
+    """
+    Compute a short hash of a weights file on disk.
+
+    Args:
+        path: Path to the weights file
+
+    Returns:
+        str: 16-character hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def export_onnx(model, dummy_input, name, dynamic_axes=None):
+    """
+    Export a PyTorch model to ONNX, reusing a cached export if present.
+
+    Args:
+        model: torch.nn.Module in eval mode
+        dummy_input: Example input tensor used for tracing
+        name: Model name used in the cache file name
+        dynamic_axes: Optional dict of dynamic input axes (default: batch only)
+
+    Returns:
+        str: Path to the cached ONNX file
+    """
+    os.makedirs(ONNX_CACHE_DIR, exist_ok=True)
+    onnx_path = os.path.join(ONNX_CACHE_DIR, f"{name}-{weights_hash(model)}.onnx")
+    if os.path.exists(onnx_path):
+        return onnx_path
+
+    if dynamic_axes is None:
+        dynamic_axes = {"input": {0: "batch"}}
+    dynamic_axes = dict(dynamic_axes)
+    dynamic_axes.setdefault("output", {0: "batch"})
+
+    print(f"Exporting {name} to ONNX (one-time, cached at {onnx_path})...")
+    tmp_path = onnx_path + ".tmp"
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                model,
+                dummy_input,
+                tmp_path,
+                input_names=["input"],
+                output_names=["output"],
+                dynamic_axes=dynamic_axes,
+                opset_version=ONNX_OPSET,
+                dynamo=False
+            )
+        os.replace(tmp_path, onnx_path)
+    finally:
+        # A failed export must not leave a partial file in the cache
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return onnx_path
+
+
+class RuntimeModel:
+    """
+    Callable wrapper around an ONNX Runtime or OpenVINO compiled model.
+
+    Mimics the parts of the torch.nn.Module interface used by the pipelines
+    (__call__, eval, to) so it can be used as a drop-in replacement.
+    """
+
+    def __init__(self, run_fn, name, backend):
+        self._run = run_fn
+        self.name = name
+        self.backend = backend
+
+    def __call__(self, x):
+        device = x.device if isinstance(x, torch.Tensor) else torch.device("cpu")
+        if isinstance(x, torch.Tensor):
+            x = x.detach().cpu().numpy()
+        output = self._run(np.ascontiguousarray(x, dtype=np.float32))
+        return torch.from_numpy(np.asarray(output)).to(device)
+
+    def eval(self):
+        return self
+
+    def to(self, *args, **kwargs):
+        return self
+
+    def __repr__(self):
+        return f"RuntimeModel(name={self.name!r}, backend={self.backend!r})"
+
+
+def create_runtime(onnx_path, backend="onnx"):
+    """
+    Create an inference function for an ONNX file.
+
+    Args:
+        onnx_path: Path to the ONNX model
+        backend: "openvino" to prefer OpenVINO, "onnx" for ONNX Runtime
+
+    Returns:
+        (run_fn, backend_name) tuple; run_fn maps a float32 array to an array
+    """
+    if backend == "openvino":
+        try:
+            import openvino as ov
+            core = ov.Core()
+            compiled = core.compile_model(onnx_path, "CPU")
+            output = compiled.output(0)
+            return (lambda x: compiled([x])[output]), "openvino"
+        except ImportError:
+            print("Warning: OpenVINO not installed, falling back to ONNX Runtime")
+
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        raise ImportError("onnxruntime not installed. Install with: pip install onnxruntime")
+
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    session = ort.InferenceSession(
+        onnx_path, sess_options=options, providers=["CPUExecutionProvider"]
+    )
+    input_name = session.get_inputs()[0].name
+    return (lambda x: session.run(None, {input_name: x})[0]), "onnx"
+
+
+def check_parity(torch_model, runtime_model, dummy_input, atol=PARITY_ATOL):
+    """
+    Compare runtime outputs against PyTorch outputs on the same input.
+
+    Used as a load-time guard in wrap_model(); the per-model parity tests
+    with fixed inputs are in tests/test_onnx_parity.py.
+
+    Args:
+        torch_model: Reference PyTorch model
+        runtime_model: RuntimeModel to validate
+        dummy_input: Input tensor
+        atol: Maximum allowed absolute difference
+
+    Returns:
+        (ok, max_diff) tuple
+    """
+    with torch.no_grad():
+        expected = torch_model(dummy_input).detach().cpu().numpy()
+    actual = runtime_model(dummy_input).cpu().numpy()
+    if expected.shape != actual.shape:
+        return False, float("inf")
+    max_diff = float(np.max(np.abs(expected - actual))) if expected.size else 0.0
+    return max_diff <= atol, max_diff
+
+
+def wrap_model(model, dummy_input, name, backend="onnx", dynamic_axes=None):
+    """
+    Export a PyTorch model and return a runtime-backed drop-in replacement.
+
+    Args:
+        model: torch.nn.Module in eval mode
+        dummy_input: Example input tensor (used for export and parity check)
+        name: Model name (cache file prefix and log messages)
+        backend: "torch", "onnx" or "openvino"
+        dynamic_axes: Optional dict of dynamic input axes
+
+    Returns:
+        RuntimeModel, or the original model if the backend is unavailable
+        or fails the parity check
+    """
+    if backend == "torch":
+        return model
+    if backend not in SUPPORTED_BACKENDS:
+        print(f"Warning: Unknown backend '{backend}' for {name}, using PyTorch")
+        return model
+
+    try:
+        onnx_path = export_onnx(model, dummy_input, name, dynamic_axes)
+        run_fn, backend_name = create_runtime(onnx_path, backend)
+        runtime_model = RuntimeModel(run_fn, name, backend_name)
+
+        ok, max_diff = check_parity(model, runtime_model, dummy_input)
+        if not ok:
+            print(f"Warning: {name} {backend_name} outputs differ from PyTorch "
+                  f"(max diff {max_diff:.2e}), using PyTorch")
+            return model
+
+        print(f"{name} running on {backend_name} backend (parity max diff {max_diff:.2e})")
+        return runtime_model
+    except Exception as e:
+        print(f"Warning: Could not enable {backend} backend for {name}: {e}. Using PyTorch.")
+        return model
+
+
+def _exported_yolo(path, names):
+    """
+    Load an exported model as a YOLO instance with the source model's names.
+
+    Ultralytics 8.0 returns None for YOLO.names of an exported model (only
+    its predictor knows them), but the pipeline reads yolo.names to resolve
+    class IDs (detect_n_track.tracked_class_ids).
+    """
+    from ultralytics import YOLO
+
+    class ExportedYOLO(YOLO):
+        @property
+        def names(self):
+            return names
+
+    return ExportedYOLO(path, task="detect")
+
+
+def export_yolo(yolo_model, backend="onnx"):
+    """
+    Export an Ultralytics YOLO model and load the exported copy.
+
+    The export is cached under ONNX_CACHE_DIR keyed by the checkpoint hash.
+    The returned object is an Ultralytics YOLO instance, so the existing
+    yolo(frame, conf=...) call signature and yolo.names keep working.
+
+    Args:
+        yolo_model: ultralytics.YOLO instance loaded from a .pt checkpoint
+        backend: "onnx" or "openvino"
+
+    Returns:
+        YOLO instance backed by the exported model, or the original model
+        if the export is unavailable or fails the parity check
+    """
+    if backend == "torch":
+        return yolo_model
+
+    try:
+        ckpt_path = getattr(yolo_model, "ckpt_path", None) or "yolov8n.pt"
+        stem = os.path.splitext(os.path.basename(ckpt_path))[0]
+        os.makedirs(ONNX_CACHE_DIR, exist_ok=True)
+
+        export_format = "openvino" if backend == "openvino" else "onnx"
+        suffix = "_openvino_model" if export_format == "openvino" else ".onnx"
+        cached_path = os.path.join(ONNX_CACHE_DIR, f"{stem}-{file_hash(ckpt_path)}{suffix}")
+
+        if not os.path.exists(cached_path):
+            print(f"Exporting YOLO to {export_format} (one-time, cached at {cached_path})...")
+            exported = yolo_model.export(format=export_format, imgsz=640)
+            shutil.move(str(exported), cached_path)
+            if os.path.isfile(f"{exported}.data"):
+                # Stale external-weights file of the torch exporter (the
+                # saved model has its weights inline)
+                os.remove(f"{exported}.data")
+
+        runtime_yolo = _exported_yolo(cached_path, yolo_model.names)
+
+        if export_format == "onnx":
+            # Compare raw head outputs of the PyTorch network and the ONNX graph
+            dummy_input = torch.rand(1, 3, 640, 640)
+            torch_net = yolo_model.model.eval()
+            raw_torch = lambda x: torch_net(x)[0]
+            run_fn, _ = create_runtime(cached_path, "onnx")
+            ok, max_diff = check_parity(
+                raw_torch, RuntimeModel(run_fn, "yolo", "onnx"), dummy_input, atol=1e-2
+            )
+            if not ok:
+                print(f"Warning: YOLO ONNX outputs differ from PyTorch "
+                      f"(max diff {max_diff:.2e}), using PyTorch")
+                return yolo_model
+
+        print(f"YOLO running on {export_format} backend")
+        return runtime_yolo
+    except Exception as e:
+        print(f"Warning: Could not enable {backend} backend for YOLO: {e}. Using PyTorch.")
+        return yolo_model
@@ -0,0 +1,238 @@
+"""
+INT8 Quantization Module
+
+Post-training INT8 quantization for the CPU models (FaceNet, ResNet-50,
+Zero-DCE):
+- "dynamic": weights of Linear layers quantized ahead of time, activations
+  quantized on the fly. No calibration needed. Only FaceNet has Linear
+  layers worth quantizing; ResNet-50 (fc removed) and Zero-DCE are all
+  convolutions, so dynamic mode is refused for them - use "static".
+- "static": FX graph mode post-training quantization of convolutions and
+  linear layers. Activation ranges are calibrated on sample frames/faces.
+
+Quantized kernels only run on CPU. Any failure falls back to the fp32 model.
+Use benchmarks/quantization_report.py to compare fp32 vs int8 before
+enabling a model in production.
+"""
+import copy
+import os
+
+import cv2
+import numpy as np
+import torch
+
+# Configuration
+QUANTIZATION_MODES = ("none", "dynamic", "static")
+CALIBRATION_FRAMES_DIR = os.getenv("CALIBRATION_FRAMES_DIR", "calibration/frames")
+CALIBRATION_FACES_DIR = os.getenv("CALIBRATION_FACES_DIR", "calibration/faces")
+CALIBRATION_LIMIT = 64  # Max images used for calibration
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+# Layer types quantize_dynamic() converts
+DYNAMIC_QUANTIZABLE = (torch.nn.Linear,)
+
+# Model input sizes used for calibration
+FACE_SIZE = 160
+SCENE_SIZE = 224
+ZERODCE_CALIBRATION_SIZE = 256
+
+
+def _select_engine():
+    """Select the best available quantized CPU engine."""
+    engines = torch.backends.quantized.supported_engines
+    for engine in ("x86", "fbgemm", "qnnpack"):
+        if engine in engines:
+            torch.backends.quantized.engine = engine
+            return engine
+    return torch.backends.quantized.engine
+
+
+def load_images(directory, limit=CALIBRATION_LIMIT):
+    """
+    Load BGR images from a directory (searched recursively).
+
+    Args:
+        directory: Directory containing images
+        limit: Maximum number of images to load
+
+    Returns:
+        List of BGR images (numpy arrays)
+    """
+    images = []
+    if not directory or not os.path.isdir(directory):
+        return images
+
+    for root, _, files in sorted(os.walk(directory)):
+        for filename in sorted(files):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            img = cv2.imread(os.path.join(root, filename))
+            if img is not None:
+                images.append(img)
+            if len(images) >= limit:
+                return images
+    return images
+
+
+def face_to_tensor(face_bgr):
+    """
+    Convert a BGR face crop to a FaceNet input tensor.
+
+    Uses the same fixed standardization as MTCNN.extract: (x - 127.5) / 128.
+    """
+    face = cv2.resize(face_bgr, (FACE_SIZE, FACE_SIZE))
+    face = cv2.cvtColor(face, cv2.COLOR_BGR2RGB).astype(np.float32)
+    face = (face - 127.5) / 128.0
+    return torch.from_numpy(face).permute(2, 0, 1).unsqueeze(0)
+
+
+def frame_to_tensor(frame_bgr, size):
+    """
+    Convert a BGR frame to a [0, 1] RGB tensor of shape (1, 3, size, size).
+    """
+    img = cv2.resize(frame_bgr, (size, size), interpolation=cv2.INTER_AREA)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+    return torch.from_numpy(img).permute(2, 0, 1).unsqueeze(0)
+
+
+def calibration_inputs(name, frames=None, faces=None):
+    """
+    Build calibration input tensors for a model.
+
+    Args:
+        name: Model name ("facenet", "resnet" or "zerodce")
+        frames: Optional list of BGR frames (default: CALIBRATION_FRAMES_DIR)
+        faces: Optional list of BGR face crops (default: CALIBRATION_FACES_DIR)
+
+    Returns:
+        List of input tensors (may be empty if no calibration data exists)
+    """
+    if name == "facenet":
+        if faces is None:
+            faces = load_images(CALIBRATION_FACES_DIR)
+        return [face_to_tensor(face) for face in faces]
+
+    if frames is None:
+        frames = load_images(CALIBRATION_FRAMES_DIR)
+    if name == "resnet":
+        # Same preprocessing as the pipeline's scene embedding stage
+        from app.pipelines.scene_understanding import preprocess_scene
+        return [preprocess_scene(frame, SCENE_SIZE) for frame in frames]
+    if name == "zerodce":
+        return [frame_to_tensor(frame, ZERODCE_CALIBRATION_SIZE) for frame in frames]
+    return []
+
+
+def dynamic_quantizable_layers(model):
+    """Number of layers of a model that dynamic quantization would convert."""
+    return sum(1 for m in model.modules() if type(m) in DYNAMIC_QUANTIZABLE)
+
+
+def quantized_layers(model):
+    """Number of INT8 layers in a (possibly) quantized model."""
+    return sum(1 for m in model.modules()
+               if ".quantized" in type(m).__module__ and "PackedParams" not in type(m).__name__)
+
+
+def quantize_dynamic(model):
+    """
+    Apply dynamic INT8 quantization to the Linear layers of a model.
+
+    Args:
+        model: fp32 torch.nn.Module
+
+    Returns:
+        Quantized copy of the model
+
+    Raises:
+        ValueError: If the model has no Linear layers (the result would be
+            identical to the fp32 model)
+    """
+    if dynamic_quantizable_layers(model) == 0:
+        raise ValueError("no Linear layers, dynamic quantization would change nothing "
+                         "(use static quantization)")
+    _select_engine()
+    return torch.ao.quantization.quantize_dynamic(
+        copy.deepcopy(model).eval(), set(DYNAMIC_QUANTIZABLE), dtype=torch.qint8
+    )
+
+
+@torch.no_grad()
+def quantize_static(model, calibration_data):
+    """
+    Apply static post-training INT8 quantization (FX graph mode).
+
+    Args:
+        model: fp32 torch.nn.Module
+        calibration_data: Non-empty list of representative input tensors
+
+    Returns:
+        Quantized copy of the model
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    if not calibration_data:
+        raise ValueError("static quantization requires calibration data")
+
+    engine = _select_engine()
+    qconfig_mapping = get_default_qconfig_mapping(engine)
+    prepared = prepare_fx(
+        copy.deepcopy(model).eval(), qconfig_mapping, (calibration_data[0],)
+    )
+
+    # Calibration: observe activation ranges on representative inputs
+    for inputs in calibration_data:
+        prepared(inputs)
+
+    return convert_fx(prepared)
+
+
+def quantize_model(model, name, mode="dynamic", calibration_data=None, device="cpu"):
+    """
+    Quantize a model, falling back to fp32 on any failure.
+
+    Args:
+        model: fp32 torch.nn.Module
+        name: Model name ("facenet", "resnet" or "zerodce")
+        mode: "none", "dynamic" or "static"
+        calibration_data: Optional list of calibration tensors (static mode);
+            built from the calibration directories if not given
+        device: Device the pipeline runs on (quantized models are CPU-only)
+
+    Returns:
+        Quantized model, or the original model
+    """
+    if mode in (None, "none"):
+        return model
+    if mode not in QUANTIZATION_MODES:
+        print(f"Warning: Unknown quantization mode '{mode}' for {name}, using fp32")
+        return model
+    if device != "cpu":
+        print(f"Warning: INT8 quantization is CPU-only, keeping fp32 {name} on {device}")
+        return model
+    if not isinstance(model, torch.nn.Module):
+        print(f"Warning: {name} is not a PyTorch model, skipping quantization")
+        return model
+
+    if mode == "dynamic" and dynamic_quantizable_layers(model) == 0:
+        print(f"Warning: {name} has no Linear layers, so dynamic quantization would change "
+              f"nothing. Use MODEL_QUANTIZATION={name}=static. Keeping fp32.")
+        return model
+
+    try:
+        if mode == "dynamic":
+            quantized = quantize_dynamic(model)
+        else:
+            if calibration_data is None:
+                calibration_data = calibration_inputs(name)
+            if not calibration_data:
+                print(f"Warning: No calibration data for {name} "
+                      f"(see CALIBRATION_FRAMES_DIR / CALIBRATION_FACES_DIR), using fp32")
+                return model
+            quantized = quantize_static(model, calibration_data)
+        print(f"{name} quantized to INT8 ({mode}, {quantized_layers(quantized)} layers)")
+        return quantized
+    except Exception as e:
+        print(f"Warning: INT8 quantization of {name} failed: {e}. Using fp32.")
+        return model
@@ -1,10 +1,13 @@
 import torch
 from torchvision import models
 
-def load_resnet():
+def load_resnet(backend="torch"):
     """
     Load ResNet-50 model for scene feature extraction.
     Works with multiple torch/torchvision versions.
+
+    Args:
+        backend: Inference backend ("torch", "onnx" or "openvino")
     """
     try:
         import torchvision
@@ -32,6 +35,15 @@ def load_resnet():
         # Remove final classification layer to get features
         # Keep all layers except the last FC layer
         model = torch.nn.Sequential(*list(model.children())[:-1])
+        if backend != "torch":
+            from app.models.onnx_backend import wrap_model
+            model = wrap_model(
+                model,
+                torch.rand(1, 3, 224, 224),
+                "resnet50",
+                backend,
+                dynamic_axes={"input": {0: "batch", 2: "height", 3: "width"}}
+            )
         print("ResNet-50 model loaded successfully")
         return model
     except Exception as e:
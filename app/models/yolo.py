@@ -1,10 +1,22 @@
-def load_yolo():
+import os
+
+# Weights file; a pose model (e.g. yolov8n-pose.pt) also provides head keypoints
+YOLO_WEIGHTS = os.getenv("YOLO_WEIGHTS", "yolov8n.pt")
+
+
+def load_yolo(backend="torch"):
     """
     Load YOLOv8 model for object detection.
+
+    Args:
+        backend: Inference backend ("torch", "onnx" or "openvino")
     """
     try:
         from ultralytics import YOLO
-        model = YOLO("yolov8n.pt")  # fast + realtime
+        model = YOLO(YOLO_WEIGHTS)  # yolov8n: fast + realtime
+        if backend != "torch":
+            from app.models.onnx_backend import export_yolo
+            model = export_yolo(model, backend)
         print("YOLOv8 model loaded successfully")
         return model
     except ImportError:
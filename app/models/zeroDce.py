@@ -11,6 +11,22 @@ _zerodce_model = None
 _zerodce_available = False
 _zerodce_initialized = False
 
+# -----------------------------
+# Configuration
+# -----------------------------
+# "downscaled": estimate the curve maps on a small copy of the frame and apply
+#               the curves at full resolution (Zero-DCE++ style)
+# "full":       run the network on the full-resolution frame
+ZERODCE_MODE = os.getenv("ZERODCE_MODE", "downscaled")
+ZERODCE_ESTIMATE_SIZE = 256       # Longest side of the copy used for curve estimation
+ZERODCE_ITERATIONS = 8            # Curve iterations (Zero-DCE uses 8)
+ZERODCE_CACHE_DELTA = 3.0         # Reuse cached curves while brightness changes less than this
+ZERODCE_CACHE_MAX_AGE = 30        # ... and for at most this many frames
+
+# Cached curve maps per camera: {camera_id: {"curves", "brightness", "age"}}
+_curve_cache = {}
+_curves_supported = True
+
 
 def _initialize_zerodce():
     """Lazy initialization of Zero-DCE model."""
@@ -43,17 +59,154 @@ def _initialize_zerodce():
         print(f"Warning: Error loading Zero-DCE model: {e}. Low-light enhancement will be disabled.")
 
 
+def quantize_zerodce(mode="static", calibration_data=None):
+    """
+    Replace the loaded Zero-DCE model with an INT8 quantized copy.
+
+    Args:
+        mode: Quantization mode ("dynamic" or "static")
+        calibration_data: Optional list of calibration tensors
+
+    Returns:
+        True if Zero-DCE is available (quantized or fp32 fallback), False otherwise
+    """
+    global _zerodce_model
+
+    _initialize_zerodce()
+    if not _zerodce_available or _zerodce_model is None:
+        return False
+
+    from app.models.quantize import quantize_model
+    _zerodce_model = quantize_model(_zerodce_model, "zerodce", mode, calibration_data, _device)
+    return True
+
+
+def get_zerodce_model():
+    """Return the loaded Zero-DCE model (or None if not available)."""
+    _initialize_zerodce()
+    return _zerodce_model
+
+
+def _estimate_curves(small_rgb):
+    """
+    Run the Zero-DCE network on a small RGB image and return its curve maps.
+
+    Zero-DCE returns the 8 per-iteration maps concatenated (24 channels);
+    Zero-DCE++ returns a single 3-channel map applied at every iteration.
+
+    Returns:
+        float32 array (h, w, 3 * iterations) or (h, w, 3), RGB channel order
+    """
+    img = torch.from_numpy(np.ascontiguousarray(small_rgb)).permute(2, 0, 1).unsqueeze(0)
+    img = img.float().div_(255.0).to(_device)
+    outputs = _zerodce_model(img)
+    curves = outputs[-1] if isinstance(outputs, (tuple, list)) else None
+    if curves is None or curves.dim() != 4 or curves.shape[1] not in (3, 3 * ZERODCE_ITERATIONS):
+        raise ValueError("Zero-DCE model does not expose its curve maps")
+    return np.ascontiguousarray(curves[0].permute(1, 2, 0).float().cpu().numpy())
+
+
+def apply_curves(bgr, curves, iterations=ZERODCE_ITERATIONS, dst=None):
+    """
+    Apply light-enhancement curves to a full-resolution BGR image.
+
+    Each iteration computes x = x + r * (x^2 - x) in place, with the curve
+    map r upsampled (bilinear) to the image size. Maps are upsampled one at
+    a time to keep memory at one full-resolution map.
+
+    Args:
+        bgr: uint8 BGR image (H, W, 3)
+        curves: Curve maps from _estimate_curves (RGB channel order)
+        iterations: Number of curve iterations
+        dst: Optional uint8 output buffer
+
+    Returns:
+        Enhanced uint8 BGR image
+    """
+    h, w = bgr.shape[:2]
+
+    def upsample(r):
+        # RGB maps -> BGR order to match the frame
+        return cv2.resize(np.ascontiguousarray(r[:, :, ::-1]), (w, h), interpolation=cv2.INTER_LINEAR)
+
+    if curves.shape[2] == 3:
+        # Zero-DCE++: one map shared by every iteration, upsampled once
+        shared = upsample(curves)
+        maps = [shared] * iterations
+    else:
+        # Zero-DCE: one map per iteration, upsampled lazily
+        maps = (upsample(curves[:, :, i:i + 3]) for i in range(0, curves.shape[2], 3))
+
+    x = bgr.astype(np.float32)
+    x *= 1.0 / 255.0
+    tmp = np.empty_like(x)
+    for r in maps:
+        np.multiply(x, x, out=tmp)
+        tmp -= x
+        tmp *= r
+        x += tmp
+
+    # LE-curves map [0, 1] onto [0, 1]; saturate back to uint8
+    return cv2.convertScaleAbs(x, dst=dst, alpha=255.0)
+
+
+def _enhance_downscaled(bgr, camera_id, dst=None):
+    """
+    Zero-DCE++ style enhancement: curves estimated on a small copy, cached per
+    camera while the brightness stays about the same, applied at full resolution.
+    """
+    h, w = bgr.shape[:2]
+    scale = min(1.0, ZERODCE_ESTIMATE_SIZE / max(h, w))
+    small = cv2.resize(bgr, (max(1, int(w * scale)), max(1, int(h * scale))),
+                       interpolation=cv2.INTER_AREA)
+    brightness = float(small.mean())
+
+    cached = _curve_cache.get(camera_id)
+    if (cached is not None
+            and abs(cached["brightness"] - brightness) < ZERODCE_CACHE_DELTA
+            and cached["age"] < ZERODCE_CACHE_MAX_AGE):
+        cached["age"] += 1
+        curves = cached["curves"]
+    else:
+        curves = _estimate_curves(cv2.cvtColor(small, cv2.COLOR_BGR2RGB))
+        _curve_cache[camera_id] = {"curves": curves, "brightness": brightness, "age": 0}
+
+    return apply_curves(bgr, curves, dst=dst)
+
+
+def reset_curve_cache(camera_id=None):
+    """Drop cached curve maps (for one camera or all)."""
+    if camera_id is None:
+        _curve_cache.clear()
+    else:
+        _curve_cache.pop(camera_id, None)
+
+
 @torch.no_grad()
-def zerodce_enhance(frame):
+def zerodce_enhance(frame, camera_id=None):
     """
     Enhance low-light image using Zero-DCE.
     
+    In "downscaled" mode (ZERODCE_MODE) the network only sees a small copy of
+    the frame; its curve maps are upsampled and applied at full resolution and
+    reused for following frames while the brightness barely changes.
+    
     Args:
-        frame: OpenCV BGR image
+        frame: OpenCV BGR image or FrameContext (reuses its RGB view)
+        camera_id: Camera identifier for the curve cache (default: the
+            FrameContext's camera, or a shared entry)
     
     Returns:
         enhanced BGR image (or original if Zero-DCE not available)
     """
+    global _curves_supported
+
+    ctx = frame if hasattr(frame, "rgb") else None
+    if ctx is not None:
+        frame = ctx.bgr
+        if camera_id is None:
+            camera_id = ctx.camera_id
+
     # Lazy initialization
     _initialize_zerodce()
     
@@ -62,26 +215,30 @@ def zerodce_enhance(frame):
         return frame
 
     try:
-        # BGR → RGB
-        img = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-        # Normalize
-        img = img.astype(np.float32) / 255.0
+        # Output goes into a reused buffer when running with a FrameContext
+        dst = ctx.pool.get("zerodce", frame.shape) if ctx is not None else None
 
-        # HWC → CHW → Tensor
-        img = torch.from_numpy(img).permute(2, 0, 1).unsqueeze(0)
-        img = img.to(_device)
+        if ZERODCE_MODE == "downscaled" and _curves_supported:
+            try:
+                return _enhance_downscaled(frame, camera_id, dst=dst)
+            except ValueError as e:
+                print(f"Warning: {e}. Falling back to full-resolution Zero-DCE.")
+                _curves_supported = False
 
-        # Zero-DCE forward
-        enhanced, _ = _zerodce_model(img)
+        # Full-resolution forward pass
+        # BGR → RGB
+        rgb = ctx.rgb if ctx is not None else cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        img = torch.from_numpy(rgb).permute(2, 0, 1).unsqueeze(0).float().div_(255.0)
+        outputs = _zerodce_model(img.to(_device))
+        # (enhanced, curves), or Zero-DCE's (intermediate, enhanced, curves)
+        enhanced = outputs[-2] if isinstance(outputs, (tuple, list)) else outputs
 
         # Tensor → image
         enhanced = enhanced.squeeze(0).permute(1, 2, 0)
-        enhanced = enhanced.clamp(0, 1).cpu().numpy()
-        enhanced = (enhanced * 255).astype(np.uint8)
+        enhanced = enhanced.clamp_(0, 1).mul_(255).to(torch.uint8).cpu().numpy()
 
         # RGB → BGR
-        return cv2.cvtColor(enhanced, cv2.COLOR_RGB2BGR)
+        return cv2.cvtColor(enhanced, cv2.COLOR_RGB2BGR, dst=dst)
     except Exception as e:
         print(f"Warning: Error in Zero-DCE enhancement: {e}. Returning original frame.")
         return frame
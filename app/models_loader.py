@@ -4,8 +4,9 @@ Model Loader Module
 Centralized model loading utility for the surveillance pipeline.
 Loads all required and optional models, handling errors gracefully.
 """
+import os
 import torch
-from app.models.zeroDce import zerodce_enhance
+from app.models.zeroDce import zerodce_enhance, quantize_zerodce, get_zerodce_model
 from app.models.yolo import load_yolo
 from app.models.deepsort import load_deepsort
 from app.models.mask2former import load_mask2former
@@ -13,12 +14,111 @@ from app.models.resnet import load_resnet
 from app.models.mtcnn import load_mtcnn
 from app.models.gan_sr import load_srgan
 from app.models.facenet import load_facenet
+from app.models.quantize import quantize_model
 
+# Load order and display names of all pipeline models
+MODEL_NAMES = {
+    "yolo": "YOLO",
+    "deepsort": "DeepSORT",
+    "mask2former": "Mask2Former",
+    "resnet": "ResNet",
+    "mtcnn": "MTCNN",
+    "facenet": "FaceNet",
+    "gan": "GAN",
+    "zerodce": "Zero-DCE"
+}
+# Models the pipeline cannot run without; the rest may be None
+REQUIRED_MODELS = ("yolo", "deepsort", "resnet", "mtcnn", "facenet")
+# Models that support an alternative inference backend (see app/models/onnx_backend.py)
+BACKEND_MODELS = ("yolo", "facenet", "resnet")
+# Models that support INT8 quantization (see app/models/quantize.py)
+QUANTIZABLE_MODELS = ("facenet", "resnet", "zerodce")
 
-def load_all_models():
+
+def parse_model_options(spec):
+    """
+    Parse a per-model option string such as "yolo=onnx,facenet=openvino".
+
+    Args:
+        spec: Comma-separated list of model=value pairs
+
+    Returns:
+        dict: Mapping model name -> option value
+    """
+    options = {}
+    for item in spec.split(","):
+        if "=" not in item:
+            continue
+        name, value = item.split("=", 1)
+        options[name.strip().lower()] = value.strip().lower()
+    return options
+
+
+# Default backend per model, overridable with MODEL_BACKENDS env variable
+MODEL_BACKENDS = parse_model_options(os.getenv("MODEL_BACKENDS", ""))
+# Default INT8 mode per model, e.g. MODEL_QUANTIZATION="facenet=dynamic,resnet=static"
+MODEL_QUANTIZATION = parse_model_options(os.getenv("MODEL_QUANTIZATION", ""))
+
+
+def get_device():
+    """Return the torch device string used by the pipeline ("cuda" or "cpu")."""
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def load_model(name, device="cpu", backends=None, quantization=None):
+    """
+    Load a single pipeline model by name.
+    
+    Args:
+        name: Model key (see MODEL_NAMES)
+        device: Device string ("cuda" or "cpu")
+        backends: Optional dict of inference backend per model (default: MODEL_BACKENDS)
+        quantization: Optional dict of INT8 mode per model (default: MODEL_QUANTIZATION)
+    
+    Returns:
+        The loaded model (None for optional models that are not available)
+    
+    Raises:
+        Exception: If the model fails to load
+    """
+    if backends is None:
+        backends = MODEL_BACKENDS
+    if quantization is None:
+        quantization = MODEL_QUANTIZATION
+
+    if name == "yolo":
+        return load_yolo(backends.get("yolo", "torch"))
+    if name == "deepsort":
+        return load_deepsort(device=device)
+    if name == "mask2former":
+        return load_mask2former()
+    if name == "resnet":
+        model = load_resnet(backends.get("resnet", "torch"))
+        return quantize_model(model, "resnet", quantization.get("resnet"), device=device)
+    if name == "mtcnn":
+        return load_mtcnn(device)
+    if name == "facenet":
+        model = load_facenet(backends.get("facenet", "torch"))
+        return quantize_model(model, "facenet", quantization.get("facenet"), device=device)
+    if name == "gan":
+        return load_srgan(device)  # May return None
+    if name == "zerodce":
+        # Zero-DCE is held globally in zeroDce.py; this only initializes it
+        if quantization.get("zerodce", "none") != "none":
+            quantize_zerodce(quantization["zerodce"])
+        else:
+            get_zerodce_model()
+        return None
+    raise ValueError(f"Unknown model: {name}")
+
+
+def load_all_models(backends=None, quantization=None):
     """
     Load all models required for the surveillance pipeline.
     
+    Models are loaded one after another. For background, concurrent loading
+    see app/model_registry.py.
+    
     Required models (will raise exception if not available):
     - YOLO: Object detection
     - DeepSORT: Multi-object tracking
@@ -31,6 +131,16 @@ def load_all_models():
     - Zero-DCE: Low-light enhancement
     - GAN: Face super-resolution
     
+    Args:
+        backends: Optional dict selecting the inference backend per model,
+            e.g. {"yolo": "onnx", "facenet": "openvino"}. Supported for
+            yolo, facenet and resnet; defaults to MODEL_BACKENDS ("torch").
+        quantization: Optional dict selecting INT8 quantization per model,
+            e.g. {"facenet": "dynamic", "resnet": "static"}. Supported for
+            facenet, resnet and zerodce (CPU only); defaults to
+            MODEL_QUANTIZATION (fp32). Ignored for models using a non-torch
+            backend.
+    
     Returns:
         dict: Dictionary containing all loaded models with keys:
             - "yolo": YOLOv8 model
@@ -46,58 +156,33 @@ def load_all_models():
     Raises:
         Exception: If any required model fails to load
     """
-    device = "cuda" if torch.cuda.is_available() else "cpu"
+    device = get_device()
     print(f"Loading models on device: {device}")
     print("=" * 60)
 
+    if backends is None:
+        backends = MODEL_BACKENDS
+    for name, backend in backends.items():
+        if name in BACKEND_MODELS and backend != "torch":
+            print(f"Using {backend} backend for {name}")
+
     models = {}
     
-    # Required models (will raise exception if not available)
-    try:
-        models["yolo"] = load_yolo()
-    except Exception as e:
-        print(f"ERROR: Failed to load YOLO: {e}")
-        raise
-    
-    try:
-        models["deepsort"] = load_deepsort()
-    except Exception as e:
-        print(f"ERROR: Failed to load DeepSORT: {e}")
-        raise
-    
-    # Mask2Former is optional (can be None if not available)
-    try:
-        models["mask2former"] = load_mask2former()
-    except Exception as e:
-        print(f"WARNING: Failed to load Mask2Former: {e}")
-        print("Continuing without Mask2Former - scene segmentation will be disabled")
-        models["mask2former"] = None
-    
-    try:
-        models["resnet"] = load_resnet()
-    except Exception as e:
-        print(f"ERROR: Failed to load ResNet: {e}")
-        raise
-    
-    try:
-        models["mtcnn"] = load_mtcnn(device)
-    except Exception as e:
-        print(f"ERROR: Failed to load MTCNN: {e}")
-        raise
-    
-    try:
-        models["facenet"] = load_facenet()
-    except Exception as e:
-        print(f"ERROR: Failed to load FaceNet: {e}")
-        raise
-    
-    # Optional models (can be None)
-    models["gan"] = load_srgan(device)  # May return None
-    models["zerodce"] = None  # Zero-DCE is loaded globally in zeroDce.py
+    for name, display_name in MODEL_NAMES.items():
+        try:
+            models[name] = load_model(name, device, backends, quantization)
+        except Exception as e:
+            if name in REQUIRED_MODELS:
+                # Required models (will raise exception if not available)
+                print(f"ERROR: Failed to load {display_name}: {e}")
+                raise
+            # Optional models (can be None)
+            print(f"WARNING: Failed to load {display_name}: {e}")
+            print(f"Continuing without {display_name}")
+            models[name] = None
     
     models["device"] = device
     
     print("=" * 60)
     print("All required models loaded successfully")
     return models
-
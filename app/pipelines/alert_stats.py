@@ -0,0 +1,288 @@
+"""
+Alert Statistics Module
+
+Alert counts for the dashboard without scanning the alerts table:
+- record_alert() adds each new alert to its (camera, type, hour) row of
+  the alert_rollups table and to its (camera, type) row of the
+  alert_totals table, in the same transaction as the alert itself
+- get_alert_stats() reads the totals (one row per camera and type) and
+  caches the result for STATS_CACHE_TTL seconds; the hourly rollups only
+  serve the timeline (get_alert_timeline)
+- if the rollup table is unusable, alert_counts() falls back to one
+  GROUP BY over the alerts table (served by its composite indexes)
+
+On first use, rollups and totals are built from existing alerts with a
+single GROUP BY (rebuild_rollups), so older databases are covered too; a
+database that has rollups but no totals gets its totals from the rollups.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func
+
+from utils.db import SessionLocal, Alert, AlertRollup, AlertTotal, Person, engine
+
+# Configuration
+STATS_CACHE_TTL = 2.0  # Seconds a stats response is reused (per process)
+
+# Alert types shown on the dashboard -> response keys
+ALERT_TYPE_KEYS = {
+    "STATIONARY": "stationary",
+    "RESTRICTED_ZONE": "restricted_zone",
+    "UNKNOWN_PERSON": "unknown_person"
+}
+
+_cache = {}  # camera_id -> (timestamp, stats)
+_cache_lock = threading.Lock()
+_rollups_checked = False
+
+
+def bucket_start(timestamp):
+    """Start of the hour bucket of a datetime."""
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+def _upsert_row(db, model, key, count):
+    """Add count to a counter row, creating it if needed (one statement where supported)."""
+    dialect = engine.dialect.name
+    values = dict(key, count=count)
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(model).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(key),
+            set_={"count": model.count + stmt.excluded.count}
+        )
+        db.execute(stmt)
+        return
+    row = db.get(model, tuple(key.values()))
+    if row is None:
+        db.add(model(**values))
+    else:
+        row.count += count
+
+
+def _upsert(db, camera_id, alert_type, bucket, count=1):
+    """Add count to the hourly rollup row and the running total of a camera and type."""
+    _upsert_row(db, AlertRollup, {"camera_id": camera_id, "alert_type": alert_type, "bucket": bucket}, count)
+    _upsert_row(db, AlertTotal, {"camera_id": camera_id, "alert_type": alert_type}, count)
+
+
+def record_alert(db, camera_id, alert_type, created_at):
+    """
+    Count a new alert in its rollup and total rows (call before committing the alert).
+
+    Args:
+        db: Session the alert is being added in
+        camera_id: Camera identifier
+        alert_type: Type of alert
+        created_at: Alert timestamp
+    """
+    _ensure_rollups()  # Backfill older alerts before the first new row appears
+    _upsert(db, str(camera_id), alert_type, bucket_start(created_at))
+    invalidate_cache()
+
+
+def invalidate_cache():
+    """Drop cached stats (new alerts written by this process)."""
+    with _cache_lock:
+        _cache.clear()
+
+
+def rebuild_rollups():
+    """
+    Recompute the rollup and totals tables from the alerts table with one GROUP BY.
+
+    Counts of alerts already archived by utils/retention.py are lost.
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    db = SessionLocal()
+    try:
+        if engine.dialect.name == "postgresql":
+            hour = func.date_trunc("hour", Alert.created_at)
+        else:
+            hour = func.strftime("%Y-%m-%d %H:00:00", Alert.created_at)
+        rows = (db.query(Alert.camera_id, Alert.alert_type, hour, func.count(Alert.id))
+                .filter(Alert.created_at.isnot(None))
+                .group_by(Alert.camera_id, Alert.alert_type, hour)
+                .all())
+        db.query(AlertRollup).delete()
+        db.query(AlertTotal).delete()
+        totals = {}
+        for camera_id, alert_type, bucket, count in rows:
+            if isinstance(bucket, str):
+                bucket = datetime.strptime(bucket, "%Y-%m-%d %H:%M:%S")
+            db.add(AlertRollup(camera_id=camera_id, alert_type=alert_type, bucket=bucket, count=count))
+            totals[(camera_id, alert_type)] = totals.get((camera_id, alert_type), 0) + count
+        for (camera_id, alert_type), count in totals.items():
+            db.add(AlertTotal(camera_id=camera_id, alert_type=alert_type, count=count))
+        db.commit()
+        invalidate_cache()
+        return len(rows)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def _totals_from_rollups(db):
+    """Fill an empty totals table from the hourly rollups (keeps archived counts)."""
+    rows = (db.query(AlertRollup.camera_id, AlertRollup.alert_type, func.sum(AlertRollup.count))
+            .group_by(AlertRollup.camera_id, AlertRollup.alert_type)
+            .all())
+    for camera_id, alert_type, count in rows:
+        db.add(AlertTotal(camera_id=camera_id, alert_type=alert_type, count=int(count or 0)))
+    db.commit()
+    invalidate_cache()
+    return len(rows)
+
+
+def _ensure_rollups():
+    """Build rollups and totals once per process if alerts exist but were never rolled up."""
+    global _rollups_checked
+    if _rollups_checked:
+        return
+    db = SessionLocal()
+    try:
+        no_totals = db.query(AlertTotal).first() is None
+        no_rollups = no_totals and db.query(AlertRollup).first() is None
+        if no_totals and not no_rollups:
+            print(f"Alert stats: built {_totals_from_rollups(db)} total rows from the rollups")
+        missing = no_rollups and db.query(Alert.id).first() is not None
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+    if missing:
+        print(f"Alert stats: built {rebuild_rollups()} rollup rows from existing alerts")
+    _rollups_checked = True
+
+
+def alert_counts(db, camera_id=None):
+    """
+    Alert counts per type with one GROUP BY over the alerts table (fallback).
+
+    Args:
+        db: Session
+        camera_id: Optional camera filter
+
+    Returns:
+        dict: alert_type -> count
+    """
+    query = db.query(Alert.alert_type, func.count(Alert.id))
+    if camera_id:
+        query = query.filter(Alert.camera_id == str(camera_id))
+    return dict(query.group_by(Alert.alert_type).all())
+
+
+def total_counts(db, camera_id=None):
+    """
+    Alert counts per type from the totals table (one row per camera and type).
+
+    Args:
+        db: Session
+        camera_id: Optional camera filter
+
+    Returns:
+        dict: alert_type -> count
+    """
+    query = db.query(AlertTotal.alert_type, func.sum(AlertTotal.count))
+    if camera_id:
+        query = query.filter(AlertTotal.camera_id == str(camera_id))
+    return {alert_type: int(count or 0) for alert_type, count in query.group_by(AlertTotal.alert_type).all()}
+
+
+def rollup_counts(db, camera_id=None, since=None):
+    """
+    Alert counts per type from the hourly rollup table.
+
+    Args:
+        db: Session
+        camera_id: Optional camera filter
+        since: Optional datetime; only buckets from its hour on
+
+    Returns:
+        dict: alert_type -> count
+    """
+    query = db.query(AlertRollup.alert_type, func.sum(AlertRollup.count))
+    if camera_id:
+        query = query.filter(AlertRollup.camera_id == str(camera_id))
+    if since is not None:
+        query = query.filter(AlertRollup.bucket >= bucket_start(since))
+    return {alert_type: int(count or 0) for alert_type, count in query.group_by(AlertRollup.alert_type).all()}
+
+
+def get_alert_stats(camera_id=None):
+    """
+    Dashboard statistics (cached for STATS_CACHE_TTL seconds).
+
+    Args:
+        camera_id: Optional camera filter
+
+    Returns:
+        dict with total_alerts, total_persons and alerts_by_type
+    """
+    now = time.monotonic()
+    with _cache_lock:
+        cached = _cache.get(camera_id)
+        if cached is not None and now - cached[0] < STATS_CACHE_TTL:
+            return cached[1]
+
+    db = SessionLocal()
+    try:
+        try:
+            _ensure_rollups()
+            counts = total_counts(db, camera_id)
+        except Exception as e:
+            print(f"Warning: Alert totals unavailable ({e}), counting alerts directly")
+            db.rollback()
+            counts = alert_counts(db, camera_id)
+        total_persons = db.query(func.count(Person.id)).scalar() or 0
+    finally:
+        db.close()
+
+    stats = {
+        "total_alerts": sum(counts.values()),
+        "total_persons": total_persons,
+        "alerts_by_type": {key: counts.get(alert_type, 0) for alert_type, key in ALERT_TYPE_KEYS.items()}
+    }
+    with _cache_lock:
+        _cache[camera_id] = (now, stats)
+    return stats
+
+
+def get_alert_timeline(camera_id=None, hours=24):
+    """
+    Alert counts per hour and type for the last `hours` hours.
+
+    Args:
+        camera_id: Optional camera filter
+        hours: Number of hours to return
+
+    Returns:
+        List of {"bucket": iso hour, "counts": {alert_type: n}}, oldest first
+    """
+    since = bucket_start(datetime.utcnow()) - timedelta(hours=max(0, hours - 1))
+    db = SessionLocal()
+    try:
+        _ensure_rollups()
+        query = (db.query(AlertRollup.bucket, AlertRollup.alert_type, func.sum(AlertRollup.count))
+                 .filter(AlertRollup.bucket >= since))
+        if camera_id:
+            query = query.filter(AlertRollup.camera_id == str(camera_id))
+        rows = query.group_by(AlertRollup.bucket, AlertRollup.alert_type).all()
+    finally:
+        db.close()
+
+    timeline = {}
+    for bucket, alert_type, count in rows:
+        timeline.setdefault(bucket, {})[alert_type] = int(count or 0)
+    return [{"bucket": bucket.isoformat(), "counts": counts} for bucket, counts in sorted(timeline.items())]
@@ -4,10 +4,46 @@ Database Writer Module
 Handles all database write operations for the surveillance system.
 Provides functions to save alerts, detections, and retrieve stored data.
 """
+import time
+
+from sqlalchemy import select, tuple_
+
 from utils.db import SessionLocal, Alert, Person
+from utils.metrics import observe
+from app.pipelines.alert_stats import record_alert
 from datetime import datetime
 
-def save_alert(camera_id, track_id, alert_type, description):
+# Alert columns in API order (alert_to_dict, get_alerts(rows=True))
+ALERT_FIELDS = ("id", "camera_id", "track_id", "alert_type", "description", "zone",
+                "person_id", "confidence", "bbox", "created_at", "captured_at")
+ALERT_COLUMNS = tuple(getattr(Alert, field) for field in ALERT_FIELDS)
+
+
+def _fields_to_dict(values):
+    data = dict(zip(ALERT_FIELDS, values))
+    created_at, captured_at = data["created_at"], data["captured_at"]
+    data["bbox"] = [int(v) for v in data["bbox"].split(",")] if data["bbox"] else None
+    data["created_at"] = created_at.isoformat() if created_at else None
+    data["captured_at"] = captured_at.isoformat() if captured_at else None
+    data["latency_ms"] = round((created_at - captured_at).total_seconds() * 1000.0, 1) \
+        if created_at and captured_at else None
+    return data
+
+
+def alert_to_dict(alert):
+    """
+    JSON-ready view of an Alert row (API responses and "alert" events).
+    
+    Args:
+        alert: Alert object
+    
+    Returns:
+        dict
+    """
+    return _fields_to_dict(getattr(alert, field) for field in ALERT_FIELDS)
+
+def save_alert(camera_id, track_id, alert_type, description, captured_at=None, zone=None,
+               person_id=None, confidence=None, bbox=None):
     """
     Save an alert to the database.
     
@@ -16,28 +52,91 @@ def save_alert(camera_id, track_id, alert_type, description):
         track_id: Track ID of the person (can be None)
         alert_type: Type of alert (STATIONARY, RESTRICTED_ZONE, UNKNOWN_PERSON)
         description: Alert description message
+        captured_at: Capture time (UTC datetime) of the frame that triggered
+            the alert, see utils.latency.wall_clock (optional)
+        zone: Restricted zone name (optional)
+        person_id: Matched face ID (optional)
+        confidence: Detection confidence (optional)
+        bbox: Bounding box as "x1,y1,x2,y2" (optional)
+    
+    Returns:
+        Alert ID, or None on error
+    """
+    alert = Alert(
+        camera_id=str(camera_id),
+        track_id=track_id,
+        alert_type=alert_type,
+        description=description,
+        zone=zone,
+        person_id=person_id,
+        confidence=confidence,
+        bbox=bbox,
+        created_at=datetime.utcnow(),
+        captured_at=captured_at
+    )
+    ids = _write_alerts([alert])
+    return ids[0] if ids else None
+
+
+def save_alerts(alerts):
+    """
+    Save AlertRecords (see alerts/alert_record.py) in one transaction.
+    
+    Args:
+        alerts: List of AlertRecord objects
+    
+    Returns:
+        List of alert IDs (empty on error)
+    """
+    if not alerts:
+        return []
+    created_at = datetime.utcnow()
+    rows = []
+    for record in alerts:
+        confidence = record.confidence
+        rows.append(Alert(
+            camera_id=str(record.camera_id),
+            track_id=None if record.track_id is None else int(record.track_id),
+            alert_type=record.alert_type,
+            description=record.message,
+            zone=record.zone,
+            person_id=None if record.person_id is None else int(record.person_id),
+            confidence=None if confidence is None else float(confidence),
+            bbox=record.bbox_text(),
+            created_at=created_at,
+            captured_at=record.captured_wall_clock()
+        ))
+    return _write_alerts(rows)
+
+
+def _write_alerts(rows):
+    """
+    Insert Alert rows and their rollup counts.
+
+    Open dashboards learn about them from the web process's database
+    watcher (app/events.py), whichever process wrote them.
     """
     try:
-        db = SessionLocal()
-        alert = Alert(
-            camera_id=str(camera_id),
-            track_id=track_id,
-            alert_type=alert_type,
-            description=description,
-            created_at=datetime.utcnow()
-        )
-        db.add(alert)
+        # Values stay loaded after commit: events are built without re-reading rows
+        db = SessionLocal(expire_on_commit=False)
+        start = time.perf_counter()
+        db.add_all(rows)
+        for alert in rows:
+            # Hourly per-camera/type counter, committed together with the alert
+            record_alert(db, alert.camera_id, alert.alert_type, alert.created_at)
         db.commit()
-        db.refresh(alert)
+        observe("db_write_seconds", time.perf_counter() - start, table="alerts")
+        events = [alert_to_dict(alert) for alert in rows]
         db.close()
-        print(f"Alert saved to database: {alert_type} - {description}")
-        return alert.id
+        for event in events:
+            print(f"Alert saved to database: {event['alert_type']} - {event['description']}")
+        return [event["id"] for event in events]
     except Exception as e:
         print(f"Error saving alert to database: {e}")
         if 'db' in locals():
             db.rollback()
             db.close()
-        return None
+        return []
 
 def save_detection(camera_id, person_id, det):
     """
@@ -57,25 +156,78 @@ def save_detection(camera_id, person_id, det):
         print(f"Error saving detection: {e}")
         return False
 
-def get_alerts(camera_id=None, limit=100):
+def encode_cursor(created_at, alert_id):
+    """Opaque keyset cursor for the page after the alert (created_at, id)."""
+    return f"{created_at.isoformat()}_{alert_id}"
+
+
+def decode_cursor(cursor):
+    """
+    Parse a cursor from encode_cursor.
+    
+    Returns:
+        (created_at, id) tuple
+    
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    created_at, alert_id = cursor.rsplit("_", 1)
+    return datetime.fromisoformat(created_at), int(alert_id)
+
+
+def get_alerts(camera_id=None, limit=100, since_id=None, alert_type=None, track_id=None,
+               start=None, end=None, before=None, rows=False):
     """
     Retrieve alerts from database.
     
+    Pages are ordered newest first by (created_at, id); pass the
+    (created_at, id) of the last alert of a page as `before` to get the
+    next one. This keyset query uses the composite indexes on alerts, so
+    deep pages are as fast as the first.
+    
     Args:
         camera_id: Filter by camera ID (optional)
         limit: Maximum number of alerts to retrieve
+        since_id: Only alerts with a larger ID, oldest first (optional; used
+            by dashboards catching up after a reconnect)
+        alert_type: Filter by alert type (optional)
+        track_id: Filter by track ID (optional)
+        start: Only alerts created at or after this datetime (optional)
+        end: Only alerts created before this datetime (optional)
+        before: (created_at, id) keyset cursor; only older alerts (optional)
+        rows: Return plain dicts (alert_to_dict format) read by column
+            projection, without building ORM objects
     
     Returns:
-        List of alert objects
+        List of alert objects (or dicts with rows=True)
     """
     try:
         db = SessionLocal()
-        query = db.query(Alert)
+        query = select(*ALERT_COLUMNS) if rows else select(Alert)
         
         if camera_id:
-            query = query.filter(Alert.camera_id == str(camera_id))
+            query = query.where(Alert.camera_id == str(camera_id))
+        if alert_type:
+            query = query.where(Alert.alert_type == alert_type)
+        if track_id is not None:
+            query = query.where(Alert.track_id == track_id)
+        if start is not None:
+            query = query.where(Alert.created_at >= start)
+        if end is not None:
+            query = query.where(Alert.created_at < end)
+        
+        if since_id is not None:
+            query = query.where(Alert.id > since_id).order_by(Alert.id.asc())
+        else:
+            if before is not None:
+                query = query.where(tuple_(Alert.created_at, Alert.id) < tuple_(*before))
+            query = query.order_by(Alert.created_at.desc(), Alert.id.desc())
         
-        alerts = query.order_by(Alert.created_at.desc()).limit(limit).all()
+        result = db.execute(query.limit(limit))
+        if rows:
+            alerts = [_fields_to_dict(row) for row in result]
+        else:
+            alerts = result.scalars().all()
         db.close()
         return alerts
     except Exception as e:
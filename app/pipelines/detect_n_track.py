@@ -3,34 +3,197 @@ Detection and Tracking Pipeline
 
 Combines YOLOv8 object detection with DeepSORT multi-object tracking.
 This is the core detection and tracking module that processes each frame.
+
+In "downscaled" mode YOLO and DeepSORT work on a copy of the frame shrunk
+to the detector's input size (shared through the FrameContext): YOLO has
+nothing left to resize and the ReID embedder crops the small copy. The
+tracker of such a camera only ever sees that coordinate space; its boxes
+are mapped back to full-resolution coordinates on the way out, so later
+stages (face crops) still cut from the original frame.
 """
+import os
+
 import cv2
 import numpy as np
 
+from app.models.deepsort import appearance_embeds
+from app.pipelines.frame_context import as_context
+from app.pipelines.tiled_detection import detect_tiled
+from utils.metrics import stage_timer
+
+
+def _parse_classes(spec):
+    """Parse "person,car" into a list of class names (None for "all")."""
+    if spec.strip().lower() == "all":
+        return None
+    return [c.strip() for c in spec.split(",") if c.strip()]
+
+
+# Configuration: classes handed to the tracker, per camera
+# Filtering happens inside YOLO (classes=...), so other objects never reach
+# DeepSORT or its ReID embedder. "default" applies to cameras not listed;
+# None tracks all 80 COCO classes.
+TRACKED_CLASSES = {
+    "default": _parse_classes(os.getenv("TRACKED_CLASSES", "person"))
+    # Add per-camera lists as needed:
+    # "CAM_02": ["person", "car", "truck"]
+}
+
+# Detection mode per camera ("default" applies to cameras not listed)
+# - "standard": one YOLO pass on the frame
+# - "tiled": overlapping high-resolution tiles (see app/pipelines/tiled_detection.py)
+# - "downscaled": detect and track on a copy shrunk to DETECTION_INPUT_SIZE
+DETECTION_MODES = ("standard", "tiled", "downscaled")
+DETECTION_MODE = {
+    "default": os.getenv("DETECTION_MODE", "standard")
+    # "CAM_02": "tiled"
+}
+DETECTION_CONF = 0.4
+DETECTION_INPUT_SIZE = int(os.getenv("DETECTION_INPUT_SIZE", "640"))  # Longest side in downscaled mode (YOLO's input)
+
+# Resolved YOLO class IDs per camera
+_class_ids = {}
+
+
+def tracked_class_ids(yolo, camera_id):
+    """
+    YOLO class IDs of the allow-list of a camera.
+
+    Args:
+        yolo: YOLO model (provides the names mapping)
+        camera_id: Camera identifier
+
+    Returns:
+        List of class IDs, or None to keep all classes
+    """
+    if camera_id in _class_ids:
+        return _class_ids[camera_id]
+
+    names = TRACKED_CLASSES.get(camera_id, TRACKED_CLASSES.get("default"))
+    ids = None
+    if names is not None:
+        name_to_id = {name: idx for idx, name in yolo.names.items()}
+        unknown = [name for name in names if name not in name_to_id]
+        if unknown:
+            print(f"Warning: [{camera_id}] Unknown tracked classes ignored: {', '.join(unknown)}")
+        ids = [name_to_id[name] for name in names if name in name_to_id] or None
+    _class_ids[camera_id] = ids
+    return ids
+
+
+def detection_mode(camera_id):
+    """Detection mode of a camera (see DETECTION_MODES)."""
+    mode = DETECTION_MODE.get(camera_id, DETECTION_MODE["default"])
+    if mode not in DETECTION_MODES:
+        print(f"Warning: [{camera_id}] Unknown DETECTION_MODE '{mode}', using standard")
+        mode = DETECTION_MODE[camera_id] = "standard"
+    return mode
+
 
-def detect_and_track(frame, yolo, tracker):
+def detect(frame, yolo, camera_id="CAM_01", mode=None, imgsz=None):
+    """
+    Run YOLO on a frame.
+
+    Args:
+        frame: Input BGR frame
+        yolo: YOLO model
+        camera_id: Camera identifier (selects class allow-list and far-field regions)
+        mode: "standard" or "tiled" (default: the camera's detection mode;
+            "downscaled" runs standard detection on the frame it is given)
+        imgsz: Optional YOLO input size for standard detection (multiple of 32;
+            default: the model's own, 640)
+
+    Returns:
+        (boxes, scores, class_ids, keypoints): (N, 4) xyxy boxes, (N,)
+        confidences, (N,) class IDs and (N, 17, 3) pose keypoints or None
+    """
+    classes = tracked_class_ids(yolo, camera_id)
+    mode = mode or detection_mode(camera_id)
+
+    if mode == "tiled":
+        boxes, scores, class_ids = detect_tiled(frame, yolo, DETECTION_CONF, classes, camera_id)
+        return boxes, scores, class_ids, None
+    if imgsz:
+        # YOLO input sizes are multiples of its 32 px stride
+        imgsz = max(32, int(imgsz) // 32 * 32)
+
+    kwargs = {"imgsz": imgsz} if imgsz else {}
+    results = yolo(frame, conf=DETECTION_CONF, classes=classes, **kwargs)[0]
+
+    # Pose models (e.g. yolov8n-pose.pt) also return 17 COCO keypoints per box
+    keypoints = None
+    if getattr(results, "keypoints", None) is not None:
+        keypoints = results.keypoints.data.cpu().numpy()
+
+    return (results.boxes.xyxy.cpu().numpy(), results.boxes.conf.cpu().numpy(),
+            results.boxes.cls.cpu().numpy().astype(np.int64), keypoints)
+
+
+def detect_and_track(frame, yolo, tracker, camera_id="CAM_01", input_size=None):
     """
     Detect objects with YOLO and track with DeepSORT.
     
     Args:
-        frame: Input BGR frame
+        frame: Input BGR frame or FrameContext
         yolo: YOLO model
         tracker: DeepSORT tracker
+        camera_id: Camera identifier (selects detection mode and class allow-list)
+        input_size: Optional detector input size (long side), used by load
+            shedding: YOLO runs on a copy that small, and its boxes are
+            scaled up to the tracker's coordinate space before tracking
     
     Returns:
         List of tracked objects with track_id, bbox, class, and confidence
+        (plus keypoints when a YOLO-pose model is used), in the coordinates
+        of the full-resolution frame
     """
-    results = yolo(frame, conf=0.4)[0]
+    ctx = as_context(frame, camera_id)
+    mode = detection_mode(camera_id)
+
+    # The tracker's frame: full resolution, or the downscaled copy. Every
+    # frame of a camera uses the same one, so tracks stay in one space.
+    scale = 1.0
+    if mode == "downscaled":
+        # Same interpolation as YOLO's letterbox, which then has nothing left to resize
+        frame, scale = ctx.scaled(DETECTION_INPUT_SIZE, interpolation=cv2.INTER_LINEAR)
+        mode = "standard"
+    else:
+        frame = ctx.bgr
+
+    detect_frame, factor = frame, 1.0
+    if input_size is not None:
+        # Load shedding: detect on a smaller copy (standard mode), then scale
+        # the boxes up to the tracker's frame - never mix sizes in one tracker
+        small, small_scale = ctx.scaled(input_size, interpolation=cv2.INTER_LINEAR)
+        if small_scale < scale:
+            detect_frame, factor, mode = small, scale / small_scale, "standard"
+
+    with stage_timer(camera_id, "yolo", ctx.timings):
+        boxes, scores, class_ids, keypoints = detect(detect_frame, yolo, camera_id, mode, input_size)
+    if factor != 1.0:
+        boxes = np.asarray(boxes, dtype=np.float64) * factor
+        if keypoints is not None:
+            keypoints = keypoints.copy()
+            keypoints[..., :2] *= factor
 
     detections = []
-    for box in results.boxes:
-        x1, y1, x2, y2 = map(int, box.xyxy[0])
-        cls = yolo.names[int(box.cls[0])]
-        conf = float(box.conf[0])
+    others = []
+    for i in range(len(boxes)):
+        x1, y1, x2, y2 = map(int, boxes[i])
+        cls = yolo.names[int(class_ids[i])]
+        conf = float(scores[i])
+        if x2 <= x1 or y2 <= y1:
+            continue
         # DeepSORT expects [x, y, w, h] format
         detections.append(([x1, y1, x2 - x1, y2 - y1], conf, cls))
+        others.append(keypoints[i] if keypoints is not None else None)
+
+    with stage_timer(camera_id, "deepsort", ctx.timings):
+        # Histogram / no-ReID trackers get their embeddings here (one batch per frame)
+        embeds = appearance_embeds(tracker, frame, [d[0] for d in detections])
 
-    tracks = tracker.update_tracks(detections, frame=frame)
+        # Keypoints ride along with the detection and come back via get_det_supplementary()
+        tracks = tracker.update_tracks(detections, embeds=embeds, frame=frame, others=others)
 
     tracked_objects = []
     for t in tracks:
@@ -43,11 +206,24 @@ def detect_and_track(frame, yolo, tracker):
         # Get confidence if available
         confidence = t.confidence if hasattr(t, 'confidence') else 0.0
         
-        tracked_objects.append({
+        bbox = t.to_ltrb()  # Returns [x1, y1, x2, y2]
+        if scale != 1.0:
+            # Back to full-resolution coordinates
+            bbox = np.asarray(bbox, dtype=np.float64) / scale
+        obj = {
             "track_id": t.track_id,
-            "bbox": t.to_ltrb(),  # Returns [x1, y1, x2, y2]
+            "bbox": bbox,
             "class": det_class,
             "confidence": confidence
-        })
+        }
+        if keypoints is not None and hasattr(t, "get_det_supplementary"):
+            # Only set when the track was matched to a detection this frame
+            kps = t.get_det_supplementary()
+            if kps is not None:
+                if scale != 1.0:
+                    kps = kps.copy()
+                    kps[:, :2] /= scale
+                obj["keypoints"] = kps
+        tracked_objects.append(obj)
 
     return tracked_objects
@@ -6,119 +6,530 @@ MTCNN (face detection) → Crop face → GAN (face enhancement) → FaceNet (emb
 
 This pipeline processes only person-class objects and generates face embeddings
 for identity matching.
+
+The chain runs in three batched stages per frame:
+1. MTCNN finds the best face of every person (see FACE_DETECTION_MODE);
+   faces failing the quality gate (app/pipelines/face_quality.py) are
+   dropped here, before any GAN or FaceNet work. Faces headed for the GAN
+   are scored at their upscaled size, so the size component does not
+   reject the faces super-resolution is for
+2. Faces smaller than FACE_SR_MAX_SIZE (default: the GAN input, 40 px for
+   x4 to 160 px) are super-resolved together in one GAN batch; larger
+   faces, blurry or not, go straight to the FaceNet resize (shrinking them
+   to the GAN input would throw away detail)
+3. FaceNet embeds all faces of the frame in one batch
+
+Enhanced results are cached per track: while a track keeps showing faces
+no better than the one already enhanced, the cached embedding is reused
+and neither the GAN nor FaceNet runs for it.
 """
+import os
+import threading
+from contextlib import contextmanager
+
 import torch
 import cv2
 import numpy as np
+from app.models.gan_sr import sr_input_size, upscale_faces
+from app.pipelines.face_quality import MIN_FACE_SIZE, face_sharpness, passes_quality, score_face
+from app.pipelines.frame_context import as_context
+
+# Face detection configuration
+# "per_crop": one MTCNN call per person box
+# "full_frame": one MTCNN call on the whole frame
+# "upper_body": one MTCNN call on the box enclosing all upper bodies
+FACE_DETECTION_MODES = ("per_crop", "full_frame", "upper_body")
+FACE_DETECTION_MODE = os.getenv("FACE_DETECTION_MODE", "per_crop")
+UPPER_BODY_FRACTION = 0.5    # Top part of a person box searched for its face
+HEAD_FRACTION = 0.25         # Top part of a person box expected to hold the head
+FACE_MIN_CONTAINMENT = 0.8   # Min share of a face box inside a person box to assign it
+
+# Head region searched in per_crop mode
+# "full": the whole person box
+# "top": the top HEAD_ROI_FRACTION of the person box
+# "pose": box around the head keypoints (YOLO-pose model), else "top"
+HEAD_ROI_MODES = ("full", "top", "pose")
+HEAD_ROI_MODE = os.getenv("HEAD_ROI_MODE", "top")
+HEAD_ROI_FRACTION = 0.4        # Top part of a standing person box that holds the head
+HEAD_ROI_MIN_ASPECT = 1.2      # Person boxes flatter than this (h/w; sitting, cut off) are searched whole
+KEYPOINT_MIN_CONF = 0.3        # Min confidence of a head keypoint (nose, eyes, ears)
+HEAD_KEYPOINT_SCALE = 2.0      # Head ROI width relative to the spread of the head keypoints
+
+# MTCNN pyramid tuning from the expected face size (person height)
+MTCNN_TUNING = os.getenv("MTCNN_TUNING", "1") == "1"
+FACE_TO_PERSON_RATIO = 0.1     # Face box height / person box height for a standing person
+MIN_FACE_RATIO = 0.5           # Smallest face searched, relative to the expected face size
+MTCNN_PYRAMID_LEVELS = 4       # Pyramid levels wanted between min face size and region size
+MTCNN_DEFAULT_FACTOR = 0.709   # facenet_pytorch default (finest pyramid used)
+MTCNN_MIN_FACTOR = 0.6         # Coarsest pyramid used
+
+_mtcnn_lock = threading.Lock()
+
+# Super-resolution configuration
+FACE_SR_MAX_SIZE = int(os.getenv("FACE_SR_MAX_SIZE", "0"))  # Faces smaller than this (px, shorter side) are upscaled; 0 = GAN input size
+FACE_SR_CACHE_MAX_AGE = 150   # Frames before a cached enhanced face is refreshed anyway
+FACE_SR_CACHE_MARGIN = 1.2    # A new face must be this much better to replace the cached one
+
+# Per-camera cache of enhanced faces: {camera_id: {track_id: {"score", "embedding", "frame"}}}
+_sr_cache = {}
+
+
+def needs_super_resolution(size, input_size, max_size=None):
+    """
+    True if a face should be upscaled by the GAN.
+
+    Args:
+        size: Shorter side of the face box in px
+        input_size: GAN input side (see gan_sr.sr_input_size)
+        max_size: Size threshold (default FACE_SR_MAX_SIZE; 0 = input_size,
+            i.e. only faces the GAN adds pixels to). Larger values also send
+            bigger faces, which are shrunk to the GAN input first
+    """
+    max_size = FACE_SR_MAX_SIZE if max_size is None else max_size
+    return size < (max_size or input_size)
+
+
+def reset_face_cache(camera_id=None):
+    """Drop cached enhanced faces (all cameras if camera_id is None)."""
+    if camera_id is None:
+        _sr_cache.clear()
+    else:
+        _sr_cache.pop(camera_id, None)
 
 
-def process_faces(frame, tracked_objects, mtcnn, gan, facenet, device):
+def _prune_cache(cache, frame_count):
+    """Remove entries of tracks that have not been refreshed for a while."""
+    for track_id in list(cache):
+        age = frame_count - cache[track_id]["frame"]
+        if age < 0 or age > 2 * FACE_SR_CACHE_MAX_AGE:
+            del cache[track_id]
+
+
+def _face_crop(rgb, box, image_size, margin):
+    """Crop a face with the same relative margin as MTCNN.extract."""
+    x1, y1, x2, y2 = box
+    mx = margin * (x2 - x1) / (image_size - margin)
+    my = margin * (y2 - y1) / (image_size - margin)
+    h, w = rgb.shape[:2]
+    x1 = int(max(x1 - mx / 2, 0))
+    y1 = int(max(y1 - my / 2, 0))
+    x2 = int(min(x2 + mx / 2, w))
+    y2 = int(min(y2 + my / 2, h))
+    return rgb[y1:y2, x1:x2]
+
+
+def _person_boxes(ctx, tracked_objects):
+    """
+    Person boxes clipped to the frame.
+
+    Returns:
+        (track_ids, boxes, keypoints): boxes as (N, 4) int array, keypoints
+        as a list of per-person pose keypoints (None if not available)
+    """
+    frame_h, frame_w = ctx.shape[:2]
+    track_ids, boxes, keypoints = [], [], []
+
+    for obj in tracked_objects:
+        if obj["class"] != "person":
+            continue
+
+        x1, y1, x2, y2 = map(int, obj["bbox"])
+
+        # Ensure valid coordinates
+        x1 = max(0, x1)
+        y1 = max(0, y1)
+        x2 = min(frame_w, x2)
+        y2 = min(frame_h, y2)
+
+        if x2 <= x1 or y2 <= y1:
+            continue
+        track_ids.append(obj["track_id"])
+        boxes.append((x1, y1, x2, y2))
+        keypoints.append(obj.get("keypoints"))
+
+    return track_ids, np.array(boxes, dtype=np.int64).reshape(-1, 4), keypoints
+
+
+def head_roi(box, keypoints=None, mode=None):
+    """
+    Region of a person box that should contain the face.
+
+    Args:
+        box: (x1, y1, x2, y2) person box (clipped to the frame)
+        keypoints: Optional (17, 3) COCO pose keypoints (x, y, conf)
+        mode: "full", "top" or "pose" (default: HEAD_ROI_MODE)
+
+    Returns:
+        (x1, y1, x2, y2) region inside the person box
+    """
+    mode = mode or HEAD_ROI_MODE
+    x1, y1, x2, y2 = map(int, box)
+    w, h = x2 - x1, y2 - y1
+    if mode == "full" or h < HEAD_ROI_MIN_ASPECT * w:
+        return x1, y1, x2, y2
+
+    if mode == "pose" and keypoints is not None:
+        # COCO keypoints 0-4: nose, eyes, ears
+        head = np.asarray(keypoints, dtype=np.float32).reshape(-1, 3)[:5]
+        visible = head[head[:, 2] >= KEYPOINT_MIN_CONF]
+        if len(visible) > 0:
+            cx, cy = visible[:, :2].mean(axis=0)
+            spread = max(np.ptp(visible[:, 0]), np.ptp(visible[:, 1]))
+            half = max(HEAD_KEYPOINT_SCALE * spread, FACE_TO_PERSON_RATIO * h) / 2
+            # Taller than wide: keep forehead and chin
+            roi = (max(x1, int(cx - half)), max(y1, int(cy - 1.5 * half)),
+                   min(x2, int(cx + half)), min(y2, int(cy + 1.5 * half)))
+            if roi[2] > roi[0] and roi[3] > roi[1]:
+                return roi
+
+    return x1, y1, x2, y1 + max(1, int(HEAD_ROI_FRACTION * h))
+
+
+def mtcnn_params(person_height, region_min_side):
+    """
+    MTCNN pyramid settings for faces of people of a given height.
+
+    min_face_size skips pyramid levels for faces much smaller than expected;
+    the scale factor spreads MTCNN_PYRAMID_LEVELS levels between that size
+    and the region size.
+
+    Args:
+        person_height: Height of the (smallest) person box in pixels
+        region_min_side: Shorter side of the searched region in pixels
+
+    Returns:
+        (min_face_size, factor)
+    """
+    expected = FACE_TO_PERSON_RATIO * person_height
+    min_face = int(max(MIN_FACE_SIZE, MIN_FACE_RATIO * expected))
+    min_face = max(1, min(min_face, int(region_min_side)))
+    factor = (min_face / max(region_min_side, min_face)) ** (1.0 / MTCNN_PYRAMID_LEVELS)
+    factor = float(np.clip(factor, MTCNN_MIN_FACTOR, MTCNN_DEFAULT_FACTOR))
+    return min_face, factor
+
+
+@contextmanager
+def _mtcnn_settings(mtcnn, min_face_size=None, factor=None):
+    """Temporarily override MTCNN's pyramid settings (restored afterwards)."""
+    if min_face_size is None or not hasattr(mtcnn, "min_face_size"):
+        yield
+        return
+    # The detector is shared: keep other threads from seeing our settings
+    with _mtcnn_lock:
+        saved = (mtcnn.min_face_size, mtcnn.factor)
+        mtcnn.min_face_size, mtcnn.factor = min_face_size, factor
+        try:
+            yield
+        finally:
+            mtcnn.min_face_size, mtcnn.factor = saved
+
+
+def _detect_in_region(ctx, region, mtcnn, min_face_size=None, factor=None):
+    """
+    Run MTCNN on one region of the frame.
+
+    Args:
+        ctx: FrameContext of the frame
+        region: (x1, y1, x2, y2) in frame coordinates
+        mtcnn: MTCNN face detector
+        min_face_size: Optional MTCNN min_face_size for this call
+        factor: Optional MTCNN scale factor for this call
+
+    Returns:
+        (boxes, probs, landmarks): (N, 4) face boxes and (N, 5, 2) landmarks
+        in frame coordinates, and (N,) probabilities
+    """
+    x1, y1, x2, y2 = map(int, region)
+    # MTCNN expects RGB PIL Image or numpy array; slice the shared RGB view
+    with _mtcnn_settings(mtcnn, min_face_size, factor):
+        faces, probs, points = mtcnn.detect(ctx.rgb[y1:y2, x1:x2], landmarks=True)
+    if faces is None or len(faces) == 0:
+        return (np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32),
+                np.zeros((0, 5, 2), dtype=np.float32))
+
+    offset = np.array([x1, y1], dtype=np.float32)
+    boxes = np.asarray(faces, dtype=np.float32).reshape(-1, 4) + np.tile(offset, 2)
+    probs = np.asarray(probs, dtype=np.float32).reshape(-1) if probs is not None else np.ones(len(boxes), dtype=np.float32)
+    points = np.asarray(points, dtype=np.float32).reshape(-1, 5, 2) + offset
+    return boxes, probs, points
+
+
+def assign_faces_to_tracks(face_boxes, face_probs, person_boxes, track_ids,
+                           min_containment=FACE_MIN_CONTAINMENT, face_landmarks=None):
+    """
+    Match faces detected anywhere in the frame to person tracks.
+
+    All face/person pairs are scored at once: a face qualifies for a person if
+    at least min_containment of it lies inside the person box and its centre
+    is in the upper body. Qualifying pairs are ranked by containment plus IoU
+    with the person's head region, and assigned greedily one-to-one.
+
+    Args:
+        face_boxes: (F, 4) face boxes in frame coordinates
+        face_probs: (F,) face detection probabilities
+        person_boxes: (P, 4) person boxes in frame coordinates
+        track_ids: List of P track IDs
+        min_containment: Minimum share of the face area inside the person box
+        face_landmarks: Optional (F, 5, 2) landmarks, passed through
+
+    Returns:
+        List of dicts with track_id, box, prob and landmarks (at most one face per track)
+    """
+    faces = np.asarray(face_boxes, dtype=np.float32).reshape(-1, 4)
+    persons = np.asarray(person_boxes, dtype=np.float32).reshape(-1, 4)
+    if len(faces) == 0 or len(persons) == 0:
+        return []
+
+    # Pairwise intersection of every face with every person box: (F, P)
+    ix1 = np.maximum(faces[:, None, 0], persons[None, :, 0])
+    iy1 = np.maximum(faces[:, None, 1], persons[None, :, 1])
+    ix2 = np.minimum(faces[:, None, 2], persons[None, :, 2])
+    iy2 = np.minimum(faces[:, None, 3], persons[None, :, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    face_area = (faces[:, 2] - faces[:, 0]) * (faces[:, 3] - faces[:, 1])
+    containment = inter / np.maximum(face_area, 1e-6)[:, None]
+
+    # IoU with the head region (top HEAD_FRACTION of the person box)
+    person_h = persons[:, 3] - persons[:, 1]
+    head_y2 = persons[:, 1] + HEAD_FRACTION * person_h
+    hy2 = np.minimum(faces[:, None, 3], head_y2[None, :])
+    head_inter = np.clip(ix2 - ix1, 0, None) * np.clip(hy2 - iy1, 0, None)
+    head_area = (persons[:, 2] - persons[:, 0]) * (head_y2 - persons[:, 1])
+    head_iou = head_inter / np.maximum(face_area[:, None] + head_area[None, :] - head_inter, 1e-6)
+
+    # Face centre must be in the upper body
+    face_cy = (faces[:, 1] + faces[:, 3]) / 2
+    in_upper = face_cy[:, None] <= (persons[:, 1] + UPPER_BODY_FRACTION * person_h)[None, :]
+
+    score = np.where((containment >= min_containment) & in_upper, containment + head_iou, 0.0)
+
+    # Greedy one-to-one assignment, best pairs first
+    assignments = []
+    used_faces, used_persons = set(), set()
+    num_persons = len(persons)
+    for idx in np.argsort(-score, axis=None):
+        if score.flat[idx] <= 0:
+            break
+        f, p = divmod(int(idx), num_persons)
+        if f in used_faces or p in used_persons:
+            continue
+        used_faces.add(f)
+        used_persons.add(p)
+        assignments.append({
+            "track_id": track_ids[p],
+            "box": faces[f],
+            "prob": float(face_probs[f]),
+            "landmarks": None if face_landmarks is None else face_landmarks[f]
+        })
+    return assignments
+
+
+def detect_faces(ctx, tracked_objects, mtcnn, mode=None, roi_mode=None, tune_pyramid=None):
+    """
+    Find the best face of every person.
+
+    Args:
+        ctx: FrameContext of the frame
+        tracked_objects: List of tracked objects
+        mtcnn: MTCNN face detector
+        mode: "per_crop", "full_frame" or "upper_body" (default: FACE_DETECTION_MODE)
+        roi_mode: Head region used in per_crop mode (default: HEAD_ROI_MODE)
+        tune_pyramid: Set MTCNN pyramid from person height (default: MTCNN_TUNING)
+
+    Returns:
+        List of dicts with track_id, box, prob and landmarks (frame coordinates)
+    """
+    mode = mode or FACE_DETECTION_MODE
+    if mode not in FACE_DETECTION_MODES:
+        print(f"Warning: Unknown FACE_DETECTION_MODE '{mode}', using per_crop")
+        mode = "per_crop"
+
+    if tune_pyramid is None:
+        tune_pyramid = MTCNN_TUNING
+
+    track_ids, persons, keypoints = _person_boxes(ctx, tracked_objects)
+    if not track_ids:
+        return []
+    heights = persons[:, 3] - persons[:, 1]
+
+    if mode != "per_crop":
+        # One MTCNN pass, then assign faces to tracks
+        if mode == "full_frame":
+            region = (0, 0, ctx.shape[1], ctx.shape[0])
+        else:
+            upper_y2 = persons[:, 1] + (UPPER_BODY_FRACTION * (persons[:, 3] - persons[:, 1])).astype(np.int64)
+            region = (persons[:, 0].min(), persons[:, 1].min(), persons[:, 2].max(), upper_y2.max())
+        params = (None, None)
+        if tune_pyramid:
+            # Smallest person decides: its face must still be found
+            params = mtcnn_params(heights.min(), min(region[2] - region[0], region[3] - region[1]))
+        try:
+            boxes, probs, points = _detect_in_region(ctx, region, mtcnn, *params)
+        except Exception as e:
+            print(f"Error detecting faces ({mode}): {e}")
+            return []
+        return assign_faces_to_tracks(boxes, probs, persons, track_ids, face_landmarks=points)
+
+    detections = []
+    for track_id, box, kps, height in zip(track_ids, persons, keypoints, heights):
+        x1, y1, x2, y2 = box
+        roi = head_roi(box, kps, roi_mode)
+        params = (None, None)
+        if tune_pyramid:
+            params = mtcnn_params(height, min(roi[2] - roi[0], roi[3] - roi[1]))
+        try:
+            faces, probs, points = _detect_in_region(ctx, roi, mtcnn, *params)
+        except Exception as e:
+            print(f"Error detecting face for track {track_id}: {e}")
+            continue
+
+        if len(faces) == 0:
+            continue
+
+        # Get the face with highest probability, clipped to the person box
+        best = int(np.argmax(probs))
+        box = np.array([
+            max(x1, faces[best, 0]), max(y1, faces[best, 1]),
+            min(x2, faces[best, 2]), min(y2, faces[best, 3])
+        ], dtype=np.float32)
+        if box[2] - box[0] < 1 or box[3] - box[1] < 1:
+            continue
+
+        detections.append({
+            "track_id": track_id,
+            "box": box,
+            "prob": float(probs[best]),
+            "landmarks": points[best]
+        })
+
+    return detections
+
+
+def process_faces(frame, tracked_objects, mtcnn, gan, facenet, device, return_scores=False):
     """
     Process faces for person objects:
     MTCNN (face detect) → Crop face → GAN (face enhancement) → FaceNet (embeddings → identity)
-    
+
     Args:
-        frame: BGR frame
+        frame: BGR frame or FrameContext (person crops are sliced from its RGB view)
         tracked_objects: List of tracked objects (filtered for person class)
         mtcnn: MTCNN face detector
-        gan: GAN face enhancer (optional)
+        gan: GAN face enhancer (optional, only used for small or blurry faces)
         facenet: FaceNet model for embeddings
         device: Device to run on
-    
+        return_scores: Also return the quality score of each embedded face
+
     Returns:
-        Dictionary mapping track_id to face embedding
+        Dictionary mapping track_id to face embedding, or
+        (embeddings, scores) with scores mapping track_id to face quality
+        if return_scores is True
     """
+    ctx = as_context(frame)
     embeddings = {}
+    scores = {}
+    result = (embeddings, scores) if return_scores else embeddings
     facenet.eval()
-    
-    if gan:
-        gan.eval()
 
-    for obj in tracked_objects:
-        if obj["class"] != "person":
+    image_size = getattr(mtcnn, "image_size", 160)
+    margin = getattr(mtcnn, "margin", 20)
+    sr_size = sr_input_size(gan, image_size) if gan is not None else 0
+    sr_scale = getattr(gan, "scale", 4)
+    cache = _sr_cache.setdefault(ctx.camera_id, {})
+    _prune_cache(cache, ctx.frame_count)
+
+    # 1️⃣ Face detection
+    detections = detect_faces(ctx, tracked_objects, mtcnn)
+    if not detections:
+        return result
+
+    # Quality gate, then split faces into: cached, needing super-resolution, usable as-is
+    plain, to_enhance = [], []
+    for det in detections:
+        track_id = det["track_id"]
+        x1, y1, x2, y2 = det["box"].astype(int)
+        size = min(x2 - x1, y2 - y1)
+        sharpness = face_sharpness(ctx.gray[y1:y2, x1:x2])
+        enhance = gan is not None and needs_super_resolution(size, sr_size)
+
+        # A face headed for the GAN is judged at the size FaceNet will see
+        scored_size = min(size * sr_scale, image_size) if enhance else size
+        det["score"], _ = score_face(det["prob"], det.get("landmarks"), sharpness, scored_size)
+        if not passes_quality(det["score"]):
+            # Unreliable face (tiny, blurred, profile or occluded): no embedding
             continue
 
-        track_id = obj["track_id"]
-        x1, y1, x2, y2 = map(int, obj["bbox"])
-        
-        # Ensure valid coordinates
-        x1 = max(0, x1)
-        y1 = max(0, y1)
-        x2 = min(frame.shape[1], x2)
-        y2 = min(frame.shape[0], y2)
-        
-        if x2 <= x1 or y2 <= y1:
+        if not enhance:
+            # Good enough without the GAN (a cached enhanced face is now obsolete)
+            cache.pop(track_id, None)
+            plain.append(det)
             continue
-        
-        person_crop = frame[y1:y2, x1:x2]
-        
-        if person_crop.size == 0:
+
+        cached = cache.get(track_id)
+        if (cached is not None
+                and ctx.frame_count - cached["frame"] <= FACE_SR_CACHE_MAX_AGE
+                and det["score"] <= cached["score"] * FACE_SR_CACHE_MARGIN):
+            # No better face than the one already enhanced: reuse its embedding
+            embeddings[track_id] = cached["embedding"]
+            scores[track_id] = cached["score"]
             continue
+        det["enhanced"] = True
+        to_enhance.append(det)
 
-        # MTCNN face detection
+    face_tensors = []
+    face_dets = []
+
+    # MTCNN extract: cropped, resized and standardised face tensors
+    for det in plain:
         try:
-            # MTCNN expects RGB PIL Image or numpy array
-            person_rgb = cv2.cvtColor(person_crop, cv2.COLOR_BGR2RGB)
-            faces, probs = mtcnn.detect(person_rgb)
-            
-            if faces is None or len(faces) == 0:
-                continue
-            
-            # Get the face with highest probability
-            best_face_idx = np.argmax(probs) if len(probs) > 0 else 0
-            face_box = faces[best_face_idx]
-            
-            # Extract face region
-            fx1, fy1, fx2, fy2 = map(int, face_box)
-            fx1 = max(0, fx1)
-            fy1 = max(0, fy1)
-            fx2 = min(person_crop.shape[1], fx2)
-            fy2 = min(person_crop.shape[0], fy2)
-            
-            if fx2 <= fx1 or fy2 <= fy1:
-                continue
-            
-            face_crop = person_rgb[fy1:fy2, fx1:fx2]
-            
-            # MTCNN extract (returns tensor)
-            face_tensor = mtcnn.extract(face_crop, save_path=None)
-            
-            if face_tensor is None:
-                continue
-            
-            # Ensure tensor is on correct device
-            if isinstance(face_tensor, torch.Tensor):
-                face_tensor = face_tensor.unsqueeze(0).to(device)
-            else:
-                face_tensor = torch.from_numpy(face_tensor).unsqueeze(0).to(device)
-            
-            # GAN enhancement (optional)
-            with torch.no_grad():
-                if gan is not None:
-                    try:
-                        if hasattr(gan, 'enhance'):
-                            enhanced = gan.enhance(face_tensor)
-                        elif hasattr(gan, '__call__'):
-                            enhanced = gan(face_tensor)
-                        else:
-                            enhanced = face_tensor
-                    except Exception as e:
-                        # If GAN fails, use original
-                        enhanced = face_tensor
-                else:
-                    enhanced = face_tensor
-                
-                # FaceNet embeddings
-                emb = facenet(enhanced)
-                if isinstance(emb, torch.Tensor):
-                    emb = emb.detach().cpu().numpy().flatten()
-                else:
-                    emb = np.array(emb).flatten()
-                
-                embeddings[track_id] = emb
-                
+            face_tensor = mtcnn.extract(ctx.rgb, det["box"][None], None)
         except Exception as e:
-            print(f"Error processing face for track {track_id}: {e}")
+            print(f"Error extracting face for track {det['track_id']}: {e}")
+            continue
+        if face_tensor is None:
             continue
+        face_tensors.append(face_tensor.unsqueeze(0).to(device))
+        face_dets.append(det)
+
+    # 2️⃣ GAN enhancement, one batch for all faces that benefit from it
+    if to_enhance:
+        crops = [_face_crop(ctx.rgb, det["box"], image_size, margin) for det in to_enhance]
+        try:
+            enhanced = upscale_faces(gan, crops, device, output_size=image_size)
+            # Same fixed standardisation as MTCNN.extract
+            face_tensors.append((enhanced * 255.0 - 127.5) / 128.0)
+            face_dets.extend(to_enhance)
+        except Exception as e:
+            # If the GAN fails, use the original faces
+            print(f"Warning: Face enhancement failed: {e}. Using original faces.")
+            for det in to_enhance:
+                det["enhanced"] = False
+                face_tensor = mtcnn.extract(ctx.rgb, det["box"][None], None)
+                if face_tensor is not None:
+                    face_tensors.append(face_tensor.unsqueeze(0).to(device))
+                    face_dets.append(det)
+
+    if not face_tensors:
+        return result
+
+    # 3️⃣ FaceNet embeddings, one batch for the whole frame
+    try:
+        with torch.no_grad():
+            embs = facenet(torch.cat(face_tensors).to(device))
+        if isinstance(embs, torch.Tensor):
+            embs = embs.detach().cpu().numpy()
+        embs = np.asarray(embs).reshape(len(face_dets), -1)
+    except Exception as e:
+        print(f"Error computing face embeddings: {e}")
+        return result
+
+    for det, emb in zip(face_dets, embs):
+        embeddings[det["track_id"]] = emb
+        scores[det["track_id"]] = det["score"]
+        if det.get("enhanced"):
+            cache[det["track_id"]] = {
+                "score": det["score"],
+                "embedding": emb,
+                "frame": ctx.frame_count
+            }
 
-    return embeddings
+    return result
@@ -0,0 +1,96 @@
+"""
+Face Quality Scoring
+
+Cheap quality score for MTCNN detections, computed before the FaceNet
+forward pass so unreliable faces (tiny, blurred, profile or partially
+occluded) are dropped instead of being embedded and matched.
+
+The score is the geometric mean of four components in [0, 1]:
+- detection: MTCNN probability (occluded faces score lower)
+- pose: frontalness from the landmarks (nose position between the eyes)
+- sharpness: Laplacian variance of the face
+- size: shorter side of the face box
+A single bad component is enough to pull the score down.
+
+FACE_QUALITY_MIN is also the bar for face-based alerts (see
+alerts.alerts.UNKNOWN_PERSON_MIN_QUALITY), so every face that pays for the
+GAN and FaceNet can raise or suppress an Unknown Person alert.
+
+Faces headed for super-resolution are scored at their upscaled size
+(face_pipeline.process_faces), so the size component does not reject the
+small faces the GAN is meant for. MTCNN does not look for faces below
+MIN_FACE_SIZE (face_pipeline.mtcnn_params): at that size an x4 GAN invents
+most of the face.
+"""
+import os
+
+import cv2
+import numpy as np
+
+# Configuration
+FACE_QUALITY_MIN = float(os.getenv("FACE_QUALITY_MIN", "0.6"))  # Faces below this are not embedded (nor used for alerts)
+PROB_FLOOR = 0.8            # Detection probability that scores 0
+MAX_YAW_RATIO = 1.0         # Nose offset (in half eye distances) that scores 0 (profile)
+SHARPNESS_REF = 100.0       # Laplacian variance that scores 1
+MIN_FACE_SIZE = 20          # Face size (px) that scores 0; also the smallest face MTCNN looks for
+GOOD_FACE_SIZE = 60         # Face size (px) that scores 1
+
+
+def face_sharpness(gray_face):
+    """Variance of the Laplacian (higher = sharper)."""
+    if gray_face.size == 0:
+        return 0.0
+    return float(cv2.Laplacian(gray_face, cv2.CV_64F).var())
+
+
+def estimate_yaw(landmarks):
+    """
+    Rough yaw estimate from MTCNN landmarks.
+
+    Args:
+        landmarks: (5, 2) array: left eye, right eye, nose, mouth left, mouth right
+
+    Returns:
+        float: Horizontal nose offset from the eye midpoint, in half eye
+        distances (0 = frontal, >= 1 = nose outside the eyes, i.e. profile)
+    """
+    if landmarks is None:
+        return 0.0
+    landmarks = np.asarray(landmarks, dtype=np.float32).reshape(5, 2)
+    left_eye, right_eye, nose = landmarks[0], landmarks[1], landmarks[2]
+    half_eye_dist = np.linalg.norm(right_eye - left_eye) / 2.0
+    if half_eye_dist < 1e-6:
+        return MAX_YAW_RATIO
+    eye_mid_x = (left_eye[0] + right_eye[0]) / 2.0
+    return float(abs(nose[0] - eye_mid_x) / half_eye_dist)
+
+
+def score_face(prob, landmarks, sharpness, size):
+    """
+    Quality score of a detected face.
+
+    Args:
+        prob: MTCNN detection probability
+        landmarks: (5, 2) landmarks or None (pose is then not penalised)
+        sharpness: Laplacian variance of the face (see face_sharpness)
+        size: Shorter side of the face box in pixels
+
+    Returns:
+        (score, components): score in [0, 1] and a dict of the component scores
+    """
+    components = {
+        "detection": float(np.clip((prob - PROB_FLOOR) / (1.0 - PROB_FLOOR), 0.0, 1.0)),
+        "pose": float(np.clip(1.0 - estimate_yaw(landmarks) / MAX_YAW_RATIO, 0.0, 1.0)),
+        "sharpness": float(min(1.0, sharpness / SHARPNESS_REF)),
+        "size": float(np.clip((size - MIN_FACE_SIZE) / (GOOD_FACE_SIZE - MIN_FACE_SIZE), 0.0, 1.0))
+    }
+    values = np.array(list(components.values()))
+    if np.any(values <= 0.0):
+        return 0.0, components
+    score = float(np.exp(np.log(values).mean()))
+    return score, components
+
+
+def passes_quality(score, threshold=None):
+    """True if a face is good enough to embed."""
+    return score >= (FACE_QUALITY_MIN if threshold is None else threshold)
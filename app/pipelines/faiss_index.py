@@ -7,6 +7,9 @@ Uses L2 distance for matching face embeddings.
 import faiss
 import numpy as np
 import os
+import time
+
+from utils.metrics import observe
 
 # Configuration
 DIM = 512  # Face embedding dimension (FaceNet default)
@@ -50,7 +53,9 @@ def search_embedding(embedding, threshold=0.8):
         tuple: (embedding_id, distance) if match found, (None, None) otherwise
     """
     embedding = np.array(embedding).astype("float32").reshape(1, -1)
+    start = time.perf_counter()
     distances, indices = index.search(embedding, 1)
+    observe("faiss_search_seconds", time.perf_counter() - start)
     
     if distances[0][0] < threshold:
         return indices[0][0], distances[0][0]
@@ -0,0 +1,211 @@
+"""
+Frame Context Module
+
+Per-frame container that computes colour conversions, resized copies and
+model-ready tensors lazily and at most once per frame. Every pipeline stage
+reads from the same FrameContext instead of converting the frame itself.
+
+Output arrays (RGB, grey, resized copies) are written into buffers that are
+reused from frame to frame, so steady-state processing does not allocate new
+full-frame arrays. Each context checks a FrameBufferPool out of its camera's
+free list and owns it until release(); two contexts alive at the same time
+(e.g. two streams of one camera) never share buffers. As a consequence,
+views obtained from a context are only valid until it is released: copy
+them if they must outlive it. A context that is never released just drops
+its pool (no reuse, still correct).
+"""
+import threading
+import time
+
+import cv2
+import numpy as np
+
+
+class FrameBufferPool:
+    """
+    Reusable output buffers, keyed by purpose, shape and dtype.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, key, shape, dtype=np.uint8):
+        """Return a buffer for `key` with the given shape, reallocating only if it changed."""
+        shape = tuple(shape)
+        buf = self._buffers.get(key)
+        if buf is None or buf.shape != shape or buf.dtype != dtype:
+            buf = np.empty(shape, dtype=dtype)
+            self._buffers[key] = buf
+        return buf
+
+    def clear(self):
+        self._buffers.clear()
+
+
+# Free buffer pools per camera (usually one; more while streams overlap)
+MAX_FREE_POOLS = 4
+_free_pools = {}
+_pools_lock = threading.Lock()
+
+
+def acquire_buffer_pool(camera_id):
+    """Take a free buffer pool of a camera (or a new one); the caller owns it."""
+    with _pools_lock:
+        free = _free_pools.get(camera_id)
+        if free:
+            return free.pop()
+    return FrameBufferPool()
+
+
+def release_buffer_pool(camera_id, pool):
+    """Return a pool taken with acquire_buffer_pool() for reuse by later frames."""
+    with _pools_lock:
+        free = _free_pools.setdefault(camera_id, [])
+        if len(free) < MAX_FREE_POOLS:
+            free.append(pool)
+
+
+class FrameContext:
+    """
+    Lazily computed, memoised views of a single frame.
+
+    Args:
+        frame: BGR frame (OpenCV format); not modified
+        camera_id: Camera identifier (selects the buffer pool)
+        frame_count: Frame number
+        pool: Optional FrameBufferPool (default: one checked out of the
+            camera's free pools, returned by release())
+        captured_at: time.monotonic() when the frame was captured (default: now)
+        pts: Optional stream position of the frame in ms
+    """
+
+    def __init__(self, frame, camera_id="CAM_01", frame_count=0, pool=None, captured_at=None, pts=None):
+        self.camera_id = camera_id
+        self.frame_count = frame_count
+        self._owns_pool = pool is None
+        self.pool = acquire_buffer_pool(camera_id) if pool is None else pool
+        self.captured_at = time.monotonic() if captured_at is None else captured_at
+        self.pts = pts
+        self.timings = {}  # Stage name -> seconds spent on this frame (utils.metrics.stage_timer)
+        self._frame = frame
+        self._cache = {}
+
+    # ------------------------------------------------------------------
+    # Basic views
+    # ------------------------------------------------------------------
+    @property
+    def bgr(self):
+        """The frame itself (BGR)."""
+        return self._frame
+
+    @property
+    def shape(self):
+        return self._frame.shape
+
+    @property
+    def rgb(self):
+        """RGB version of the frame (computed once)."""
+        rgb = self._cache.get("rgb")
+        if rgb is None:
+            dst = self.pool.get("rgb", self._frame.shape)
+            rgb = cv2.cvtColor(self._frame, cv2.COLOR_BGR2RGB, dst=dst)
+            self._cache["rgb"] = rgb
+        return rgb
+
+    @property
+    def gray(self):
+        """Greyscale version of the frame (computed once)."""
+        gray = self._cache.get("gray")
+        if gray is None:
+            dst = self.pool.get("gray", self._frame.shape[:2])
+            gray = cv2.cvtColor(self._frame, cv2.COLOR_BGR2GRAY, dst=dst)
+            self._cache["gray"] = gray
+        return gray
+
+    def resized(self, size, color="bgr", interpolation=cv2.INTER_AREA):
+        """
+        Resized copy of the frame (computed once per size and colour).
+
+        Args:
+            size: (width, height) of the output
+            color: "bgr", "rgb" or "gray"
+            interpolation: OpenCV interpolation flag
+
+        Returns:
+            Resized image (buffer reused across frames)
+        """
+        size = (int(size[0]), int(size[1]))
+        key = ("resized", size, color)
+        img = self._cache.get(key)
+        if img is None:
+            source = {"bgr": self.bgr, "rgb": self.rgb, "gray": self.gray}[color]
+            if (source.shape[1], source.shape[0]) == size:
+                img = source
+            else:
+                shape = (size[1], size[0]) + source.shape[2:]
+                dst = self.pool.get(key, shape, source.dtype)
+                img = cv2.resize(source, size, dst=dst, interpolation=interpolation)
+            self._cache[key] = img
+        return img
+
+    def scaled(self, max_side, color="bgr", interpolation=cv2.INTER_AREA):
+        """
+        Downscaled copy whose longest side is at most max_side (aspect ratio kept).
+
+        Returns:
+            (image, scale) where scale = output size / original size (<= 1.0)
+        """
+        h, w = self._frame.shape[:2]
+        scale = min(1.0, float(max_side) / max(h, w))
+        if scale >= 1.0:
+            return {"bgr": self.bgr, "rgb": self.rgb, "gray": self.gray}[color], 1.0
+        size = (max(1, int(round(w * scale))), max(1, int(round(h * scale))))
+        return self.resized(size, color, interpolation), scale
+
+    # ------------------------------------------------------------------
+    # Model inputs
+    # ------------------------------------------------------------------
+    def tensor(self, key, build_fn):
+        """
+        Memoise a model-ready input built from this context.
+
+        Args:
+            key: Cache key (e.g. "resnet")
+            build_fn: Callable taking this context and returning the tensor
+
+        Returns:
+            The (cached) result of build_fn(self)
+        """
+        cache_key = ("tensor", key)
+        if cache_key not in self._cache:
+            self._cache[cache_key] = build_fn(self)
+        return self._cache[cache_key]
+
+    def memo(self, key, build_fn):
+        """Memoise any per-frame value (alias of tensor() for non-tensor results)."""
+        return self.tensor(key, build_fn)
+
+    # ------------------------------------------------------------------
+    # Replacement (e.g. after low-light enhancement)
+    # ------------------------------------------------------------------
+    def replace(self, frame):
+        """Swap in a new version of the frame and drop everything derived from the old one."""
+        self._frame = frame
+        self._cache.clear()
+
+    def release(self):
+        """
+        Hand the buffer pool back for the next frame. Views from this context
+        (including a replaced frame) must not be used afterwards.
+        """
+        if self._owns_pool and self.pool is not None:
+            release_buffer_pool(self.camera_id, self.pool)
+        self.pool = None
+        self._cache.clear()
+
+
+def as_context(frame, camera_id="CAM_01"):
+    """Wrap a frame in a FrameContext (no-op if it already is one)."""
+    if isinstance(frame, FrameContext):
+        return frame
+    return FrameContext(frame, camera_id=camera_id, pool=FrameBufferPool())
@@ -0,0 +1,174 @@
+"""
+Load Shedding Module
+
+Keeps a camera real-time when frames get expensive (crowds, night scenes).
+A LoadShedder per camera (see get_load_shedder) compares a moving average
+of the frame processing time with the camera's latency budget and walks a
+ladder of degradation levels, cheapest loss first:
+
+    1  skip GAN face super-resolution
+    2  skip Mask2Former
+    3  skip ResNet scene features (the whole scene stage)
+    4  embed faces only every SHED_FACE_INTERVAL frames
+    5  run the detector on a SHED_DETECTION_SIZE copy of the frame (its
+       boxes are scaled back up before tracking)
+
+It moves up one level after SHED_PATIENCE consecutive frames over budget,
+and back down after RESTORE_PATIENCE frames below RESTORE_FRACTION of the
+budget (hysteresis). Levels whose stage is not running (e.g. no GAN loaded)
+are skipped. Every change is logged.
+
+Load shedding is off unless a budget is set (LATENCY_BUDGET_MS or
+LATENCY_BUDGET per camera).
+"""
+import os
+
+from utils.metrics import set_gauge
+
+# Configuration
+# Per-frame processing budget in ms per camera; 0 disables load shedding
+LATENCY_BUDGET = {
+    "default": float(os.getenv("LATENCY_BUDGET_MS", "0"))
+    # "CAM_01": 100.0
+}
+SHED_EMA_ALPHA = 0.2          # Weight of the newest frame in the moving average
+SHED_PATIENCE = 5             # Frames over budget before shedding one more level
+RESTORE_PATIENCE = 30         # Frames with headroom before restoring one level
+RESTORE_FRACTION = 0.7        # Headroom: average below this fraction of the budget
+SHED_FACE_INTERVAL = 3        # Level 4+: run the face stage every Nth frame
+SHED_DETECTION_SIZE = int(os.getenv("SHED_DETECTION_SIZE", "480"))  # Level 5: detector input (long side)
+
+# Degradation ladder: (stage that is shed, description for the log)
+SHED_LEVELS = (
+    ("gan", "skip GAN super-resolution"),
+    ("mask2former", "skip Mask2Former"),
+    ("resnet", "skip ResNet scene features"),
+    ("faces", f"embed faces every {SHED_FACE_INTERVAL} frames"),
+    ("detector", f"detect at {SHED_DETECTION_SIZE} px")
+)
+
+
+def latency_budget(camera_id):
+    """Latency budget of a camera in ms (0 = load shedding off)."""
+    return LATENCY_BUDGET.get(camera_id, LATENCY_BUDGET["default"])
+
+
+class LoadShedder:
+    """
+    Per-camera degradation controller.
+
+    Args:
+        camera_id: Camera identifier (used in log messages)
+        budget_ms: Per-frame processing budget in ms (default: latency_budget(camera_id))
+    """
+
+    def __init__(self, camera_id="CAM_01", budget_ms=None):
+        self.camera_id = camera_id
+        self.budget_ms = latency_budget(camera_id) if budget_ms is None else budget_ms
+        self.level = 0
+        self.average_ms = None
+        self._over = 0
+        self._under = 0
+
+    @property
+    def enabled(self):
+        return self.budget_ms > 0
+
+    def sheds(self, stage):
+        """True if the given stage (see SHED_LEVELS) is currently degraded."""
+        for level, (name, _) in enumerate(SHED_LEVELS, start=1):
+            if name == stage:
+                return self.level >= level
+        return False
+
+    def run_faces(self, frame_count):
+        """True if the face stage should run on this frame."""
+        return not self.sheds("faces") or frame_count % SHED_FACE_INTERVAL == 0
+
+    def detection_size(self):
+        """Detector input size while shedding the detector, else None."""
+        return SHED_DETECTION_SIZE if self.sheds("detector") else None
+
+    def _set_level(self, level, reason):
+        old, self.level = self.level, level
+        self._over = self._under = 0
+        if level > old:
+            change = SHED_LEVELS[level - 1][1]
+        else:
+            change = f"restored {SHED_LEVELS[old - 1][0]}"
+        print(f"[{self.camera_id}] Load shedding: level {old} -> {level} ({change}) - {reason}")
+        set_gauge("load_shed_level", level, camera=self.camera_id)
+
+    def update(self, frame_ms, available=None):
+        """
+        Add the processing time of a frame and adjust the level.
+
+        Args:
+            frame_ms: Processing time of the frame in ms
+            available: Optional set of stage names that are running; levels
+                for other stages are skipped (shedding them would save nothing)
+
+        Returns:
+            int: Current level (0 = nothing shed)
+        """
+        if not self.enabled:
+            return self.level
+
+        if self.average_ms is None:
+            self.average_ms = frame_ms
+        else:
+            self.average_ms += SHED_EMA_ALPHA * (frame_ms - self.average_ms)
+
+        def usable(level):
+            return available is None or SHED_LEVELS[level - 1][0] in available
+
+        if self.average_ms > self.budget_ms:
+            self._under = 0
+            self._over += 1
+            if self._over >= SHED_PATIENCE:
+                level = self.level + 1
+                while level <= len(SHED_LEVELS) and not usable(level):
+                    level += 1
+                if level <= len(SHED_LEVELS):
+                    self._set_level(level, f"avg {self.average_ms:.0f} ms > budget {self.budget_ms:.0f} ms")
+                else:
+                    self._over = 0  # Nothing left to shed
+        elif self.average_ms < self.budget_ms * RESTORE_FRACTION:
+            self._over = 0
+            self._under += 1
+            if self._under >= RESTORE_PATIENCE and self.level > 0:
+                level = self.level - 1
+                while level > 0 and not usable(level):
+                    level -= 1
+                self._set_level(level, f"avg {self.average_ms:.0f} ms < "
+                                       f"{RESTORE_FRACTION:.0%} of budget {self.budget_ms:.0f} ms")
+        else:
+            self._over = self._under = 0
+        return self.level
+
+    def state(self):
+        """Current load shedding state for reporting."""
+        return {
+            "budget_ms": self.budget_ms,
+            "level": self.level,
+            "shed": [name for name, _ in SHED_LEVELS[:self.level]],
+            "average_ms": None if self.average_ms is None else round(self.average_ms, 1)
+        }
+
+
+# Global controllers, one per camera
+_shedders = {}
+
+
+def get_load_shedder(camera_id):
+    """Get (or create) the load shedder of a camera."""
+    shedder = _shedders.get(camera_id)
+    if shedder is None:
+        shedder = LoadShedder(camera_id)
+        _shedders[camera_id] = shedder
+    return shedder
+
+
+def load_shedding_states():
+    """Load shedding state of every camera seen so far."""
+    return {camera_id: shedder.state() for camera_id, shedder in _shedders.items()}
@@ -8,6 +8,83 @@ import torch
 import cv2
 import numpy as np
 from PIL import Image
+from app.pipelines.frame_context import as_context
+
+# Configuration: ResNet scene embedding
+SCENE_INPUT_SIZE = 224  # Input resolution the ImageNet weights were trained on
+# Pooling mode:
+#   "resize" - squash the whole frame to SCENE_INPUT_SIZE x SCENE_INPUT_SIZE
+#   "center" - resize short side, take the centre crop (ImageNet eval protocol)
+#   "multi"  - average the embeddings of five crops (4 corners + centre)
+SCENE_POOLING = "resize"
+IMAGENET_MEAN = torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1)
+IMAGENET_STD = torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1)
+
+
+def _to_normalized_tensor(images):
+    """Stack uint8 RGB images (HWC) into an ImageNet-normalised NCHW float tensor."""
+    batch = torch.from_numpy(np.ascontiguousarray(np.stack(images)))
+    batch = batch.permute(0, 3, 1, 2).float().div_(255.0)
+    return batch.sub_(IMAGENET_MEAN).div_(IMAGENET_STD)
+
+
+def preprocess_scene(frame, input_size=SCENE_INPUT_SIZE, pooling=SCENE_POOLING):
+    """
+    Build the ResNet input batch for a frame.
+
+    Args:
+        frame: BGR frame or FrameContext
+        input_size: Square input size fed to ResNet
+        pooling: "resize", "center" or "multi" (see SCENE_POOLING)
+
+    Returns:
+        Normalised tensor of shape (N, 3, input_size, input_size), N = 5 for
+        "multi" pooling and 1 otherwise
+    """
+    ctx = as_context(frame)
+    if pooling == "resize":
+        return _to_normalized_tensor([ctx.resized((input_size, input_size), "rgb")])
+
+    # Resize the short side to input_size * 256/224 (standard ImageNet ratio)
+    h, w = ctx.shape[:2]
+    short = int(round(input_size * 256 / 224))
+    scale = short / min(h, w)
+    resized = ctx.resized((max(short, int(round(w * scale))), max(short, int(round(h * scale)))), "rgb")
+    rh, rw = resized.shape[:2]
+
+    cy, cx = (rh - input_size) // 2, (rw - input_size) // 2
+    offsets = [(cy, cx)]
+    if pooling == "multi":
+        offsets += [(0, 0), (0, rw - input_size), (rh - input_size, 0), (rh - input_size, rw - input_size)]
+    crops = [resized[y:y + input_size, x:x + input_size] for y, x in offsets]
+    return _to_normalized_tensor(crops)
+
+
+@torch.no_grad()
+def compute_scene_embedding(resnet, frame, device="cpu", input_size=SCENE_INPUT_SIZE,
+                            pooling=SCENE_POOLING):
+    """
+    Compute an L2-normalised ResNet scene embedding.
+
+    Args:
+        resnet: ResNet feature extractor (classification layer removed)
+        frame: BGR frame or FrameContext
+        device: Device to run on
+        input_size: Square input size fed to ResNet
+        pooling: "resize", "center" or "multi" (see SCENE_POOLING)
+
+    Returns:
+        numpy array of shape (1, feature_dim), unit L2 norm
+    """
+    ctx = as_context(frame)
+    batch = ctx.tensor(("resnet", input_size, pooling),
+                       lambda c: preprocess_scene(c, input_size, pooling).to(device))
+
+    features = resnet(batch).flatten(start_dim=1)
+    # Multi-crop: average the crop embeddings
+    features = features.mean(dim=0, keepdim=True)
+    features = torch.nn.functional.normalize(features, p=2, dim=1)
+    return features.cpu().numpy().astype(np.float32)
 
 
 def run_scene_models(frame, mask2former_model, mask2former_processor, resnet, device):
@@ -15,7 +92,7 @@ def run_scene_models(frame, mask2former_model, mask2former_processor, resnet, de
     Run Mask2Former for scene/zone semantics and ResNet for context features.
     
     Args:
-        frame: BGR frame (OpenCV format)
+        frame: BGR frame (OpenCV format) or FrameContext
         mask2former_model: Mask2Former model (optional, can be None)
         mask2former_processor: Mask2Former processor (optional, can be None)
         resnet: ResNet model
@@ -24,15 +101,15 @@ def run_scene_models(frame, mask2former_model, mask2former_processor, resnet, de
     Returns:
         Dictionary with scene_features and segmentation (if available)
     """
+    ctx = as_context(frame)
+
     with torch.no_grad():
-        # Convert BGR to RGB
-        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        pil_image = Image.fromarray(rgb_frame)
-        
         # Process with Mask2Former (if available)
         mask2former_outputs = None
         if mask2former_model is not None and mask2former_processor is not None:
             try:
+                # RGB view shared with the other pipeline stages
+                pil_image = Image.fromarray(ctx.rgb)
                 inputs = mask2former_processor(images=pil_image, return_tensors="pt")
                 inputs = {k: v.to(device) for k, v in inputs.items()}
                 # Mask2Former forward pass
@@ -41,22 +118,8 @@ def run_scene_models(frame, mask2former_model, mask2former_processor, resnet, de
                 print(f"Warning: Mask2Former processing failed: {e}")
                 mask2former_outputs = None
         
-        # ResNet for scene features
-        # Preprocess for ResNet
-        img_tensor = torch.from_numpy(rgb_frame).permute(2, 0, 1).unsqueeze(0).float()
-        img_tensor = img_tensor / 255.0
-        img_tensor = img_tensor.to(device)
-        
-        # ResNet forward pass
-        scene_features = resnet(img_tensor)
-        
-        # Extract features (before final classification layer)
-        if hasattr(scene_features, 'flatten'):
-            scene_features = scene_features.flatten(start_dim=1)
-        else:
-            scene_features = scene_features.view(scene_features.size(0), -1)
-        
-        scene_features = scene_features.cpu().numpy()
+        # ResNet for scene features (224x224, ImageNet-normalised, L2-normalised)
+        scene_features = compute_scene_embedding(resnet, ctx, device)
 
     result = {
         "scene_features": scene_features
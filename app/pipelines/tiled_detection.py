@@ -0,0 +1,182 @@
+"""
+Tiled Detection Module
+
+High-resolution detection for small, distant people. YOLO resizes the whole
+frame to its 640 px input, so on a 4K frame a person 60 px tall shrinks to
+about 10 px and is missed. Tiled mode instead:
+1. splits the frame (or only its far-field regions) into overlapping
+   tiles of roughly the detector's input size
+2. runs all tiles, plus the downscaled full frame for large/near people,
+   through YOLO as one batch
+3. shifts tile boxes back to frame coordinates, drops a box cut by a tile
+   border only if another tile holds its whole extent away from that
+   tile's own borders (that tile sees more of the object), and merges
+   everything with class-aware NMS
+
+Objects larger than the overlap, or straddling a far-field region edge,
+have no tile showing them whole; their cut boxes are kept and NMS merges
+them with the full-frame detection.
+
+Cost is bounded by MAX_TILES: if a region needs more tiles, the tiles grow
+(and each is downsampled a little more by YOLO).
+"""
+import math
+
+import numpy as np
+import torch
+import torchvision
+
+# Configuration
+TILE_SIZE = 640              # Tile side in pixels (YOLO input size)
+TILE_OVERLAP = 0.2           # Overlap between neighbouring tiles (fraction of the tile)
+TILE_NMS_IOU = 0.5           # IoU threshold of the cross-tile NMS
+TILE_EDGE_MARGIN = 2         # Boxes within this many px of an inner tile border count as cut
+TILE_INCLUDE_FULL_FRAME = True  # Also run the whole (downscaled) frame for near/large objects
+MAX_TILES = 12               # Upper bound on tiles per frame (cost bound)
+
+# Far-field regions per camera as fractions of the frame (x1, y1, x2, y2)
+# Only these regions are tiled; cameras not listed are tiled completely.
+FAR_FIELD_REGIONS = {
+    # "CAM_01": [(0.0, 0.0, 1.0, 0.45)]  # Top of the frame: far from the camera
+}
+
+
+def _axis_starts(length, tile, overlap):
+    """Start offsets of tiles covering [0, length) with the given overlap."""
+    if length <= tile:
+        return [0]
+    stride = max(1, int(tile * (1.0 - overlap)))
+    count = math.ceil((length - tile) / stride) + 1
+    starts = [min(i * stride, length - tile) for i in range(count)]
+    return sorted(set(starts))
+
+
+def tile_grid(frame_shape, regions=None, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, max_tiles=MAX_TILES):
+    """
+    Overlapping tiles covering the frame or a set of regions.
+
+    Args:
+        frame_shape: Frame shape (h, w, ...)
+        regions: Optional list of (x1, y1, x2, y2) regions as fractions of the frame
+        tile_size: Tile side in pixels
+        overlap: Overlap between neighbouring tiles (fraction)
+        max_tiles: Maximum number of tiles; larger tiles are used beyond that
+
+    Returns:
+        List of (x1, y1, x2, y2) tiles in pixel coordinates
+    """
+    h, w = frame_shape[:2]
+    if not regions:
+        regions = [(0.0, 0.0, 1.0, 1.0)]
+    pixel_regions = [
+        (int(rx1 * w), int(ry1 * h), int(math.ceil(rx2 * w)), int(math.ceil(ry2 * h)))
+        for rx1, ry1, rx2, ry2 in regions
+    ]
+
+    size = tile_size
+    while True:
+        tiles = []
+        for x1, y1, x2, y2 in pixel_regions:
+            rw, rh = min(x2, w) - x1, min(y2, h) - y1
+            if rw <= 0 or rh <= 0:
+                continue
+            tw, th = min(size, rw), min(size, rh)
+            for ty in _axis_starts(rh, th, overlap):
+                for tx in _axis_starts(rw, tw, overlap):
+                    tiles.append((x1 + tx, y1 + ty, x1 + tx + tw, y1 + ty + th))
+        if len(tiles) <= max_tiles or size >= max(h, w):
+            return tiles
+        size = int(size * 1.25)
+
+
+def _cut_by_tile(boxes, tile, frame_w, frame_h, margin=TILE_EDGE_MARGIN):
+    """Mask of boxes touching a tile border that is not also a frame border."""
+    x1, y1, x2, y2 = tile
+    cut = np.zeros(len(boxes), dtype=bool)
+    if x1 > 0:
+        cut |= boxes[:, 0] <= x1 + margin
+    if y1 > 0:
+        cut |= boxes[:, 1] <= y1 + margin
+    if x2 < frame_w:
+        cut |= boxes[:, 2] >= x2 - margin
+    if y2 < frame_h:
+        cut |= boxes[:, 3] >= y2 - margin
+    return cut
+
+
+def _shown_by_other_tile(boxes, tiles, index, frame_w, frame_h, margin=TILE_EDGE_MARGIN):
+    """
+    Mask of boxes lying inside another tile without touching its inner borders.
+
+    Such a tile sees a larger part of the object than tiles[index], so a
+    box cut by tiles[index] can be dropped in favour of that tile's copy.
+    """
+    shown = np.zeros(len(boxes), dtype=bool)
+    for other, tile in enumerate(tiles):
+        if other == index:
+            continue
+        x1, y1, x2, y2 = tile
+        inside = ((boxes[:, 0] >= x1) & (boxes[:, 1] >= y1) &
+                  (boxes[:, 2] <= x2) & (boxes[:, 3] <= y2))
+        shown |= inside & ~_cut_by_tile(boxes, tile, frame_w, frame_h, margin)
+    return shown
+
+
+def detect_tiled(frame, yolo, conf=0.4, classes=None, camera_id="CAM_01", regions=None):
+    """
+    Run YOLO on overlapping tiles and merge the results.
+
+    Args:
+        frame: BGR frame
+        yolo: Ultralytics YOLO model
+        conf: Confidence threshold
+        classes: Optional list of class IDs to keep
+        camera_id: Camera identifier (selects the far-field regions)
+        regions: Optional regions overriding FAR_FIELD_REGIONS
+
+    Returns:
+        (boxes, scores, class_ids): (N, 4) xyxy boxes in frame coordinates,
+        (N,) confidences and (N,) integer class IDs
+    """
+    h, w = frame.shape[:2]
+    if regions is None:
+        regions = FAR_FIELD_REGIONS.get(camera_id)
+    tiles = tile_grid(frame.shape, regions)
+
+    images = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+    offsets = list(tiles)
+    if TILE_INCLUDE_FULL_FRAME:
+        images.append(frame)
+        offsets.append(None)
+
+    # One batched forward pass over all tiles
+    results = yolo(images, conf=conf, classes=classes, imgsz=TILE_SIZE, verbose=False)
+
+    all_boxes, all_scores, all_classes = [], [], []
+    for index, (result, tile) in enumerate(zip(results, offsets)):
+        if result.boxes is None or len(result.boxes) == 0:
+            continue
+        boxes = result.boxes.xyxy.cpu().numpy().astype(np.float32)
+        scores = result.boxes.conf.cpu().numpy().astype(np.float32)
+        cls = result.boxes.cls.cpu().numpy().astype(np.int64)
+        if tile is not None:
+            # Back to frame coordinates; drop cut objects another tile shows whole
+            boxes = boxes + np.array([tile[0], tile[1]] * 2, dtype=np.float32)
+            keep = ~(_cut_by_tile(boxes, tile, w, h) & _shown_by_other_tile(boxes, tiles, index, w, h))
+            boxes, scores, cls = boxes[keep], scores[keep], cls[keep]
+        all_boxes.append(boxes)
+        all_scores.append(scores)
+        all_classes.append(cls)
+
+    if not all_boxes:
+        return np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+    boxes = np.concatenate(all_boxes)
+    scores = np.concatenate(all_scores)
+    cls = np.concatenate(all_classes)
+
+    # Cross-tile NMS (per class): the same object seen in several tiles / the full frame
+    keep = torchvision.ops.batched_nms(
+        torch.from_numpy(boxes), torch.from_numpy(scores), torch.from_numpy(cls), TILE_NMS_IOU
+    ).numpy()
+    return boxes[keep], scores[keep], cls[keep]
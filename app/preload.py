@@ -0,0 +1,145 @@
+"""
+Preload-then-fork Deployment Support
+
+Lets several web workers share one copy of the model weights. The models
+are loaded once in the gunicorn master process, made read-only, and the
+workers are forked from it. Forked workers share the parent's memory pages
+copy-on-write, so the weights stay shared as long as nobody writes to them:
+- parameters are frozen (eval mode, requires_grad=False) so inference
+  never writes to weight storage
+- gc.freeze() moves every object loaded so far into the permanent
+  generation, so the garbage collector does not touch (and copy) the pages
+  holding them
+- per-worker resources (torch thread pool, DB connections) are set up
+  after the fork
+
+See gunicorn.conf.py for the server configuration that uses this module.
+"""
+import gc
+import os
+
+import torch
+
+from app.model_registry import ModelRegistry, warm_up
+from app.models_loader import MODEL_NAMES
+
+# Configuration
+PRELOAD_MODELS = os.getenv("PRELOAD_MODELS", "0") == "1"
+# Torch intra-op threads per worker (0 = cpu_count // workers)
+TORCH_THREADS_PER_WORKER = int(os.getenv("TORCH_THREADS_PER_WORKER", "0"))
+
+
+def _torch_modules(model):
+    """Yield the torch.nn.Modules held by a pipeline model object."""
+    if model is None:
+        return
+    if isinstance(model, torch.nn.Module):
+        yield model
+    elif isinstance(model, (tuple, list)):
+        # Mask2Former is stored as (model, processor)
+        for item in model:
+            yield from _torch_modules(item)
+    elif isinstance(getattr(model, "model", None), torch.nn.Module):
+        # Ultralytics YOLO wraps the network in .model
+        yield model.model
+
+
+def freeze_models(models):
+    """
+    Make all loaded weights read-only so forked workers never copy them.
+
+    Args:
+        models: ModelRegistry or models dict
+    """
+    from app.models.zeroDce import get_zerodce_model
+
+    objects = [models.get(name) for name in MODEL_NAMES]
+    objects.append(get_zerodce_model())
+    for obj in objects:
+        for module in _torch_modules(obj):
+            module.eval()
+            module.requires_grad_(False)
+
+    # Keep the garbage collector away from pre-fork objects
+    gc.collect()
+    gc.freeze()
+
+
+def preload_models():
+    """
+    Load every model (including lazy ones) synchronously in the parent process.
+
+    Warm-up is skipped here: running forward passes before the fork starts
+    torch's thread pool, which is not fork-safe. Workers warm up in after_fork().
+
+    Returns:
+        ModelRegistry with all models loaded
+    """
+    print("Preloading models in parent process (copy-on-write shared across workers)...")
+    models = ModelRegistry(lazy=(), warmup=False).start()
+    models.wait(include_optional=True)
+    # No loader threads may be alive when the server forks
+    models.shutdown(wait=True)
+    freeze_models(models)
+    print("Models preloaded and frozen")
+    return models
+
+
+def after_fork(models, workers=1):
+    """
+    Per-worker setup, called in each worker right after the fork.
+
+    Args:
+        models: The preloaded ModelRegistry
+        workers: Number of workers sharing the machine
+    """
+    threads = TORCH_THREADS_PER_WORKER or max(1, (os.cpu_count() or 1) // max(1, workers))
+    torch.set_num_threads(threads)
+
+    # Connections opened in the parent must not be shared with the workers
+    try:
+        from utils.db import engine
+        engine.dispose(close=False)
+    except Exception as e:
+        print(f"Warning: Could not reset DB connection pool after fork: {e}")
+
+    for name in MODEL_NAMES:
+        try:
+            warm_up(name, models.get(name), models.device)
+        except Exception as e:
+            print(f"Warning: Warm-up of {MODEL_NAMES[name]} failed: {e}")
+
+    print(f"Worker {os.getpid()} ready ({threads} torch threads)")
+
+
+def process_memory():
+    """
+    Memory usage of the current process, split into shared and private pages.
+
+    Uses /proc/self/smaps_rollup (Linux). PSS counts shared pages divided by
+    the number of processes sharing them, so summing PSS over all workers
+    gives the real total footprint.
+
+    Returns:
+        dict with rss_mb, pss_mb, shared_mb and private_mb (empty if unavailable)
+    """
+    fields = {
+        "Rss": "rss_mb",
+        "Pss": "pss_mb",
+        "Shared_Clean": "shared_mb",
+        "Shared_Dirty": "shared_mb",
+        "Private_Clean": "private_mb",
+        "Private_Dirty": "private_mb"
+    }
+    memory = {}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                key = parts[0].rstrip(":")
+                if key in fields:
+                    name = fields[key]
+                    memory[name] = memory.get(name, 0.0) + int(parts[1]) / 1024.0
+    except (OSError, ValueError, IndexError):
+        return {}
+    return {k: round(v, 1) for k, v in memory.items()}
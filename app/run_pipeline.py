@@ -13,14 +13,98 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from app.models_loader import load_all_models
 from app.full_pipeline import process_frame
+from utils.latency import read_stamped
 
-def main(video_source=0, camera_id="CAM_01"):
+
+def save_frame_alerts(alerts, frame_count):
+    """Print a frame's alerts and save them to the database."""
+    print(f"\nFrame {frame_count} - Alerts:")
+    try:
+        from app.pipelines.db_writer import save_alerts
+        
+        for alert in alerts:
+            print(f"   {alert}")
+        
+        # Records carry type, track, zone and capture time: one transaction per frame
+        save_alerts(alerts)
+    except Exception as e:
+        print(f"Warning: Could not save alerts to database: {e}")
+
+
+def run_shared_memory(video_source, camera_id, models):
+    """
+    Run the pipeline with decoding in a separate process.
+    
+    The decoder writes frames into a shared-memory ring (utils/frame_ring.py)
+    and this loop always processes a copy of the newest one (the decoder
+    keeps writing while a frame is processed), so decoding overlaps
+    inference and frames are dropped (counted in frames_dropped_total)
+    instead of queueing up when inference falls behind.
+    
+    Args:
+        video_source: Video source (camera index, file path or stream URL)
+        camera_id: Camera identifier
+        models: Loaded models
+    """
+    from utils.frame_ring import start_decoder
+    
+    ring, decoder, stop_event = start_decoder(video_source)
+    print(f"Decoder process started (shared-memory ring, {ring.slots} slots)")
+    print("Press 'q' to quit, 'ESC' to exit\n")
+    
+    seq = -1
+    frame_count = 0
+    try:
+        while True:
+            seq_next, frame, captured_at, dropped = ring.wait_next(seq, timeout=1.0, camera_id=camera_id)
+            if seq_next is None:
+                if not decoder.is_alive():
+                    print("Decoder finished")
+                    break
+                continue
+            seq = seq_next
+            
+            output_frame, scene_features, alerts = process_frame(
+                frame,
+                models,
+                camera_id=camera_id,
+                frame_count=frame_count,
+                db_people=None,
+                captured_at=captured_at
+            )
+            
+            cv2.imshow("Surveillance - Real-time Output (After DeepSORT)", output_frame)
+            if alerts:
+                save_frame_alerts(alerts, frame_count)
+            
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q') or key == 27:  # 'q' or ESC
+                print("\n🛑 Stopping pipeline...")
+                break
+            
+            frame_count += 1
+            if frame_count % 100 == 0:
+                print(f"Processed {frame_count} frames...")
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user")
+    finally:
+        stop_event.set()
+        decoder.join(timeout=5)
+        ring.close()
+        ring.unlink()
+        cv2.destroyAllWindows()
+        print("Pipeline stopped. Cleanup complete.")
+
+
+def main(video_source=0, camera_id="CAM_01", shared_memory=False):
     """
     Main function to run the surveillance pipeline.
     
     Args:
         video_source: Video source (0 for webcam, or path to video file)
         camera_id: Camera identifier
+        shared_memory: Decode in a separate process through a shared-memory
+            frame ring (see run_shared_memory)
     """
     print("Starting Surveillance Pipeline...")
     print("=" * 60)
@@ -35,6 +119,10 @@ def main(video_source=0, camera_id="CAM_01"):
     models = load_all_models()
     print("Models loaded\n")
     
+    if shared_memory:
+        run_shared_memory(video_source, camera_id, models)
+        return
+    
     # Open video source with better error handling
     print(f"\nAttempting to open video source: {video_source}")
     
@@ -139,7 +227,7 @@ def main(video_source=0, camera_id="CAM_01"):
     
     try:
         while True:
-            ret, frame = cap.read()
+            ret, frame, captured_at, pts = read_stamped(cap)
             
             if not ret or frame is None or frame.size == 0:
                 consecutive_failures += 1
@@ -150,6 +238,7 @@ def main(video_source=0, camera_id="CAM_01"):
                     # Try grabbing without retrieving
                     if cap.grab():
                         ret, frame = cap.retrieve()
+                        captured_at, pts = time.monotonic(), None
                         if ret and frame is not None and frame.size > 0:
                             consecutive_failures = 0
                             print("Successfully reading frames now!")
@@ -183,7 +272,9 @@ def main(video_source=0, camera_id="CAM_01"):
                 models,
                 camera_id=camera_id,
                 frame_count=frame_count,
-                db_people=None
+                db_people=None,
+                captured_at=captured_at,
+                pts=pts
             )
             
             # 🔴 OUTPUT 1: Display real-time output after DeepSORT
@@ -191,34 +282,7 @@ def main(video_source=0, camera_id="CAM_01"):
             
             # Save alerts to database and print to console
             if alerts:
-                print(f"\nFrame {frame_count} - Alerts:")
-                try:
-                    from app.pipelines.db_writer import save_alert
-                    
-                    for alert_msg in alerts:
-                        print(f"   {alert_msg}")
-                        
-                        # Determine alert type and save to database
-                        alert_type = None
-                        if "Unknown" in alert_msg or "Unknown person" in alert_msg:
-                            alert_type = "UNKNOWN_PERSON"
-                        elif "Restricted Zone" in alert_msg:
-                            alert_type = "RESTRICTED_ZONE"
-                        elif "Loitering" in alert_msg or "Stationary" in alert_msg:
-                            alert_type = "STATIONARY"
-                        
-                        if alert_type:
-                            # Extract track_id from alert message if possible
-                            track_id = None
-                            if "Track" in alert_msg:
-                                try:
-                                    track_id = int(alert_msg.split("Track")[-1].strip())
-                                except:
-                                    pass
-                            
-                            save_alert(camera_id, track_id, alert_type, alert_msg)
-                except Exception as e:
-                    print(f"Warning: Could not save alerts to database: {e}")
+                save_frame_alerts(alerts, frame_count)
             
             # Print scene features info (every 15 frames)
             if scene_features and frame_count % 15 == 0:
@@ -266,6 +330,11 @@ if __name__ == "__main__":
         default="CAM_01",
         help="Camera identifier"
     )
+    parser.add_argument(
+        "--shared-memory",
+        action="store_true",
+        help="Decode in a separate process through a shared-memory frame ring"
+    )
     
     args = parser.parse_args()
     
@@ -275,4 +344,4 @@ if __name__ == "__main__":
     except ValueError:
         video_source = args.source
     
-    main(video_source=video_source, camera_id=args.camera_id)
+    main(video_source=video_source, camera_id=args.camera_id, shared_memory=args.shared_memory)
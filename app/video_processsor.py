@@ -7,6 +7,7 @@ Compatible with FastAPI streaming or standalone use.
 import cv2
 from app.full_pipeline import full_pipeline
 from app.pipelines.face_matcher import match_face, get_db_people
+from utils.latency import read_stamped
 
 # Optional database imports (can be disabled if not using database)
 try:
@@ -18,7 +19,7 @@ except ImportError:
 
 # Optional db_writer imports
 try:
-    from app.pipelines.db_writer import save_detection, save_alert
+    from app.pipelines.db_writer import save_detection, save_alerts
     DB_WRITER_AVAILABLE = True
 except:
     DB_WRITER_AVAILABLE = False
@@ -65,7 +66,7 @@ def mjpeg_generator(video_source=0, camera_id="CAM_01", models=None):
 
     try:
         while True:
-            ret, frame = cap.read()
+            ret, frame, captured_at, pts = read_stamped(cap)
             if not ret:
                 break
 
@@ -75,7 +76,9 @@ def mjpeg_generator(video_source=0, camera_id="CAM_01", models=None):
                 camera_id=camera_id,
                 models=models,
                 frame_count=frame_count,
-                db_people=db_people
+                db_people=db_people,
+                captured_at=captured_at,
+                pts=pts
             )
 
             # Save detections to database (if available)
@@ -96,20 +99,10 @@ def mjpeg_generator(video_source=0, camera_id="CAM_01", models=None):
 
             # Save alerts to database (if available)
             if DB_WRITER_AVAILABLE and alerts:
-                for alert in alerts:
-                    alert_type = None
-                    if "Unknown" in alert or "Unknown person" in alert:
-                        alert_type = "UNKNOWN_PERSON"
-                    elif "Restricted Zone" in alert:
-                        alert_type = "RESTRICTED_ZONE"
-                    elif "Loitering" in alert or "loitering" in alert or "Stationary" in alert:
-                        alert_type = "STATIONARY"
-                    
-                    if alert_type:
-                        try:
-                            save_alert(camera_db_id, None, alert_type, alert)
-                        except Exception as e:
-                            print(f"Error saving alert: {e}")
+                try:
+                    save_alerts(alerts)
+                except Exception as e:
+                    print(f"Error saving alerts: {e}")
 
             # Encode frame as JPEG for streaming
             _, jpeg = cv2.imencode(".jpg", frame)
@@ -151,7 +144,7 @@ def process_video_file(video_path, camera_id="CAM_01", display=True):
 
     try:
         while True:
-            ret, frame = cap.read()
+            ret, frame, captured_at, pts = read_stamped(cap)
             if not ret:
                 break
 
@@ -161,7 +154,9 @@ def process_video_file(video_path, camera_id="CAM_01", display=True):
                 models,
                 camera_id=camera_id,
                 frame_count=frame_count,
-                db_people=db_people
+                db_people=db_people,
+                captured_at=captured_at,
+                pts=pts
             )
 
             # Display if requested
@@ -0,0 +1,146 @@
+"""
+Dual-resolution Detection Benchmark
+
+End-to-end latency of detection + tracking + face processing for
+720p / 1080p / 4K inputs, comparing:
+- "standard": YOLO and DeepSORT on the full-resolution frame
+- "downscaled": YOLO and DeepSORT on a copy shrunk to DETECTION_INPUT_SIZE,
+  boxes mapped back so faces are still cropped at full resolution
+
+The same source frames (from --video, --image or synthetic noise) are
+resized to every resolution. A fresh tracker is used per case.
+
+Usage:
+    python -m benchmarks.detection_resolution_bench --video sample.mp4 --frames 30
+    python -m benchmarks.detection_resolution_bench --random-weights --frames 10
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.pipelines import detect_n_track
+from app.pipelines.detect_n_track import detect_and_track
+from app.pipelines.face_pipeline import process_faces
+from app.pipelines.frame_context import FrameContext
+
+RESOLUTIONS = {
+    "720p": (720, 1280),
+    "1080p": (1080, 1920),
+    "4k": (2160, 3840)
+}
+MODES = ("standard", "downscaled")
+CAMERA_ID = "BENCH"
+
+
+def load_source_frames(args):
+    """Source frames (any size) from --video, --image or synthetic noise."""
+    if args.video:
+        cap = cv2.VideoCapture(args.video)
+        frames = []
+        while len(frames) < args.frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        if not frames:
+            raise SystemExit(f"ERROR: Cannot read frames from {args.video}")
+        return frames
+    if args.image:
+        frame = cv2.imread(args.image)
+        if frame is None:
+            raise SystemExit(f"ERROR: Cannot read image {args.image}")
+        return [frame] * args.frames
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 256, (540, 960, 3), dtype=np.uint8) for _ in range(args.frames)]
+
+
+def load_models(args):
+    """YOLO, MTCNN and FaceNet (untrained YOLO/FaceNet with --random-weights)."""
+    from app.models.mtcnn import load_mtcnn
+    if args.random_weights:
+        from ultralytics import YOLO
+        from facenet_pytorch import InceptionResnetV1
+        yolo = YOLO("yolov8n.yaml")
+        facenet = InceptionResnetV1().eval()
+    else:
+        from app.models.yolo import load_yolo
+        from app.models.facenet import load_facenet
+        yolo = load_yolo()
+        facenet = load_facenet()
+    return yolo, load_mtcnn("cpu"), facenet
+
+
+def run_case(frames, models, mode):
+    """Per-frame stage timings (ms) for one mode."""
+    from app.models.deepsort import load_deepsort
+    yolo, mtcnn, facenet = models
+    tracker = load_deepsort(device="cpu")
+    detect_n_track.DETECTION_MODE[CAMERA_ID] = mode
+
+    timings = {"detect_track": [], "faces": [], "total": []}
+    for frame_count, frame in enumerate(frames):
+        start = time.perf_counter()
+        ctx = FrameContext(frame, camera_id=CAMERA_ID, frame_count=frame_count)
+        tracked = detect_and_track(ctx, yolo, tracker, CAMERA_ID)
+        mid = time.perf_counter()
+        people = [obj for obj in tracked if obj["class"] == "person"]
+        if people:
+            process_faces(ctx, people, mtcnn, None, facenet, "cpu")
+        end = time.perf_counter()
+        if frame_count == 0:
+            continue  # Warm-up
+        timings["detect_track"].append((mid - start) * 1000.0)
+        timings["faces"].append((end - mid) * 1000.0)
+        timings["total"].append((end - start) * 1000.0)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Standard vs downscaled detection, end to end")
+    parser.add_argument("--video", default=None, help="Video file to take frames from")
+    parser.add_argument("--image", default=None, help="Single image to repeat")
+    parser.add_argument("--frames", type=int, default=30, help="Frames per case (the first is a warm-up)")
+    parser.add_argument("--resolutions", default="720p,1080p,4k",
+                        help=f"Comma-separated input sizes ({', '.join(RESOLUTIONS)})")
+    parser.add_argument("--random-weights", action="store_true",
+                        help="Untrained YOLO/FaceNet (no weight download; latency only)")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    models = load_models(args)
+    source = load_source_frames(args)
+
+    results = {}
+    for name in [r.strip() for r in args.resolutions.split(",") if r.strip()]:
+        h, w = RESOLUTIONS[name]
+        frames = [cv2.resize(f, (w, h), interpolation=cv2.INTER_LINEAR) for f in source]
+        print(f"\n{name} ({w}x{h}, {len(frames)} frames):")
+        row = {}
+        for mode in MODES:
+            timings = run_case(frames, models, mode)
+            row[mode] = {
+                stage: {"p50": float(np.percentile(v, 50)), "p95": float(np.percentile(v, 95))}
+                for stage, v in timings.items()
+            }
+            print(f"   {mode:<11} total p50 {row[mode]['total']['p50']:8.1f} ms  "
+                  f"p95 {row[mode]['total']['p95']:8.1f} ms   "
+                  f"(detect+track {row[mode]['detect_track']['p50']:.1f} ms, "
+                  f"faces {row[mode]['faces']['p50']:.1f} ms)")
+        results[name] = row
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
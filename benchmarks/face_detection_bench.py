@@ -0,0 +1,145 @@
+"""
+Face Detection Micro-benchmark
+
+Compares the face detection modes of app/pipelines/face_pipeline.py as a
+function of the number of people in the frame:
+- "per_crop": one MTCNN call per person box
+- "full_frame": one MTCNN call on the whole frame + face-to-track assignment
+- "upper_body": one MTCNN call on the box enclosing all upper bodies
+
+With --roi, the per_crop mode is also timed with each head region
+("full" person box vs "top" of the box) with and without MTCNN pyramid
+tuning from the person height.
+
+Person boxes are placed at random (overlaps allowed, like a real crowd).
+Pass --image to run on a real frame instead of a synthetic one.
+
+Usage:
+    python -m benchmarks.face_detection_bench --people 1,2,4,8,16 --resolution 1080p
+    python -m benchmarks.face_detection_bench --people 1,4,16 --roi
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.pipelines.face_pipeline import FACE_DETECTION_MODES, detect_faces
+from app.pipelines.frame_context import FrameContext
+
+RESOLUTIONS = {
+    "720p": (720, 1280),
+    "1080p": (1080, 1920),
+    "4k": (2160, 3840)
+}
+PERSON_WIDTH_FRACTION = 0.08  # Person box width relative to the frame width
+PERSON_ASPECT = 2.5           # Person box height / width
+
+
+def synthetic_frame(h, w, rng):
+    """Smooth random texture (pure noise makes MTCNN's first stage unrealistically busy)."""
+    small = rng.integers(0, 256, (h // 16, w // 16, 3), dtype=np.uint8)
+    return cv2.resize(small, (w, h), interpolation=cv2.INTER_CUBIC)
+
+
+def random_people(n, h, w, rng):
+    """n tracked person objects with random (possibly overlapping) boxes."""
+    pw = int(w * PERSON_WIDTH_FRACTION)
+    ph = min(h, int(pw * PERSON_ASPECT))
+    objects = []
+    for track_id in range(1, n + 1):
+        x1 = int(rng.integers(0, w - pw))
+        y1 = int(rng.integers(0, h - ph + 1))
+        objects.append({"track_id": track_id, "class": "person", "bbox": [x1, y1, x1 + pw, y1 + ph]})
+    return objects
+
+
+# per_crop variants timed with --roi: (label, head ROI mode, pyramid tuning)
+ROI_CASES = (
+    ("full", "full", False),
+    ("full+tuned", "full", True),
+    ("top", "top", False),
+    ("top+tuned", "top", True)
+)
+
+
+def time_mode(frame, objects, mtcnn, mode, runs, **kwargs):
+    """Median latency (ms) of detect_faces and the number of faces found."""
+    # New context per call so the RGB conversion is included in the timing
+    faces = detect_faces(FrameContext(frame), objects, mtcnn, mode=mode, **kwargs)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        detect_faces(FrameContext(frame), objects, mtcnn, mode=mode, **kwargs)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(timings)), len(faces)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Face detection mode micro-benchmark")
+    parser.add_argument("--people", default="1,2,4,8,16", help="Comma-separated people counts")
+    parser.add_argument("--resolution", default="1080p", help=f"Frame size ({', '.join(RESOLUTIONS)})")
+    parser.add_argument("--image", default=None, help="Optional real frame to use instead of a synthetic one")
+    parser.add_argument("--runs", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--device", default="cpu", help="Device for MTCNN")
+    parser.add_argument("--roi", action="store_true",
+                        help="Also compare head ROI / pyramid tuning variants of per_crop")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    from app.models.mtcnn import load_mtcnn
+    mtcnn = load_mtcnn(args.device)
+
+    rng = np.random.default_rng(0)
+    if args.image:
+        frame = cv2.imread(args.image)
+        if frame is None:
+            raise SystemExit(f"ERROR: Cannot read image {args.image}")
+    else:
+        frame = synthetic_frame(*RESOLUTIONS[args.resolution], rng)
+    h, w = frame.shape[:2]
+
+    counts = [int(x) for x in args.people.split(",") if x.strip()]
+    people = {n: random_people(n, h, w, rng) for n in counts}
+
+    results = {}
+    print(f"Frame: {w}x{h}")
+    print(f"{'people':>6}  " + "  ".join(f"{mode:>18}" for mode in FACE_DETECTION_MODES))
+    for n in counts:
+        row = {}
+        for mode in FACE_DETECTION_MODES:
+            ms, faces = time_mode(frame, people[n], mtcnn, mode, args.runs)
+            row[mode] = {"ms": ms, "faces": faces}
+        results[n] = row
+        print(f"{n:>6}  " + "  ".join(
+            f"{row[mode]['ms']:9.1f} ms ({row[mode]['faces']:>2} f)" for mode in FACE_DETECTION_MODES
+        ))
+
+    roi_results = {}
+    if args.roi:
+        print("\nper_crop head ROI / pyramid tuning:")
+        print(f"{'people':>6}  " + "  ".join(f"{label:>18}" for label, _, _ in ROI_CASES))
+        for n in counts:
+            row = {}
+            for label, roi_mode, tuned in ROI_CASES:
+                ms, faces = time_mode(frame, people[n], mtcnn, "per_crop", args.runs,
+                                      roi_mode=roi_mode, tune_pyramid=tuned)
+                row[label] = {"ms": ms, "faces": faces}
+            roi_results[n] = row
+            print(f"{n:>6}  " + "  ".join(
+                f"{row[label]['ms']:9.1f} ms ({row[label]['faces']:>2} f)" for label, _, _ in ROI_CASES
+            ))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"frame": [w, h], "results": results, "roi": roi_results}, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+INT8 Quantization Report
+
+Compares fp32 and INT8 versions of FaceNet, ResNet-50 and Zero-DCE:
+- Output drift: cosine similarity between fp32 and int8 outputs
+  (embeddings for FaceNet/ResNet, enhanced image for Zero-DCE)
+- Face-match accuracy on a small labelled face set (FaceNet only):
+  leave-one-out nearest-neighbour accuracy and pair accuracy at the
+  FAISS match threshold
+- Per-call latency (median / p95, batch size 1)
+
+Labelled faces are read from <faces>/<person_name>/<image>.jpg.
+
+Usage:
+    python -m benchmarks.quantization_report --frames calibration/frames \\
+        --faces calibration/faces --models facenet,resnet --mode static
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models.quantize import (
+    IMAGE_EXTENSIONS,
+    calibration_inputs,
+    dynamic_quantizable_layers,
+    load_images,
+    quantize_model,
+    quantized_layers,
+)
+
+MATCH_THRESHOLD = 0.8  # Same threshold as app/pipelines/faiss_index.py
+
+
+def load_labelled_faces(directory):
+    """
+    Load face crops grouped by person from <directory>/<label>/<image>.
+
+    Returns:
+        (faces, labels) lists
+    """
+    faces, labels = [], []
+    if not os.path.isdir(directory):
+        return faces, labels
+
+    for label in sorted(os.listdir(directory)):
+        person_dir = os.path.join(directory, label)
+        if not os.path.isdir(person_dir):
+            continue
+        for filename in sorted(os.listdir(person_dir)):
+            if not filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            img = cv2.imread(os.path.join(person_dir, filename))
+            if img is not None:
+                faces.append(img)
+                labels.append(label)
+    return faces, labels
+
+
+def _output_tensor(output):
+    """Take the primary tensor from a model output (Zero-DCE returns a tuple)."""
+    if isinstance(output, (tuple, list)):
+        output = output[0]
+    return output
+
+
+@torch.no_grad()
+def run_outputs(model, inputs):
+    """Run a model over inputs, returning flattened numpy outputs."""
+    return [_output_tensor(model(x)).flatten().cpu().numpy() for x in inputs]
+
+
+@torch.no_grad()
+def measure_latency(model, inputs, runs):
+    """
+    Measure per-call latency in milliseconds.
+
+    Returns:
+        dict with median and p95 latency
+    """
+    model(inputs[0])  # warm-up
+    timings = []
+    for i in range(runs):
+        x = inputs[i % len(inputs)]
+        start = time.perf_counter()
+        model(x)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return {
+        "median_ms": float(np.median(timings)),
+        "p95_ms": float(np.percentile(timings, 95))
+    }
+
+
+def cosine_drift(reference, candidate):
+    """
+    Cosine similarity statistics between two lists of output vectors.
+
+    Returns:
+        dict with mean and min cosine similarity
+    """
+    sims = []
+    for a, b in zip(reference, candidate):
+        denom = np.linalg.norm(a) * np.linalg.norm(b)
+        sims.append(float(np.dot(a, b) / denom) if denom > 0 else 0.0)
+    return {"mean_cosine": float(np.mean(sims)), "min_cosine": float(np.min(sims))}
+
+
+def match_accuracy(embeddings, labels, threshold=MATCH_THRESHOLD):
+    """
+    Face-match accuracy on a labelled set.
+
+    Returns:
+        dict with leave-one-out nearest-neighbour accuracy and the fraction
+        of pairs classified correctly (same person <=> squared L2 < threshold)
+    """
+    emb = np.stack(embeddings).astype(np.float32)
+    labels = np.array(labels)
+    # Squared L2 distances, as returned by faiss.IndexFlatL2
+    sq = np.sum(emb ** 2, axis=1)
+    dist = sq[:, None] + sq[None, :] - 2.0 * emb @ emb.T
+    np.fill_diagonal(dist, np.inf)
+
+    nearest = np.argmin(dist, axis=1)
+    nn_accuracy = float(np.mean(labels[nearest] == labels))
+
+    same = labels[:, None] == labels[None, :]
+    upper = np.triu_indices(len(labels), k=1)
+    predicted_same = dist[upper] < threshold
+    pair_accuracy = float(np.mean(predicted_same == same[upper]))
+
+    return {"nn_accuracy": nn_accuracy, "pair_accuracy": pair_accuracy}
+
+
+def load_fp32_model(name):
+    """Load the fp32 PyTorch model for a given name."""
+    if name == "facenet":
+        from app.models.facenet import load_facenet
+        return load_facenet()
+    if name == "resnet":
+        from app.models.resnet import load_resnet
+        return load_resnet()
+    if name == "zerodce":
+        from app.models.zeroDce import get_zerodce_model
+        return get_zerodce_model()
+    raise ValueError(f"Unknown model: {name}")
+
+
+def report_model(name, mode, frames, faces, labels, runs):
+    """
+    Build the fp32 vs int8 report entry for one model.
+    """
+    model = load_fp32_model(name)
+    if model is None:
+        return {"error": f"{name} not available"}
+
+    if mode == "dynamic" and dynamic_quantizable_layers(model) == 0:
+        # Nothing to convert: a 1.0x "speedup" with zero drift is not a result
+        return {"mode": mode, "noop": True,
+                "error": "no-op: dynamic mode only quantizes Linear layers; use --mode static"}
+
+    inputs = calibration_inputs(name, frames=frames, faces=faces)
+    if not inputs:
+        return {"error": "no sample inputs (check --frames / --faces)"}
+
+    # Calibrate on the first half, evaluate on everything
+    calibration = inputs[: max(1, len(inputs) // 2)]
+    quantized = quantize_model(model, name, mode, calibration_data=calibration)
+    if quantized is model:
+        return {"error": "quantization failed"}
+    layers = quantized_layers(quantized)
+    if layers == 0:
+        return {"mode": mode, "noop": True, "error": "no-op: no layer was quantized"}
+
+    fp32_out = run_outputs(model, inputs)
+    int8_out = run_outputs(quantized, inputs)
+
+    entry = {
+        "mode": mode,
+        "noop": False,
+        "quantized_layers": layers,
+        "samples": len(inputs),
+        "drift": cosine_drift(fp32_out, int8_out),
+        "latency": {
+            "fp32": measure_latency(model, inputs, runs),
+            "int8": measure_latency(quantized, inputs, runs)
+        }
+    }
+    entry["latency"]["speedup"] = (
+        entry["latency"]["fp32"]["median_ms"] / max(entry["latency"]["int8"]["median_ms"], 1e-9)
+    )
+
+    if name == "facenet" and len(set(labels)) > 1:
+        entry["accuracy"] = {
+            "fp32": match_accuracy(fp32_out, labels),
+            "int8": match_accuracy(int8_out, labels)
+        }
+    return entry
+
+
+def print_report(report):
+    """Print a human-readable summary of the report."""
+    print("\n" + "=" * 60)
+    print("INT8 Quantization Report")
+    print("=" * 60)
+    for name, entry in report.items():
+        print(f"\n{name}:")
+        if "error" in entry:
+            print(f"   skipped: {entry['error']}")
+            continue
+        lat = entry["latency"]
+        print(f"   mode: {entry['mode']}, quantized layers: {entry['quantized_layers']}, "
+              f"samples: {entry['samples']}")
+        print(f"   cosine (mean/min): {entry['drift']['mean_cosine']:.4f} / "
+              f"{entry['drift']['min_cosine']:.4f}")
+        print(f"   latency fp32: {lat['fp32']['median_ms']:.2f} ms, "
+              f"int8: {lat['int8']['median_ms']:.2f} ms ({lat['speedup']:.2f}x)")
+        if "accuracy" in entry:
+            acc = entry["accuracy"]
+            print(f"   NN accuracy fp32: {acc['fp32']['nn_accuracy']:.3f}, "
+                  f"int8: {acc['int8']['nn_accuracy']:.3f}")
+            print(f"   pair accuracy fp32: {acc['fp32']['pair_accuracy']:.3f}, "
+                  f"int8: {acc['int8']['pair_accuracy']:.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="fp32 vs INT8 quantization report")
+    parser.add_argument("--frames", default="calibration/frames",
+                        help="Directory of sample frames (ResNet / Zero-DCE)")
+    parser.add_argument("--faces", default="calibration/faces",
+                        help="Directory of labelled faces: <dir>/<person>/<image>")
+    parser.add_argument("--models", default="facenet,resnet,zerodce",
+                        help="Comma-separated models to report on")
+    parser.add_argument("--mode", default="static", choices=["dynamic", "static"],
+                        help="Quantization mode")
+    parser.add_argument("--runs", type=int, default=50, help="Latency runs per model")
+    parser.add_argument("--output", default="quantization_report.json",
+                        help="JSON output path")
+    args = parser.parse_args()
+
+    frames = load_images(args.frames)
+    faces, labels = load_labelled_faces(args.faces)
+    if not faces:
+        faces = load_images(args.faces)
+        labels = []
+
+    report = {}
+    for name in [m.strip() for m in args.models.split(",") if m.strip()]:
+        report[name] = report_model(name, args.mode, frames, faces, labels, args.runs)
+
+    print_report(report)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
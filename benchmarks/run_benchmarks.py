@@ -0,0 +1,383 @@
+"""
+End-to-end Pipeline Benchmark
+
+Runs process_frame (app/full_pipeline.py) headless on deterministic
+workloads and reports, per workload:
+- end-to-end FPS and p50/p95/p99 frame latency
+- p50/p95/p99 latency of every pipeline stage (from utils.metrics spans,
+  plus JPEG encode as in the video feed)
+- peak RSS and CPU use (process CPU time / wall time; >100% = several cores)
+
+Workloads:
+- "synthetic": a few figures moving over a textured background
+- "crowd": the same scene with many figures
+- "night": the synthetic scene darkened with sensor noise (low-light path)
+- "recorded": frames from --video (skipped without it)
+
+Scenes are generated from fixed seeds, so runs are comparable. Results can
+be saved as JSON and diffed against a stored baseline; changes worse than
+--tolerance are flagged as regressions.
+
+Usage:
+    python -m benchmarks.run_benchmarks --random-weights --frames 60 --output bench.json
+    python -m benchmarks.run_benchmarks --workloads synthetic,night --baseline bench.json
+    python -m benchmarks.run_benchmarks --video sample.mp4 --workloads recorded --save-baseline base.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import sys
+import time
+
+import cv2
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.full_pipeline import process_frame
+from app.preload import process_memory
+from utils import metrics
+
+RESOLUTIONS = {
+    "480p": (480, 640),
+    "720p": (720, 1280),
+    "1080p": (1080, 1920)
+}
+# Synthetic workloads: (figures, brightness scale, noise sigma, seed)
+SYNTHETIC_WORKLOADS = {
+    "synthetic": (4, 1.0, 0.0, 0),
+    "crowd": (30, 1.0, 0.0, 1),
+    "night": (4, 0.2, 6.0, 2)
+}
+WORKLOADS = tuple(SYNTHETIC_WORKLOADS) + ("recorded",)
+PERCENTILES = (50, 95, 99)
+# Metrics compared against the baseline: (path, higher_is_better)
+DIFF_KEYS = (
+    (("fps",), True),
+    (("latency_ms", "p50"), False),
+    (("latency_ms", "p95"), False),
+    (("latency_ms", "p99"), False),
+    (("peak_rss_mb",), False)
+)
+# Latency changes smaller than this (ms) are never regressions (timer noise on tiny stages)
+MIN_DIFF_MS = 0.5
+
+
+def synthetic_frames(count, height, width, figures, brightness=1.0, noise=0.0, seed=0):
+    """
+    Deterministic scene: figures (body box + head ellipse) bouncing over a fixed background.
+
+    Args:
+        count: Number of frames
+        height, width: Frame size
+        figures: Number of moving figures
+        brightness: Scale applied to the whole frame (night scenes < 1)
+        noise: Standard deviation of added Gaussian noise
+        seed: Random seed
+
+    Yields:
+        BGR uint8 frames
+    """
+    rng = np.random.default_rng(seed)
+    # Smooth textured background: upscaled low-resolution noise plus a vertical gradient
+    background = cv2.resize(rng.integers(60, 200, (height // 40 + 1, width // 40 + 1, 3), dtype=np.uint8),
+                            (width, height), interpolation=cv2.INTER_CUBIC)
+    background = cv2.addWeighted(background, 0.7,
+                                 np.linspace(40, 160, height, dtype=np.uint8)[:, None, None]
+                                 .repeat(width, axis=1).repeat(3, axis=2), 0.3, 0)
+
+    fig_h = rng.uniform(0.15, 0.45, figures) * height
+    fig_w = fig_h * rng.uniform(0.3, 0.45, figures)
+    pos = np.column_stack([rng.uniform(0, width - fig_w), rng.uniform(0, height - fig_h)])
+    vel = rng.uniform(-6, 6, (figures, 2))
+    colors = rng.integers(0, 256, (figures, 3))
+
+    for _ in range(count):
+        frame = background.copy()
+        for i in range(figures):
+            x, y = pos[i]
+            w, h = fig_w[i], fig_h[i]
+            head = h * 0.18
+            cv2.rectangle(frame, (int(x), int(y + head)), (int(x + w), int(y + h)),
+                          tuple(int(c) for c in colors[i]), -1)
+            cv2.ellipse(frame, (int(x + w / 2), int(y + head / 2)), (int(head * 0.4), int(head / 2)),
+                        0, 0, 360, (140, 170, 210), -1)
+        if brightness != 1.0 or noise > 0:
+            frame = frame.astype(np.float32) * brightness
+            if noise > 0:
+                frame += rng.normal(0, noise, frame.shape).astype(np.float32)
+            frame = np.clip(frame, 0, 255).astype(np.uint8)
+        yield frame
+
+        # Move and bounce off the frame borders
+        pos += vel
+        limits = np.column_stack([width - fig_w, height - fig_h])
+        bounced = (pos < 0) | (pos > limits)
+        vel[bounced] *= -1
+        pos = np.clip(pos, 0, limits)
+
+
+def recorded_frames(path, count, height=None, width=None):
+    """Frames of a video file (looped if shorter than count), optionally resized."""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise SystemExit(f"ERROR: Cannot open video {path}")
+    produced = 0
+    try:
+        while produced < count:
+            ret, frame = cap.read()
+            if not ret:
+                if produced == 0:
+                    raise SystemExit(f"ERROR: Cannot read frames from {path}")
+                cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+            if height and width and frame.shape[:2] != (height, width):
+                frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+            produced += 1
+            yield frame
+    finally:
+        cap.release()
+
+
+def load_models(args):
+    """Pipeline models; untrained YOLO/FaceNet/ResNet with --random-weights (no downloads)."""
+    from app.models.mtcnn import load_mtcnn
+    from app.models.zeroDce import get_zerodce_model
+    device = args.device
+    if args.random_weights:
+        from ultralytics import YOLO
+        from facenet_pytorch import InceptionResnetV1
+        from torchvision import models as tv_models
+        resnet = tv_models.resnet50()
+        get_zerodce_model()
+        return {
+            "yolo": YOLO("yolov8n.yaml"),
+            "deepsort": None,  # Fresh tracker per workload (run_workload)
+            "mask2former": None,
+            "resnet": torch.nn.Sequential(*list(resnet.children())[:-1]).eval().to(device),
+            "mtcnn": load_mtcnn(device),
+            "facenet": InceptionResnetV1().eval().to(device),
+            "gan": None,
+            "zerodce": None,
+            "device": device
+        }
+    from app.models_loader import load_all_models
+    return load_all_models()
+
+
+def percentiles(values):
+    """p50/p95/p99 (ms) of a list of seconds."""
+    if not values:
+        return {f"p{p}": 0.0 for p in PERCENTILES}
+    ms = np.asarray(values) * 1000.0
+    return {f"p{p}": round(float(np.percentile(ms, p)), 3) for p in PERCENTILES}
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run_workload(name, frames, models, warmup):
+    """
+    Run the pipeline over the frames of one workload.
+
+    Args:
+        name: Workload name (also used as the camera ID, so per-camera state is separate)
+        frames: Iterable of BGR frames
+        models: Models dict for process_frame
+        warmup: Number of leading frames excluded from the statistics
+
+    Returns:
+        dict with frames, fps, latency_ms, stages, cpu_percent, peak_rss_mb, rss_mb, alerts
+    """
+    from app.models.deepsort import load_deepsort
+    camera_id = f"BENCH_{name}"
+    models = dict(models, deepsort=load_deepsort(device=models.get("device", "cpu")))
+
+    latencies = []
+    alerts_total = 0
+    timed_wall = 0.0
+    timed_cpu = 0.0
+    for frame_count, frame in enumerate(frames):
+        timed = frame_count >= warmup
+        if timed and frame_count == warmup:
+            metrics.start_sampling()
+        cpu_start = cpu_seconds()
+        start = time.perf_counter()
+        output_frame, _, alerts = process_frame(frame, models, camera_id, frame_count, db_people={})
+        with metrics.stage_timer(camera_id, "encode"):
+            cv2.imencode(".jpg", output_frame)
+        elapsed = time.perf_counter() - start
+        if timed:
+            latencies.append(elapsed)
+            timed_wall += elapsed
+            timed_cpu += cpu_seconds() - cpu_start
+            alerts_total += len(alerts)
+
+    samples = metrics.stop_sampling()
+    stages = {}
+    for (metric, labels), values in samples.items():
+        labels = dict(labels)
+        if metric == "pipeline_stage_seconds" and labels.get("camera") == camera_id:
+            stages[labels["stage"]] = dict(percentiles(values), count=len(values))
+
+    return {
+        "frames": len(latencies),
+        "fps": round(len(latencies) / timed_wall, 3) if timed_wall > 0 else 0.0,
+        "latency_ms": percentiles(latencies),
+        "stages": stages,
+        "cpu_percent": round(100.0 * timed_cpu / timed_wall, 1) if timed_wall > 0 else 0.0,
+        # ru_maxrss is the process-wide peak in KiB (Linux), so it includes earlier workloads
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1),
+        "rss_mb": process_memory().get("rss_mb"),
+        "alerts": alerts_total
+    }
+
+
+def _get(result, path):
+    for key in path:
+        if not isinstance(result, dict) or key not in result:
+            return None
+        result = result[key]
+    return result
+
+
+def diff_results(current, baseline, tolerance):
+    """
+    Compare results against a baseline.
+
+    Args:
+        current: Results of this run ({"workloads": {...}})
+        baseline: Stored results in the same format
+        tolerance: Relative change counted as a regression (e.g. 0.1 = 10%)
+
+    Returns:
+        (rows, regressions): rows of (workload, metric, base, now, change) and
+        the number of regressions
+    """
+    rows = []
+    regressions = 0
+    for workload, result in current["workloads"].items():
+        base = baseline.get("workloads", {}).get(workload)
+        if base is None:
+            continue
+        checks = list(DIFF_KEYS)
+        for stage in result.get("stages", {}):
+            checks.append((("stages", stage, "p95"), False))
+        for path, higher_is_better in checks:
+            old, new = _get(base, path), _get(result, path)
+            if old is None or new is None or old == 0:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            regression = worse > tolerance
+            if path[0] in ("latency_ms", "stages") and abs(new - old) < MIN_DIFF_MS:
+                regression = False
+            regressions += regression
+            rows.append((workload, ".".join(path), old, new, change, regression))
+    return rows, regressions
+
+
+def print_result(name, result):
+    lat = result["latency_ms"]
+    print(f"\n{name}: {result['frames']} frames, {result['fps']:.2f} FPS, "
+          f"p50 {lat['p50']:.1f} / p95 {lat['p95']:.1f} / p99 {lat['p99']:.1f} ms, "
+          f"CPU {result['cpu_percent']:.0f}%, peak RSS {result['peak_rss_mb']:.0f} MB")
+    for stage, stats in sorted(result["stages"].items(), key=lambda item: -item[1]["p50"]):
+        print(f"   {stage:<10} p50 {stats['p50']:8.2f}  p95 {stats['p95']:8.2f}  "
+              f"p99 {stats['p99']:8.2f} ms   ({stats['count']} spans)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end pipeline benchmark")
+    parser.add_argument("--workloads", default="synthetic,crowd,night",
+                        help=f"Comma-separated workloads ({', '.join(WORKLOADS)})")
+    parser.add_argument("--video", default=None, help="Video file for the recorded workload")
+    parser.add_argument("--frames", type=int, default=60, help="Frames per workload (including warm-up)")
+    parser.add_argument("--warmup", type=int, default=5, help="Leading frames excluded from the statistics")
+    parser.add_argument("--resolution", default="720p",
+                        help=f"Frame size of synthetic workloads ({', '.join(RESOLUTIONS)}); "
+                             "recorded frames are resized to it with --resize")
+    parser.add_argument("--resize", action="store_true", help="Resize recorded frames to --resolution")
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads() for repeatable runs")
+    parser.add_argument("--device", default="cpu", help="Device with --random-weights")
+    parser.add_argument("--random-weights", action="store_true",
+                        help="Untrained YOLO/FaceNet/ResNet (no weight download; latency only)")
+    parser.add_argument("--output", default=None, help="Save results as JSON")
+    parser.add_argument("--baseline", default=None, help="JSON results to diff against")
+    parser.add_argument("--save-baseline", default=None, help="Also save results as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.1,
+                        help="Relative change reported as a regression (default 0.1 = 10%%)")
+    parser.add_argument("--fail-on-regression", action="store_true",
+                        help="Exit with status 1 if the diff finds regressions")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+        cv2.setNumThreads(args.threads)
+
+    # Never send alert emails from a benchmark run
+    import alerts.alerts
+    alerts.alerts.send_email = lambda subject, message: None
+
+    height, width = RESOLUTIONS[args.resolution]
+    models = load_models(args)
+
+    results = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "cpu_count": os.cpu_count(),
+            "threads": torch.get_num_threads(),
+            "resolution": args.resolution,
+            "frames": args.frames,
+            "warmup": args.warmup,
+            "random_weights": args.random_weights
+        },
+        "workloads": {}
+    }
+
+    for name in [w.strip() for w in args.workloads.split(",") if w.strip()]:
+        if name in SYNTHETIC_WORKLOADS:
+            figures, brightness, noise, seed = SYNTHETIC_WORKLOADS[name]
+            frames = synthetic_frames(args.frames, height, width, figures, brightness, noise, seed)
+        elif name == "recorded":
+            if not args.video:
+                print("Skipping recorded workload (no --video given)")
+                continue
+            frames = recorded_frames(args.video, args.frames,
+                                     *((height, width) if args.resize else (None, None)))
+        else:
+            print(f"Warning: Unknown workload '{name}', skipping")
+            continue
+        result = run_workload(name, frames, models, args.warmup)
+        results["workloads"][name] = result
+        print_result(name, result)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(results, f, indent=2)
+            print(f"\nResults saved to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        rows, regressions = diff_results(results, baseline, args.tolerance)
+        print(f"\nDiff against {args.baseline} (tolerance {args.tolerance:.0%}):")
+        for workload, metric, old, new, change, regression in rows:
+            flag = "  REGRESSION" if regression else ""
+            print(f"   {workload:<10} {metric:<22} {old:10.2f} -> {new:10.2f}  ({change:+.1%}){flag}")
+        print(f"{regressions} regression(s)")
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
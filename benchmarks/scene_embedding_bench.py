@@ -0,0 +1,103 @@
+"""
+Scene Embedding Micro-benchmark
+
+Compares the ResNet scene stage before and after reduced-resolution
+preprocessing:
+- "full_res": the old path, the whole frame as /255 float (no resize,
+  no ImageNet normalisation)
+- "resize", "center", "multi": the scene embedding stage at
+  SCENE_INPUT_SIZE with each pooling mode
+
+Usage:
+    python -m benchmarks.scene_embedding_bench --resolutions 720p,1080p --runs 10
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.pipelines.frame_context import FrameContext
+from app.pipelines.scene_understanding import compute_scene_embedding
+
+RESOLUTIONS = {
+    "480p": (480, 640),
+    "720p": (720, 1280),
+    "1080p": (1080, 1920),
+    "4k": (2160, 3840)
+}
+
+
+def load_model(random_weights):
+    """ResNet-50 feature extractor (random weights avoid a download)."""
+    if random_weights:
+        from torchvision import models
+        model = models.resnet50()
+        return torch.nn.Sequential(*list(model.children())[:-1]).eval()
+    from app.models.resnet import load_resnet
+    return load_resnet()
+
+
+@torch.no_grad()
+def full_res_embedding(resnet, frame):
+    """The previous scene stage: full-resolution /255 input."""
+    rgb = frame[:, :, ::-1].copy()
+    tensor = torch.from_numpy(rgb).permute(2, 0, 1).unsqueeze(0).float() / 255.0
+    return resnet(tensor).flatten(start_dim=1).numpy()
+
+
+def time_call(fn, runs):
+    """Median latency of fn() in milliseconds (after one warm-up call)."""
+    fn()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(timings))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ResNet scene embedding micro-benchmark")
+    parser.add_argument("--resolutions", default="720p,1080p",
+                        help=f"Comma-separated input sizes ({', '.join(RESOLUTIONS)})")
+    parser.add_argument("--runs", type=int, default=10, help="Timed runs per case")
+    parser.add_argument("--random-weights", action="store_true",
+                        help="Use an untrained ResNet-50 (no weight download)")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    resnet = load_model(args.random_weights)
+    rng = np.random.default_rng(0)
+    results = {}
+
+    for name in [r.strip() for r in args.resolutions.split(",") if r.strip()]:
+        h, w = RESOLUTIONS[name]
+        frame = rng.integers(0, 256, (h, w, 3), dtype=np.uint8)
+        row = {"full_res": time_call(lambda: full_res_embedding(resnet, frame), args.runs)}
+        for pooling in ("resize", "center", "multi"):
+            # New context per call so preprocessing is included in the timing
+            row[pooling] = time_call(
+                lambda: compute_scene_embedding(resnet, FrameContext(frame), pooling=pooling),
+                args.runs
+            )
+        results[name] = row
+
+        print(f"\n{name} ({w}x{h}):")
+        for case, ms in row.items():
+            speedup = row["full_res"] / ms if ms > 0 else 0.0
+            print(f"   {case:<9} {ms:8.1f} ms   ({speedup:5.1f}x vs full_res)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Tiled Detection Benchmark
+
+Compares standard single-pass YOLO detection with tiled detection
+(app/pipelines/tiled_detection.py) on the same frames:
+- "standard": one YOLO pass on the whole frame
+- "tiled": overlapping tiles over the whole frame + the full frame
+- "far_field": tiles only over --far-field (default: top 45% of the frame)
+
+For each case it reports median latency, the number of people found and
+how many of them are small (shorter than --small-height of the frame
+height). Use --video or --image with real footage: more small people at
+a bounded extra latency is what tiling is for.
+
+Usage:
+    python -m benchmarks.tiled_detection_bench --video sample.mp4 --frames 20
+    python -m benchmarks.tiled_detection_bench --resolutions 1080p,4k --random-weights
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.pipelines.tiled_detection import detect_tiled, tile_grid
+
+RESOLUTIONS = {
+    "720p": (720, 1280),
+    "1080p": (1080, 1920),
+    "4k": (2160, 3840)
+}
+CONF = 0.4
+
+
+def load_frames(args):
+    """Frames to benchmark: from --video, --image or synthetic noise per resolution."""
+    if args.video:
+        cap = cv2.VideoCapture(args.video)
+        frames = []
+        while len(frames) < args.frames:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+        if not frames:
+            raise SystemExit(f"ERROR: Cannot read frames from {args.video}")
+        return {f"{frames[0].shape[1]}x{frames[0].shape[0]}": frames}
+    if args.image:
+        frame = cv2.imread(args.image)
+        if frame is None:
+            raise SystemExit(f"ERROR: Cannot read image {args.image}")
+        return {f"{frame.shape[1]}x{frame.shape[0]}": [frame]}
+
+    rng = np.random.default_rng(0)
+    return {
+        name: [rng.integers(0, 256, RESOLUTIONS[name] + (3,), dtype=np.uint8)]
+        for name in [r.strip() for r in args.resolutions.split(",") if r.strip()]
+    }
+
+
+def standard_detect(frame, yolo, classes):
+    result = yolo(frame, conf=CONF, classes=classes, verbose=False)[0]
+    return result.boxes.xyxy.cpu().numpy()
+
+
+def run_case(frames, fn, runs):
+    """Median latency (ms) over all frames and runs, plus boxes of the last run per frame."""
+    fn(frames[0])  # Warm-up
+    timings, boxes = [], []
+    for frame in frames:
+        for _ in range(runs):
+            start = time.perf_counter()
+            out = fn(frame)
+            timings.append((time.perf_counter() - start) * 1000.0)
+        boxes.append(out)
+    return float(np.median(timings)), boxes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Tiled vs standard detection benchmark")
+    parser.add_argument("--video", default=None, help="Video file to take frames from")
+    parser.add_argument("--image", default=None, help="Single image to use")
+    parser.add_argument("--frames", type=int, default=20, help="Frames read from --video")
+    parser.add_argument("--resolutions", default="1080p,4k",
+                        help=f"Synthetic frame sizes without --video/--image ({', '.join(RESOLUTIONS)})")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs per frame")
+    parser.add_argument("--far-field", default="0,0,1,0.45",
+                        help="Far-field region as x1,y1,x2,y2 fractions of the frame")
+    parser.add_argument("--small-height", type=float, default=0.1,
+                        help="People shorter than this fraction of the frame height count as small")
+    parser.add_argument("--random-weights", action="store_true",
+                        help="Use an untrained YOLOv8n (no weight download; latency only)")
+    parser.add_argument("--output", default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+    if args.random_weights:
+        yolo = YOLO("yolov8n.yaml")
+        classes = [0]
+    else:
+        from app.models.yolo import load_yolo
+        yolo = load_yolo()
+        classes = [i for i, name in yolo.names.items() if name == "person"]
+
+    far_field = [tuple(float(v) for v in args.far_field.split(","))]
+    cases = {
+        "standard": lambda f: standard_detect(f, yolo, classes),
+        "tiled": lambda f: detect_tiled(f, yolo, CONF, classes, regions=[])[0],
+        "far_field": lambda f: detect_tiled(f, yolo, CONF, classes, regions=far_field)[0]
+    }
+
+    results = {}
+    for name, frames in load_frames(args).items():
+        h = frames[0].shape[0]
+        print(f"\n{name} ({len(frames)} frame(s), "
+              f"{len(tile_grid(frames[0].shape))} tiles full / "
+              f"{len(tile_grid(frames[0].shape, far_field))} tiles far-field):")
+        row = {}
+        for case, fn in cases.items():
+            ms, boxes = run_case(frames, fn, args.runs)
+            people = sum(len(b) for b in boxes)
+            small = sum(int(np.sum((b[:, 3] - b[:, 1]) < args.small_height * h)) for b in boxes if len(b))
+            row[case] = {"ms": ms, "people": people, "small_people": small}
+            cost = ms / row["standard"]["ms"] if row["standard"]["ms"] > 0 else 0.0
+            print(f"   {case:<10} {ms:8.1f} ms  ({cost:4.1f}x)   people: {people:4d}   small: {small:4d}")
+        results[name] = row
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Gunicorn configuration for multi-worker deployment.
+
+Models are loaded once in the master process (preload_app + PRELOAD_MODELS)
+and shared copy-on-write by the forked uvicorn workers, so N workers use
+roughly one copy of the model weights instead of N.
+
+Usage:
+    gunicorn -c gunicorn.conf.py app.app:app
+"""
+import os
+
+# Load models in the master before forking (read by app/app.py)
+os.environ.setdefault("PRELOAD_MODELS", "1")
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "2"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = True
+timeout = 600  # Streaming responses and slow first requests
+
+
+def post_fork(server, worker):
+    """Per-worker setup: torch threads, DB pool reset, model warm-up."""
+    from app.app import models
+    from app.preload import after_fork
+    after_fork(models, workers=workers)
@@ -0,0 +1,152 @@
+"""
+Parity tests for the ONNX Runtime backend (app/models/onnx_backend.py).
+
+Each model is exported with export_onnx() (YOLO with export_yolo()) and run
+through ONNX Runtime on fixed inputs; the outputs must match PyTorch within
+a per-model tolerance. The models use seeded random weights, so no
+pretrained downloads are needed.
+
+Run with:
+    python -m pytest tests/test_onnx_parity.py
+"""
+import os
+
+import numpy as np
+import pytest
+import torch
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+
+from app.models import onnx_backend
+from app.models.onnx_backend import RuntimeModel, create_runtime, export_onnx
+
+# Max absolute difference vs PyTorch per model
+TOLERANCES = {
+    "resnet50": 1e-3,
+    "facenet": 1e-3,
+    "yolo_boxes": 1e-2,    # Pixels (640 px input)
+    "yolo_scores": 1e-4
+}
+
+
+def fixed_input(shape):
+    """Deterministic input in [0, 1] (same values on every run and platform)."""
+    count = int(np.prod(shape))
+    values = (np.arange(count, dtype=np.float64) * 0.6180339887) % 1.0
+    return torch.from_numpy(values.astype(np.float32).reshape(shape))
+
+
+def build_resnet():
+    from torchvision import models
+    torch.manual_seed(0)
+    model = models.resnet50()
+    return torch.nn.Sequential(*list(model.children())[:-1]).eval()
+
+
+def build_facenet():
+    facenet_pytorch = pytest.importorskip("facenet_pytorch")
+    torch.manual_seed(0)
+    return facenet_pytorch.InceptionResnetV1(pretrained=None).eval()
+
+
+# name -> (builder, export input shape, test input shapes, dynamic axes)
+MODELS = {
+    "resnet50": (build_resnet, (1, 3, 224, 224), [(1, 3, 224, 224), (2, 3, 160, 256)],
+                 {"input": {0: "batch", 2: "height", 3: "width"}}),
+    "facenet": (build_facenet, (1, 3, 160, 160), [(1, 3, 160, 160), (3, 3, 160, 160)], None)
+}
+
+
+@pytest.fixture(autouse=True)
+def onnx_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(onnx_backend, "ONNX_CACHE_DIR", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize("name", sorted(MODELS))
+def test_onnx_matches_pytorch(name):
+    builder, export_shape, test_shapes, dynamic_axes = MODELS[name]
+    model = builder()
+    onnx_path = export_onnx(model, fixed_input(export_shape), name, dynamic_axes)
+    run_fn, backend = create_runtime(onnx_path, "onnx")
+    runtime_model = RuntimeModel(run_fn, name, backend)
+
+    for shape in test_shapes:
+        x = fixed_input(shape)
+        with torch.no_grad():
+            expected = model(x).numpy()
+        actual = runtime_model(x).numpy()
+        assert actual.shape == expected.shape
+        np.testing.assert_allclose(actual, expected, rtol=0, atol=TOLERANCES[name])
+
+
+def test_export_is_cached(onnx_cache):
+    model = build_resnet()
+    x = fixed_input((1, 3, 224, 224))
+    first = export_onnx(model, x, "resnet50")
+    mtime = os.path.getmtime(first)
+    assert export_onnx(model, x, "resnet50") == first
+    assert os.path.getmtime(first) == mtime
+
+
+def test_failed_export_leaves_no_temp_file(onnx_cache, monkeypatch):
+    def failing_export(model, args, path, **kwargs):
+        with open(path, "wb") as f:
+            f.write(b"partial")
+        raise RuntimeError("export failed")
+
+    monkeypatch.setattr(torch.onnx, "export", failing_export)
+    with pytest.raises(RuntimeError):
+        export_onnx(torch.nn.Linear(4, 2).eval(), torch.zeros(1, 4), "linear")
+    assert os.listdir(onnx_cache) == []
+
+
+@pytest.fixture
+def yolo_model(tmp_path_factory, monkeypatch):
+    """YOLOv8n with seeded random weights; its checkpoint file keys the cache."""
+    ultralytics = pytest.importorskip("ultralytics")
+    tmp_path = tmp_path_factory.mktemp("yolo")
+    work_dir = tmp_path / "work"
+    work_dir.mkdir()
+    monkeypatch.chdir(work_dir)  # Ultralytics exports next to the model
+    torch.manual_seed(0)
+    yolo = ultralytics.YOLO("yolov8n.yaml")
+    ckpt_path = tmp_path / "yolov8n-random.pt"
+    torch.save(yolo.model.state_dict(), ckpt_path)
+    yolo.ckpt_path = str(ckpt_path)
+    return yolo
+
+
+def test_yolo_onnx_matches_pytorch(yolo_model, onnx_cache):
+    runtime_yolo = onnx_backend.export_yolo(yolo_model, "onnx")
+    assert runtime_yolo is not yolo_model, "export or parity check failed"
+
+    onnx_files = [name for name in os.listdir(onnx_cache) if name.endswith(".onnx")]
+    assert len(onnx_files) == 1
+    run_fn, backend = create_runtime(os.path.join(onnx_cache, onnx_files[0]), "onnx")
+    runtime_model = RuntimeModel(run_fn, "yolo", backend)
+
+    # Raw head output (1, 4 + classes, anchors): decoded xywh boxes, then class scores
+    x = fixed_input((1, 3, 640, 640))
+    with torch.no_grad():
+        expected = yolo_model.model.eval()(x)[0].numpy()
+    actual = runtime_model(x).numpy()
+    assert actual.shape == expected.shape
+    np.testing.assert_allclose(actual[:, :4], expected[:, :4], rtol=0, atol=TOLERANCES["yolo_boxes"])
+    np.testing.assert_allclose(actual[:, 4:], expected[:, 4:], rtol=0, atol=TOLERANCES["yolo_scores"])
+
+    # The exported model also runs through the usual predict call
+    frame = (fixed_input((480, 640, 3)).numpy() * 255).astype(np.uint8)
+    assert runtime_yolo(frame, conf=0.4, verbose=False)[0].boxes is not None
+    assert runtime_yolo.names == yolo_model.names
+
+
+def test_yolo_export_is_cached(yolo_model, onnx_cache):
+    onnx_backend.export_yolo(yolo_model, "onnx")
+    (cached,) = os.listdir(onnx_cache)
+    mtime = os.path.getmtime(onnx_cache / cached)
+    onnx_backend.export_yolo(yolo_model, "onnx")
+    assert os.listdir(onnx_cache) == [cached]
+    assert os.path.getmtime(onnx_cache / cached) == mtime
+    assert not any(name.endswith((".onnx", ".data")) for name in os.listdir("."))
@@ -4,7 +4,7 @@ Database Models and Configuration
 Defines SQLAlchemy models for the surveillance database.
 Automatically creates tables on import if they don't exist.
 """
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime
+from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Index, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import datetime
@@ -51,16 +51,124 @@ class Alert(Base):
         alert_type: Type of alert (STATIONARY, RESTRICTED_ZONE, UNKNOWN_PERSON)
         description: Human-readable alert description
         created_at: Timestamp when alert was generated
+        captured_at: Capture time of the frame that triggered the alert
+            (created_at - captured_at is the alert's latency)
+        zone: Restricted zone name (RESTRICTED_ZONE alerts)
+        person_id: Matched face ID, if the person was recognised
+        confidence: Detection confidence of the person
+        bbox: Person bounding box as "x1,y1,x2,y2"
     """
     __tablename__ = "alerts"
+    __table_args__ = (
+        # Keyset pagination on (created_at, id), optionally filtered by camera,
+        # type or track (get_alerts), and the GROUP BY fallback of
+        # app/pipelines/alert_stats.py
+        Index("ix_alerts_created_id", "created_at", "id"),
+        Index("ix_alerts_camera_created_id", "camera_id", "created_at", "id"),
+        Index("ix_alerts_type_created_id", "alert_type", "created_at", "id"),
+        Index("ix_alerts_track_created", "track_id", "created_at", "id"),
+        Index("ix_alerts_camera_type", "camera_id", "alert_type"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     camera_id = Column(String, nullable=False)
     track_id = Column(Integer, nullable=True)
     alert_type = Column(String, nullable=False)
     description = Column(String, nullable=True)
-    created_at = Column(DateTime, default=datetime.datetime.utcnow, index=True)
+    created_at = Column(DateTime, default=datetime.datetime.utcnow)  # Indexed by ix_alerts_created_id
+    captured_at = Column(DateTime, nullable=True)
+    zone = Column(String, nullable=True)
+    person_id = Column(Integer, nullable=True)
+    confidence = Column(Float, nullable=True)
+    bbox = Column(String, nullable=True)
+
+
+class AlertRollup(Base):
+    """
+    Alert counts per camera, type and hour, updated as alerts are written
+    (see app/pipelines/alert_stats.py). Statistics read this table, whose
+    size grows with time and cameras but not with the number of alerts.
+    
+    Attributes:
+        camera_id: Camera identifier
+        alert_type: Type of alert
+        bucket: Start of the hour (UTC)
+        count: Number of alerts in the bucket
+    """
+    __tablename__ = "alert_rollups"
+    
+    camera_id = Column(String, primary_key=True)
+    alert_type = Column(String, primary_key=True)
+    bucket = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    
+    __table_args__ = (
+        Index("ix_alert_rollups_bucket", "bucket"),
+    )
+
+
+class AlertTotal(Base):
+    """
+    Running alert count per camera and type, updated in the same transaction
+    as the hourly AlertRollup row (see app/pipelines/alert_stats.py), so
+    totals are read without summing every hour ever recorded.
+    
+    Attributes:
+        camera_id: Camera identifier
+        alert_type: Type of alert
+        count: Number of alerts (archived ones included)
+    """
+    __tablename__ = "alert_totals"
+    
+    camera_id = Column(String, primary_key=True)
+    alert_type = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+def _ensure_columns():
+    """
+    Add columns introduced after a table was created (create_all() only
+    creates missing tables, it never alters existing ones).
+    """
+    inspector = inspect(engine)
+    existing_tables = inspector.get_table_names()
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing = {col["name"] for col in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing:
+                continue
+            col_type = column.type.compile(dialect=engine.dialect)
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"))
+            print(f"Database: added column {table.name}.{column.name}")
+
+
+# Indexes that older databases may still have, superseded by the ones above.
+# An index whose columns change gets a new name: _ensure_indexes() only
+# checks names, so reusing one would keep the old columns.
+OBSOLETE_INDEXES = (
+    "ix_alerts_created_at",       # created_at alone: covered by ix_alerts_created_id
+    "ix_alerts_camera_created",   # (camera_id, created_at): now ix_alerts_camera_created_id
+    "ix_alerts_type_created",     # (alert_type, created_at): now ix_alerts_type_created_id
+)
+
+
+def _ensure_indexes():
+    """
+    Create indexes added after a table was created (create_all() skips
+    existing tables) and drop the OBSOLETE_INDEXES.
+    """
+    with engine.begin() as conn:
+        for name in OBSOLETE_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
 
 
 # Create all tables if they don't exist
 Base.metadata.create_all(bind=engine)
+_ensure_columns()
+_ensure_indexes()
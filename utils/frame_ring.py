@@ -0,0 +1,304 @@
+"""
+Shared-memory Frame Ring Buffer
+
+Moves frames between processes without pickling them. A fixed number of
+preallocated frame slots live in a multiprocessing.shared_memory block; a
+decoder process writes frames into the slots (OpenCV decodes straight into
+the slot) and inference processes copy the frame they pick out of its slot
+(one memcpy, no serialisation).
+
+Layout of the shared block:
+    int64   next sequence number (frames written so far)
+    int64   sequence number stored in each slot (-1 while being written)
+    float64 capture timestamp of each slot (time.monotonic(), shared clock)
+    uint8   frame data, one slot after another
+
+Each slot is guarded by its sequence number (seqlock style): a reader
+checks the slot holds the sequence it asked for before and after copying
+it, and retries with the newest frame if the decoder overwrote the slot
+meanwhile. The decoder never waits for inference (it would fall behind a
+live stream), so for file sources it laps the ring while a frame is being
+processed: readers must not keep zero-copy views (read(copy=False)) across
+inference. One writer per ring; any number of readers.
+
+Usage:
+    ring, decoder, stop_event = start_decoder("video.mp4")
+    seq = -1
+    while True:
+        seq, frame, timestamp, dropped = ring.wait_next(seq)
+        ...  # frame is the reader's own copy, consistent for as long as needed
+"""
+import multiprocessing as mp
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from utils.metrics import inc, set_gauge
+
+# Configuration
+DEFAULT_SLOTS = 8
+POLL_INTERVAL = 0.002  # Seconds between polls while waiting for a frame
+_ALIGN = 64
+
+
+class FrameRingBuffer:
+    """
+    Ring of preallocated frame slots in shared memory.
+
+    Args:
+        shape: Frame shape, e.g. (1080, 1920, 3)
+        slots: Number of frame slots
+        dtype: Frame dtype (default uint8)
+        name: Shared memory block name (attach to an existing block if create=False)
+        create: Create a new block (True) or attach to an existing one (False)
+    """
+
+    def __init__(self, shape, slots=DEFAULT_SLOTS, dtype=np.uint8, name=None, create=True):
+        self.shape = tuple(shape)
+        self.slots = int(slots)
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+
+        header_bytes = 8 + 8 * self.slots + 8 * self.slots
+        self._data_offset = (header_bytes + _ALIGN - 1) // _ALIGN * _ALIGN
+        size = self._data_offset + self.frame_bytes * self.slots
+
+        # Readers should be started from the creating process (multiprocessing)
+        # so they share its resource tracker and do not unlink the block on exit
+        self.shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        self.name = self.shm.name
+        self._owner = create
+
+        buf = self.shm.buf
+        self._next_seq = np.ndarray((1,), dtype=np.int64, buffer=buf, offset=0)
+        self._slot_seq = np.ndarray((self.slots,), dtype=np.int64, buffer=buf, offset=8)
+        self._slot_ts = np.ndarray((self.slots,), dtype=np.float64, buffer=buf,
+                                   offset=8 + 8 * self.slots)
+        self._frames = np.ndarray((self.slots,) + self.shape, dtype=self.dtype, buffer=buf,
+                                  offset=self._data_offset)
+        if create:
+            self._next_seq[0] = 0
+            self._slot_seq[:] = -1
+            self._slot_ts[:] = 0.0
+
+    @classmethod
+    def attach(cls, name, shape, slots=DEFAULT_SLOTS, dtype=np.uint8):
+        """Attach to a ring buffer created by another process."""
+        return cls(shape, slots=slots, dtype=dtype, name=name, create=False)
+
+    def spec(self):
+        """Arguments needed by another process to attach(): (name, shape, slots, dtype)."""
+        return self.name, self.shape, self.slots, self.dtype.str
+
+    # ------------------------------------------------------------------
+    # Writer side
+    # ------------------------------------------------------------------
+    def _begin_write(self):
+        seq = int(self._next_seq[0])
+        slot = seq % self.slots
+        previous = int(self._slot_seq[slot])
+        self._slot_seq[slot] = -1  # Mark slot as being written
+        return seq, slot, previous
+
+    def _abort(self, slot, previous):
+        # Nothing was written: the slot still holds its previous frame
+        self._slot_seq[slot] = previous
+
+    def _commit(self, seq, slot, timestamp):
+        self._slot_ts[slot] = time.monotonic() if timestamp is None else timestamp
+        self._slot_seq[slot] = seq
+        self._next_seq[0] = seq + 1
+        return seq
+
+    def write(self, frame, timestamp=None):
+        """
+        Copy a frame into the next slot.
+
+        Args:
+            frame: Array with the ring's shape and dtype
+            timestamp: Capture time (default: time.monotonic())
+
+        Returns:
+            int: Sequence number of the written frame
+        """
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match ring shape {self.shape}")
+        seq, slot, _ = self._begin_write()
+        np.copyto(self._frames[slot], frame)
+        return self._commit(seq, slot, timestamp)
+
+    def write_from_capture(self, cap):
+        """
+        Decode the next frame of a cv2.VideoCapture directly into a slot.
+
+        Args:
+            cap: Opened cv2.VideoCapture
+
+        Returns:
+            int: Sequence number, or None if no frame could be read
+        """
+        seq, slot, previous = self._begin_write()
+        target = self._frames[slot]
+        ret, frame = cap.read(target)
+        if not ret or frame is None:
+            self._abort(slot, previous)
+            return None
+        timestamp = time.monotonic()
+        if frame.shape != self.shape:
+            # OpenCV decoded into its own buffer, the slot is untouched
+            self._abort(slot, previous)
+            raise ValueError(f"Frame shape {frame.shape} does not match ring shape {self.shape}")
+        if not np.shares_memory(frame, target):
+            # OpenCV allocated its own buffer (e.g. dtype mismatch); fall back to a copy
+            np.copyto(target, frame)
+        return self._commit(seq, slot, timestamp)
+
+    # ------------------------------------------------------------------
+    # Reader side
+    # ------------------------------------------------------------------
+    def latest_seq(self):
+        """Sequence number of the newest complete frame (-1 if none yet)."""
+        return int(self._next_seq[0]) - 1
+
+    def read(self, seq, copy=True, out=None):
+        """
+        The frame with the given sequence number.
+
+        Args:
+            seq: Sequence number
+            copy: Copy the frame out of its slot (default). With False a
+                read-only zero-copy view is returned; the decoder may
+                overwrite it at any time, so check is_valid(seq) after
+                every use and discard results computed from it otherwise
+            out: Optional preallocated array for the copy
+
+        Returns:
+            (frame, timestamp), or (None, None) if the slot no longer holds
+            that frame (also when it was overwritten during the copy)
+        """
+        slot = seq % self.slots
+        if seq < 0 or int(self._slot_seq[slot]) != seq:
+            return None, None
+        timestamp = float(self._slot_ts[slot])
+        if not copy:
+            view = self._frames[slot].view()
+            view.flags.writeable = False
+            return view, timestamp
+        if out is None:
+            out = np.empty(self.shape, dtype=self.dtype)
+        np.copyto(out, self._frames[slot])
+        if int(self._slot_seq[slot]) != seq:
+            return None, None  # Torn copy: the decoder reused the slot meanwhile
+        return out, timestamp
+
+    def is_valid(self, seq):
+        """True if the slot still holds frame `seq` (i.e. it was not overwritten)."""
+        return seq >= 0 and int(self._slot_seq[seq % self.slots]) == seq
+
+    def wait_next(self, last_seq, timeout=None, camera_id=None, copy=True):
+        """
+        Wait for the newest frame after last_seq (frames in between are skipped).
+
+        Args:
+            last_seq: Sequence number of the previously processed frame (-1 initially)
+            timeout: Maximum seconds to wait (None waits forever)
+            camera_id: Optional camera identifier; if given, the queue depth and
+                dropped frames are recorded in utils.metrics
+            copy: Return a copy of the frame (see read())
+
+        Returns:
+            (seq, frame, timestamp, dropped) where dropped is the number of
+            frames skipped since last_seq, or (None, None, None, 0) on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            seq = self.latest_seq()
+            if seq > last_seq:
+                frame, timestamp = self.read(seq, copy=copy)
+                if frame is not None:
+                    dropped = max(0, seq - last_seq - 1) if last_seq >= 0 else 0
+                    if camera_id is not None:
+                        set_gauge("frame_queue_depth", dropped + 1, camera=camera_id)
+                        if dropped:
+                            inc("frames_dropped_total", dropped, camera=camera_id)
+                    return seq, frame, timestamp, dropped
+            if deadline is not None and time.monotonic() >= deadline:
+                return None, None, None, 0
+            time.sleep(POLL_INTERVAL)
+
+    # ------------------------------------------------------------------
+    # Cleanup
+    # ------------------------------------------------------------------
+    def close(self):
+        """Release this process's mapping (views become invalid)."""
+        self._next_seq = self._slot_seq = self._slot_ts = self._frames = None
+        self.shm.close()
+
+    def unlink(self):
+        """Destroy the shared block (creator only, after all processes closed it)."""
+        if self._owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        self.unlink()
+
+
+def run_decoder(video_source, spec, stop_event=None, loop=False):
+    """
+    Decoder process entry point: read frames from a source into a ring buffer.
+
+    Args:
+        video_source: Video file path, stream URL or camera index
+        spec: FrameRingBuffer.spec() of the target ring
+        stop_event: Optional multiprocessing.Event to stop decoding
+        loop: Restart video files from the beginning when they end
+    """
+    name, shape, slots, dtype = spec
+    ring = FrameRingBuffer.attach(name, shape, slots=slots, dtype=dtype)
+    cap = cv2.VideoCapture(video_source)
+    try:
+        while stop_event is None or not stop_event.is_set():
+            if ring.write_from_capture(cap) is None:
+                if loop:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                break
+    finally:
+        cap.release()
+        ring.close()
+
+
+def start_decoder(video_source, slots=DEFAULT_SLOTS, loop=False):
+    """
+    Create a ring buffer sized for a video source and start a decoder process.
+
+    Args:
+        video_source: Video file path, stream URL or camera index
+        slots: Number of frame slots
+        loop: Restart video files from the beginning when they end
+
+    Returns:
+        (ring, process, stop_event) tuple
+    """
+    cap = cv2.VideoCapture(video_source)
+    if not cap.isOpened():
+        raise RuntimeError(f"ERROR: Cannot open video source {video_source}")
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    cap.release()
+
+    ring = FrameRingBuffer((height, width, 3), slots=slots)
+    stop_event = mp.Event()
+    process = mp.Process(
+        target=run_decoder,
+        args=(video_source, ring.spec(), stop_event, loop),
+        daemon=True
+    )
+    process.start()
+    return ring, process, stop_event
@@ -0,0 +1,135 @@
+"""
+Frame Latency Tracing
+
+Every frame is stamped when it is read from the capture (time.monotonic()
+plus the stream position in ms) and the stamp travels with its
+FrameContext through all stages. When the frame leaves the pipeline, its
+capture-to-output ("glass-to-glass") latency and the per-stage timings are
+added to a rolling window per camera:
+- latency_report() summarises the window (p50/p95/max per stage and end to
+  end, plus how long frames waited before processing started), served at
+  /api/latency
+- frame_latency_seconds{camera} is also exported at /metrics
+
+Alerts store the capture time of their frame (Alert.captured_at), so the
+lag between what happened and the alert is visible in the database.
+
+Usage:
+    ret, frame, captured_at, pts = read_stamped(cap)
+    output, scene, alerts = process_frame(frame, models, captured_at=captured_at, pts=pts)
+    save_alert(..., captured_at=wall_clock(captured_at))
+"""
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+from utils.metrics import observe
+
+# Configuration
+LATENCY_WINDOW = int(os.getenv("LATENCY_WINDOW", "300"))  # Frames per camera in the rolling report
+
+_windows = {}  # camera_id -> deque of (latency, queue, timings)
+_lock = threading.Lock()
+
+
+def read_stamped(cap):
+    """
+    Read a frame and stamp it at capture.
+
+    Args:
+        cap: Opened cv2.VideoCapture
+
+    Returns:
+        (ret, frame, captured_at, pts): captured_at is time.monotonic() right
+        after the read; pts is the stream position in ms (None if the
+        source does not report one, e.g. most webcams)
+    """
+    ret, frame = cap.read()
+    captured_at = time.monotonic()
+    pts = cap.get(cv2.CAP_PROP_POS_MSEC) if ret else None
+    return ret, frame, captured_at, (pts if pts and pts > 0 else None)
+
+
+def wall_clock(captured_at):
+    """
+    Convert a time.monotonic() stamp to a UTC datetime (like Alert.created_at).
+
+    Args:
+        captured_at: time.monotonic() value, or None
+
+    Returns:
+        datetime (naive UTC), or None
+    """
+    if captured_at is None:
+        return None
+    return datetime.utcfromtimestamp(time.time() - (time.monotonic() - captured_at))
+
+
+def record_frame(ctx, started_at=None):
+    """
+    Add a finished frame to its camera's rolling window.
+
+    Args:
+        ctx: FrameContext of the frame (captured_at, timings)
+        started_at: time.monotonic() when processing started (default: no queue time)
+
+    Returns:
+        float: Capture-to-output latency in seconds
+    """
+    latency = time.monotonic() - ctx.captured_at
+    queue = max(0.0, started_at - ctx.captured_at) if started_at is not None else 0.0
+    observe("frame_latency_seconds", latency, camera=ctx.camera_id)
+    with _lock:
+        window = _windows.get(ctx.camera_id)
+        if window is None:
+            window = _windows[ctx.camera_id] = deque(maxlen=LATENCY_WINDOW)
+        window.append((latency, queue, dict(ctx.timings)))
+    return latency
+
+
+def _stats(values):
+    ms = np.asarray(values, dtype=np.float64) * 1000.0
+    return {
+        "p50": round(float(np.percentile(ms, 50)), 2),
+        "p95": round(float(np.percentile(ms, 95)), 2),
+        "max": round(float(ms.max()), 2)
+    }
+
+
+def latency_report(camera_id=None):
+    """
+    Rolling latency summary per camera.
+
+    Args:
+        camera_id: Optional camera filter
+
+    Returns:
+        dict: {camera: {"frames", "glass_to_glass_ms", "queue_ms", "stages",
+        "slowest_stage"}}; stage times in ms over the last LATENCY_WINDOW frames
+    """
+    with _lock:
+        windows = {cam: list(w) for cam, w in _windows.items()
+                   if camera_id is None or cam == camera_id}
+
+    report = {}
+    for cam, entries in windows.items():
+        if not entries:
+            continue
+        stage_values = {}
+        for _, _, timings in entries:
+            for stage, seconds in timings.items():
+                stage_values.setdefault(stage, []).append(seconds)
+        stages = {stage: _stats(values) for stage, values in stage_values.items()}
+        report[cam] = {
+            "frames": len(entries),
+            "glass_to_glass_ms": _stats([e[0] for e in entries]),
+            "queue_ms": _stats([e[1] for e in entries]),
+            "stages": stages,
+            "slowest_stage": max(stages, key=lambda s: stages[s]["p95"]) if stages else None
+        }
+    return report
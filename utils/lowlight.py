@@ -3,23 +3,145 @@ Low-light Detection Utility
 
 Determines if a frame is in low-light conditions based on average brightness.
 Used to conditionally enable Zero-DCE enhancement.
+
+is_low_light() is a stateless per-frame check. LightingEstimator (one per
+camera, see get_lighting_estimator) is what the pipeline uses: it measures
+brightness on a strided subset of pixels, smooths it with an exponential
+moving average and switches between "day" and "night" with hysteresis, so
+enhancement does not flicker on and off around dusk.
 """
 import cv2
 import numpy as np
 
+# Configuration
+LOWLIGHT_ENTER_THRESH = 55.0   # Switch to night mode below this smoothed brightness
+LOWLIGHT_EXIT_THRESH = 70.0    # Switch back to day mode above this smoothed brightness
+LOWLIGHT_EMA_ALPHA = 0.1       # Weight of the newest frame in the moving average
+LOWLIGHT_SAMPLE_STRIDE = 16    # Sample every Nth pixel in each direction
+
+# BT.601 luma weights in BGR order (same as cv2.COLOR_BGR2GRAY)
+_LUMA_WEIGHTS_BGR = np.array([0.114, 0.587, 0.299])
+
 
 def is_low_light(frame, brightness_thresh=60):
     """
     Returns True if frame is low-light.
     
     Args:
-        frame: BGR frame (OpenCV format)
+        frame: BGR frame (OpenCV format) or FrameContext (reuses its grey view)
         brightness_thresh: Brightness threshold (default 60)
     
     Returns:
         True if frame is low-light, False otherwise
     """
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    if hasattr(frame, "gray"):
+        gray = frame.gray
+    else:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     mean_brightness = np.mean(gray)
 
-    return mean_brightness < brightness_thresh
\ No newline at end of file
+    return mean_brightness < brightness_thresh
+
+
+def sample_brightness(frame, stride=LOWLIGHT_SAMPLE_STRIDE):
+    """
+    Mean luma of a strided subset of pixels (1/stride^2 of the frame).
+
+    Args:
+        frame: BGR frame
+        stride: Sampling step in both directions
+
+    Returns:
+        float: Approximate mean brightness (0-255)
+    """
+    sample = frame[::stride, ::stride]
+    if sample.ndim == 2:
+        return float(sample.mean())
+    # Mean of the weighted sum == weighted sum of the channel means
+    return float(np.dot(sample.mean(axis=(0, 1)), _LUMA_WEIGHTS_BGR))
+
+
+class LightingEstimator:
+    """
+    Per-camera lighting state with EMA smoothing and hysteresis.
+
+    Args:
+        camera_id: Camera identifier (used in log messages)
+        enter_thresh: Smoothed brightness below which night mode starts
+        exit_thresh: Smoothed brightness above which day mode resumes
+        alpha: EMA weight of the newest measurement
+        stride: Pixel sampling stride
+    """
+
+    def __init__(self, camera_id="CAM_01", enter_thresh=LOWLIGHT_ENTER_THRESH,
+                 exit_thresh=LOWLIGHT_EXIT_THRESH, alpha=LOWLIGHT_EMA_ALPHA,
+                 stride=LOWLIGHT_SAMPLE_STRIDE):
+        self.camera_id = camera_id
+        self.enter_thresh = enter_thresh
+        self.exit_thresh = exit_thresh
+        self.alpha = alpha
+        self.stride = stride
+        self.brightness = None
+        self.mode = "day"
+
+    @property
+    def low_light(self):
+        """True while in night mode."""
+        return self.mode == "night"
+
+    def update(self, frame):
+        """
+        Measure a new frame and update the lighting mode.
+
+        Args:
+            frame: BGR frame or FrameContext
+
+        Returns:
+            True if the camera is (now) in low-light mode
+        """
+        if hasattr(frame, "bgr"):
+            frame = frame.bgr
+        measured = sample_brightness(frame, self.stride)
+
+        if self.brightness is None:
+            # First frame: start in the matching mode without smoothing
+            self.brightness = measured
+            self.mode = "night" if measured < self.enter_thresh else "day"
+            return self.low_light
+
+        self.brightness += self.alpha * (measured - self.brightness)
+
+        if self.mode == "day" and self.brightness < self.enter_thresh:
+            self.mode = "night"
+            print(f"[{self.camera_id}] Lighting: switched to night mode "
+                  f"(brightness {self.brightness:.1f}) - low-light enhancement on")
+        elif self.mode == "night" and self.brightness > self.exit_thresh:
+            self.mode = "day"
+            print(f"[{self.camera_id}] Lighting: switched to day mode "
+                  f"(brightness {self.brightness:.1f}) - low-light enhancement off")
+        return self.low_light
+
+    def state(self):
+        """Current lighting state for reporting."""
+        return {
+            "mode": self.mode,
+            "brightness": None if self.brightness is None else round(self.brightness, 1)
+        }
+
+
+# Global estimators, one per camera
+_estimators = {}
+
+
+def get_lighting_estimator(camera_id):
+    """Get (or create) the lighting estimator of a camera."""
+    estimator = _estimators.get(camera_id)
+    if estimator is None:
+        estimator = LightingEstimator(camera_id)
+        _estimators[camera_id] = estimator
+    return estimator
+
+
+def lighting_states():
+    """Lighting state of every camera seen so far: {camera_id: state}."""
+    return {camera_id: est.state() for camera_id, est in _estimators.items()}
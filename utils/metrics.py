@@ -0,0 +1,249 @@
+"""
+Pipeline Metrics
+
+Lightweight in-process metrics for the hot path, exposed in the Prometheus
+text format at /metrics (app/app.py):
+- histograms: per-camera stage latencies, FAISS search and DB write times
+- counters: e.g. dropped frames
+- gauges: e.g. frame queue depth
+
+Recording a span is two perf_counter() calls, a bisect over 12 bucket
+bounds and a few additions under a lock (a few microseconds), so a dozen
+spans per frame cost well under 1% of a 30 ms frame. Set
+METRICS_ENABLED=0 to turn recording into a no-op.
+
+Usage:
+    with stage_timer("CAM_01", "yolo"):
+        results = yolo(frame)
+    observe("faiss_search_seconds", elapsed)
+    inc("frames_dropped_total", dropped, camera="CAM_01")
+"""
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Configuration
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Help text of the known metrics (others are exported without HELP)
+METRIC_HELP = {
+    "pipeline_stage_seconds": "Time spent in each pipeline stage per frame",
+    "faiss_search_seconds": "FAISS face embedding search time",
+    "db_write_seconds": "Database write (commit) time",
+    "frames_processed_total": "Frames processed by the pipeline",
+    "frames_dropped_total": "Frames skipped because the consumer fell behind",
+    "frame_queue_depth": "Frames waiting when the consumer asked for the next one",
+    "frame_latency_seconds": "Time from frame capture to pipeline output",
+    "load_shed_level": "Current load shedding level (0 = nothing shed)"
+}
+
+_lock = threading.Lock()
+_histograms = {}  # (name, labels) -> [bucket counts..., +Inf count, sum]
+_counters = {}    # (name, labels) -> value
+_gauges = {}      # (name, labels) -> value
+_samples = None   # (name, labels) -> [values] while sampling (benchmarks)
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def observe(name, value, **labels):
+    """
+    Record a value (seconds for latencies) in a histogram.
+
+    Args:
+        name: Metric name
+        value: Observed value
+        **labels: Label values, e.g. camera="CAM_01"
+    """
+    if not METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    index = bisect_left(LATENCY_BUCKETS, value)
+    with _lock:
+        hist = _histograms.get(key)
+        if hist is None:
+            hist = _histograms[key] = [0] * (len(LATENCY_BUCKETS) + 1) + [0.0]
+        hist[index] += 1
+        hist[-1] += value
+        if _samples is not None:
+            _samples.setdefault(key, []).append(value)
+
+
+def inc(name, value=1, **labels):
+    """Increase a counter."""
+    if not METRICS_ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def set_gauge(name, value, **labels):
+    """Set a gauge to its current value."""
+    if not METRICS_ENABLED:
+        return
+    with _lock:
+        _gauges[_key(name, labels)] = value
+
+
+class _StageTimer:
+    """Context manager timing one pipeline stage (see stage_timer)."""
+
+    __slots__ = ("camera_id", "stage", "timings", "start")
+
+    def __init__(self, camera_id, stage, timings=None):
+        self.camera_id = camera_id
+        self.stage = stage
+        self.timings = timings
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        observe("pipeline_stage_seconds", elapsed, camera=self.camera_id, stage=self.stage)
+        if self.timings is not None:
+            self.timings[self.stage] = self.timings.get(self.stage, 0.0) + elapsed
+        return False
+
+
+class _NoopTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_TIMER = _NoopTimer()
+
+
+def stage_timer(camera_id, stage, timings=None):
+    """
+    Time a pipeline stage into pipeline_stage_seconds{camera, stage}.
+
+    Args:
+        camera_id: Camera identifier
+        stage: Stage name (e.g. "yolo", "faces")
+        timings: Optional per-frame dict (FrameContext.timings) the elapsed
+            seconds are also added to
+
+    Returns:
+        Context manager
+    """
+    if not METRICS_ENABLED:
+        return _NOOP_TIMER
+    return _StageTimer(camera_id, stage, timings)
+
+
+def start_sampling():
+    """Also keep every observed value (for exact percentiles in benchmarks)."""
+    global _samples
+    with _lock:
+        _samples = {}
+
+
+def stop_sampling():
+    """
+    Stop keeping observed values.
+
+    Returns:
+        dict: {(name, labels): [values]} observed since start_sampling()
+    """
+    global _samples
+    with _lock:
+        samples, _samples = _samples or {}, None
+    return samples
+
+
+def reset():
+    """Clear all recorded metrics."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+        _gauges.clear()
+
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = [(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in items]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def _header(lines, name, metric_type, seen):
+    if name in seen:
+        return
+    seen.add(name)
+    if name in METRIC_HELP:
+        lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+    lines.append(f"# TYPE {name} {metric_type}")
+
+
+def render_prometheus():
+    """
+    All metrics in the Prometheus text exposition format.
+
+    Returns:
+        str: Metrics text (content type text/plain; version=0.0.4)
+    """
+    with _lock:
+        histograms = {k: list(v) for k, v in _histograms.items()}
+        counters = dict(_counters)
+        gauges = dict(_gauges)
+
+    lines = []
+    seen = set()
+    for (name, labels), hist in sorted(histograms.items()):
+        _header(lines, name, "histogram", seen)
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, hist):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, ('le', repr(bound)))} {cumulative}")
+        cumulative += hist[len(LATENCY_BUCKETS)]
+        lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {cumulative}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {hist[-1]:.6f}")
+        lines.append(f"{name}_count{_format_labels(labels)} {cumulative}")
+    for (name, labels), value in sorted(counters.items()):
+        _header(lines, name, "counter", seen)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    for (name, labels), value in sorted(gauges.items()):
+        _header(lines, name, "gauge", seen)
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def stage_summary(camera_id=None):
+    """
+    Mean latency and count per stage, for JSON views.
+
+    Args:
+        camera_id: Optional camera filter
+
+    Returns:
+        dict: {camera: {stage: {"count": n, "mean_ms": m}}}
+    """
+    with _lock:
+        items = [(k, list(v)) for k, v in _histograms.items() if k[0] == "pipeline_stage_seconds"]
+
+    summary = {}
+    for (_, labels), hist in items:
+        labels = dict(labels)
+        camera = labels.get("camera")
+        if camera_id is not None and camera != camera_id:
+            continue
+        count = sum(hist[:-1])
+        summary.setdefault(camera, {})[labels.get("stage")] = {
+            "count": count,
+            "mean_ms": round(hist[-1] / count * 1000.0, 3) if count else 0.0
+        }
+    return summary
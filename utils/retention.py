@@ -0,0 +1,545 @@
+"""
+Data Retention Module
+
+Keeps the database bounded on a 24/7 deployment. Rows past a table's
+limits are archived to compressed daily files and then deleted:
+
+- Limits per table (RETENTION): maximum age in days and maximum row count,
+  plus an overall database size limit (RETENTION_MAX_DB_MB, SQLite)
+- Archive: one NDJSON.gz file per table and day,
+  ARCHIVE_DIR/<table>/<YYYY-MM-DD>.ndjson.gz; each run appends a gzip
+  member, so files are never rewritten. query_archive() reads them back
+  (served at /api/archive).
+- Rows are moved oldest first in batches of RETENTION_BATCH: a batch is
+  read, written to the archive (flushed and fsynced) outside any database
+  transaction, and then deleted in its own short transaction, with a pause
+  between batches so alert writes are not held up
+- Freed SQLite pages are returned to the file system with
+  PRAGMA incremental_vacuum in chunks. That needs auto_vacuum=INCREMENTAL,
+  which an existing database only gets through one full VACUUM; it blocks
+  all writes, so it never runs in the background thread. Run it offline
+  (python -m utils.retention --enable-incremental-vacuum) or set
+  RETENTION_VACUUM_AT_STARTUP=1 to run it in start_retention(), before the
+  pipeline writes.
+
+Alert rollups and totals (app/pipelines/alert_stats.py) are not touched when
+alerts are archived, so dashboard statistics still count archived alerts; the
+hourly rollups have their own (longer) age limit, the totals have none.
+
+Re-archiving is idempotent: the keys of an archived batch are kept in a
+pending file (ARCHIVE_DIR/<table>/.pending.json) until its delete commits.
+If the delete fails or the process dies, the next run deletes those rows
+without archiving them again. query_archive() still drops duplicates by
+primary key, for a crash between the archive write and the pending file.
+
+Usage:
+    start_retention()          # Background thread (app/app.py)
+    run_retention()            # One pass, returns rows archived per table
+    python -m utils.retention  # One pass from the command line
+    python -m utils.retention --enable-incremental-vacuum  # Offline, once
+"""
+import argparse
+import gzip
+import json
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import DateTime, delete, func, select, tuple_
+
+from utils.db import Alert, AlertRollup, engine
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process lock
+    fcntl = None
+
+# Configuration
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))  # Seconds between runs; 0 disables the thread
+RETENTION_BATCH = 1000          # Rows archived and deleted per transaction
+RETENTION_PAUSE = 0.05          # Seconds between batches (lets alert writes in)
+RETENTION_MAX_DB_MB = float(os.getenv("RETENTION_MAX_DB_MB", "0"))  # Used database size limit (SQLite); 0 = off
+VACUUM_PAGES = 2000             # Pages released per incremental_vacuum step
+RETENTION_VACUUM_AT_STARTUP = os.getenv("RETENTION_VACUUM_AT_STARTUP", "0") == "1"  # Full VACUUM in start_retention() if needed
+
+# Limits per table: model, timestamp column, max age in days (0 = none),
+# max rows (0 = none). Size-limit passes archive from the first table.
+RETENTION = {
+    "alerts": {
+        "model": Alert,
+        "time_column": "created_at",
+        "max_age_days": float(os.getenv("ALERT_RETENTION_DAYS", "90")),
+        "max_rows": int(os.getenv("ALERT_RETENTION_ROWS", "0"))
+    },
+    "alert_rollups": {
+        "model": AlertRollup,
+        "time_column": "bucket",
+        "max_age_days": float(os.getenv("ROLLUP_RETENTION_DAYS", "730")),
+        "max_rows": 0
+    }
+}
+
+_thread = None
+_stop = threading.Event()
+_run_lock = threading.Lock()
+_last_run = {}
+_vacuum_hint_shown = False
+
+
+def _serialize(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+def _partition_path(table, day):
+    return os.path.join(ARCHIVE_DIR, table, f"{day.isoformat()}.ndjson.gz")
+
+
+def _archive_rows(table, rows, time_column):
+    """Append rows (dicts) to their daily archive files; returns once on disk."""
+    by_day = {}
+    for row in rows:
+        stamp = row[time_column]
+        day = stamp.date() if stamp is not None else date(1970, 1, 1)
+        by_day.setdefault(day, []).append(row)
+    os.makedirs(os.path.join(ARCHIVE_DIR, table), exist_ok=True)
+    for day, day_rows in by_day.items():
+        with open(_partition_path(table, day), "ab") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="ab") as gz:
+                for row in day_rows:
+                    line = json.dumps({k: _serialize(v) for k, v in row.items()}, default=str)
+                    gz.write(line.encode("utf-8") + b"\n")
+            raw.flush()
+            os.fsync(raw.fileno())
+
+
+def _pending_path(table):
+    return os.path.join(ARCHIVE_DIR, table, ".pending.json")
+
+
+def _write_pending(table, key_columns, keys):
+    """Record the keys of an archived, not yet deleted batch (atomic, fsynced)."""
+    path = _pending_path(table)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"columns": [c.name for c in key_columns],
+                   "keys": [[_serialize(v) for v in key] for key in keys]}, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _read_pending(table, key_columns):
+    """Keys of a batch archived by an earlier run but not deleted, or []."""
+    try:
+        with open(_pending_path(table)) as f:
+            pending = json.load(f)
+    except FileNotFoundError:
+        return []
+    if pending.get("columns") != [c.name for c in key_columns]:
+        print(f"Warning: Retention: ignoring pending keys of {table} (key columns changed)")
+        return []
+    return [tuple(datetime.fromisoformat(v) if isinstance(c.type, DateTime) and v is not None else v
+                  for c, v in zip(key_columns, key))
+            for key in pending["keys"]]
+
+
+def _clear_pending(table):
+    try:
+        os.remove(_pending_path(table))
+    except FileNotFoundError:
+        pass
+
+
+def _delete_keys(model, key_columns, keys):
+    """Delete rows by primary key in one short transaction."""
+    with engine.begin() as conn:
+        if len(key_columns) == 1:
+            conn.execute(delete(model).where(key_columns[0].in_([key[0] for key in keys])))
+        else:
+            conn.execute(delete(model).where(tuple_(*key_columns).in_(keys)))
+
+
+def _finish_pending(table):
+    """
+    Delete the rows of a batch that an earlier run archived but did not
+    delete (failed delete or crash), without archiving them again.
+
+    Returns:
+        int: Pending keys handled
+    """
+    model = RETENTION[table]["model"]
+    key_columns = list(model.__table__.primary_key.columns)
+    keys = _read_pending(table, key_columns)
+    if keys:
+        _delete_keys(model, key_columns, keys)
+    _clear_pending(table)
+    return len(keys)
+
+
+def _archive_batch(table, condition, limit=RETENTION_BATCH):
+    """
+    Archive and delete the oldest rows of a table matching a condition.
+
+    The rows are read, archived and recorded as pending outside any
+    transaction; only the DELETE runs in a (short) transaction.
+
+    Args:
+        table: Key of RETENTION
+        condition: SQLAlchemy condition selecting expired rows (or None)
+        limit: Maximum rows
+
+    Returns:
+        int: Rows archived
+    """
+    config = RETENTION[table]
+    model = config["model"]
+    time_column = config["time_column"]
+    columns = model.__table__.columns
+    key_columns = list(model.__table__.primary_key.columns)
+
+    query = select(*columns)
+    if condition is not None:
+        query = query.where(condition)
+    query = query.order_by(getattr(model, time_column), *key_columns).limit(limit)
+
+    with engine.connect() as conn:
+        rows = [dict(row._mapping) for row in conn.execute(query)]
+    if not rows:
+        return 0
+    keys = [tuple(row[c.name] for c in key_columns) for row in rows]
+
+    _archive_rows(table, rows, time_column)
+    _write_pending(table, key_columns, keys)
+    _delete_keys(model, key_columns, keys)
+    _clear_pending(table)
+    return len(rows)
+
+
+def _archive_while(table, condition, max_rows=None):
+    """Archive batches until no row matches (or max_rows were moved)."""
+    total = 0
+    while not _stop.is_set():
+        limit = RETENTION_BATCH if max_rows is None else min(RETENTION_BATCH, max_rows - total)
+        if limit <= 0:
+            break
+        moved = _archive_batch(table, condition, limit)
+        total += moved
+        if moved < limit:
+            break
+        time.sleep(RETENTION_PAUSE)
+    return total
+
+
+def _count(model):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(model)).scalar() or 0
+
+
+def _is_sqlite():
+    return engine.dialect.name == "sqlite"
+
+
+def database_usage():
+    """
+    Size of the SQLite database in bytes.
+
+    Returns:
+        (file_bytes, used_bytes): used excludes free pages; (None, None)
+        for other databases
+    """
+    if not _is_sqlite():
+        return None, None
+    with engine.connect() as conn:
+        page_size = conn.exec_driver_sql("PRAGMA page_size").scalar()
+        pages = conn.exec_driver_sql("PRAGMA page_count").scalar()
+        free = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+    return pages * page_size, (pages - free) * page_size
+
+
+def _incremental_vacuum_enabled(conn):
+    return conn.exec_driver_sql("PRAGMA auto_vacuum").scalar() == 2
+
+
+def enable_incremental_vacuum():
+    """
+    Switch SQLite to auto_vacuum=INCREMENTAL (one full VACUUM, logged).
+
+    The VACUUM rewrites the whole database and blocks every write while it
+    runs: call it offline or at startup, before the pipeline writes.
+
+    Returns:
+        bool: True if the database was converted (False: nothing to do)
+    """
+    if not _is_sqlite():
+        return False
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if _incremental_vacuum_enabled(conn):
+            return False
+        print("Retention: enabling incremental vacuum (one-time full VACUUM)...")
+        start = time.time()
+        conn.exec_driver_sql("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.exec_driver_sql("VACUUM")
+        print(f"Retention: VACUUM done ({time.time() - start:.1f}s)")
+        return True
+
+
+def incremental_vacuum():
+    """
+    Release free SQLite pages to the file system in VACUUM_PAGES steps.
+
+    Does nothing (and says so once) until enable_incremental_vacuum() has
+    converted the database; freed pages are then reused by new rows.
+
+    Returns:
+        int: Pages released
+    """
+    global _vacuum_hint_shown
+    if not _is_sqlite():
+        return 0
+    released = 0
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not _incremental_vacuum_enabled(conn):
+            if not _vacuum_hint_shown:
+                print("Retention: incremental vacuum is off; freed pages stay in the file. "
+                      "Run 'python -m utils.retention --enable-incremental-vacuum' offline once "
+                      "(or set RETENTION_VACUUM_AT_STARTUP=1)")
+                _vacuum_hint_shown = True
+            return 0
+        free = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+        while free and not _stop.is_set():
+            conn.exec_driver_sql(f"PRAGMA incremental_vacuum({VACUUM_PAGES})")
+            remaining = conn.exec_driver_sql("PRAGMA freelist_count").scalar()
+            if remaining >= free:
+                break
+            released += free - remaining
+            free = remaining
+            time.sleep(RETENTION_PAUSE)
+    return released
+
+
+class _ProcessLock:
+    """Non-blocking lock file so one process (gunicorn worker) runs retention at a time."""
+
+    def __init__(self):
+        self._file = None
+
+    def acquire(self):
+        if fcntl is None:
+            return True
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        self._file = open(os.path.join(ARCHIVE_DIR, ".retention.lock"), "w")
+        try:
+            fcntl.flock(self._file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            return True
+        except OSError:
+            self._file.close()
+            self._file = None
+            return False
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+def run_retention(now=None):
+    """
+    Apply the age, row and size limits once.
+
+    Args:
+        now: Reference time (default: datetime.utcnow())
+
+    Returns:
+        dict: table -> rows archived (empty if another process is running retention)
+    """
+    now = now or datetime.utcnow()
+    process_lock = _ProcessLock()
+    with _run_lock:
+        if not process_lock.acquire():
+            return {}
+        try:
+            start = time.time()
+            archived = {}
+            for table, config in RETENTION.items():
+                model = config["model"]
+                recovered = _finish_pending(table)
+                if recovered:
+                    print(f"Retention: deleted {recovered} already archived {table} rows of an earlier run")
+                moved = 0
+                if config["max_age_days"] > 0:
+                    cutoff = now - timedelta(days=config["max_age_days"])
+                    moved += _archive_while(table, getattr(model, config["time_column"]) < cutoff)
+                if config["max_rows"] > 0:
+                    excess = _count(model) - config["max_rows"]
+                    if excess > 0:
+                        moved += _archive_while(table, None, max_rows=excess)
+                archived[table] = moved
+
+            if RETENTION_MAX_DB_MB > 0 and _is_sqlite():
+                # Oldest rows of the first table until enough pages are free
+                table = next(iter(RETENTION))
+                limit = RETENTION_MAX_DB_MB * 1024 * 1024
+                while not _stop.is_set() and database_usage()[1] > limit:
+                    moved = _archive_batch(table, None)
+                    archived[table] += moved
+                    if moved == 0:
+                        break
+                    time.sleep(RETENTION_PAUSE)
+
+            released = incremental_vacuum() if any(archived.values()) else 0
+            _last_run.update({
+                "at": now.isoformat(),
+                "seconds": round(time.time() - start, 2),
+                "archived": archived,
+                "pages_released": released
+            })
+            if any(archived.values()):
+                print(f"Retention: archived {archived} to {ARCHIVE_DIR}/, released {released} pages")
+            return archived
+        finally:
+            process_lock.release()
+
+
+def _loop(interval):
+    while not _stop.wait(interval):
+        try:
+            run_retention()
+        except Exception as e:
+            print(f"Warning: Retention run failed: {e}")
+
+
+def start_retention(interval=RETENTION_INTERVAL):
+    """
+    Run retention in a daemon thread: once shortly after start, then every
+    `interval` seconds. Does nothing if interval is 0 or it already runs.
+
+    With RETENTION_VACUUM_AT_STARTUP, a database without incremental vacuum
+    is converted first, synchronously (call this before the pipeline writes).
+    """
+    global _thread
+    if interval <= 0 or (_thread is not None and _thread.is_alive()):
+        return
+    _stop.clear()
+    if RETENTION_VACUUM_AT_STARTUP:
+        process_lock = _ProcessLock()
+        if process_lock.acquire():  # One worker converts; the others skip
+            try:
+                enable_incremental_vacuum()
+            except Exception as e:
+                print(f"Warning: Retention: could not enable incremental vacuum: {e}")
+            finally:
+                process_lock.release()
+
+    def run():
+        if not _stop.wait(5.0):  # Let startup finish first
+            try:
+                run_retention()
+            except Exception as e:
+                print(f"Warning: Retention run failed: {e}")
+        _loop(interval)
+
+    _thread = threading.Thread(target=run, name="retention", daemon=True)
+    _thread.start()
+
+
+def stop_retention():
+    """Stop the background thread (after its current batch)."""
+    _stop.set()
+
+
+def list_partitions(table="alerts"):
+    """
+    Archived partitions of a table.
+
+    Returns:
+        List of {"day", "bytes"}, oldest first
+    """
+    directory = os.path.join(ARCHIVE_DIR, table)
+    if not os.path.isdir(directory):
+        return []
+    partitions = []
+    for name in sorted(os.listdir(directory)):
+        if name.endswith(".ndjson.gz"):
+            partitions.append({
+                "day": name[:-len(".ndjson.gz")],
+                "bytes": os.path.getsize(os.path.join(directory, name))
+            })
+    return partitions
+
+
+def retention_status():
+    """Limits, database size, archive partitions and the last run."""
+    file_bytes, used_bytes = database_usage()
+    return {
+        "limits": {table: {"max_age_days": c["max_age_days"], "max_rows": c["max_rows"]}
+                   for table, c in RETENTION.items()},
+        "max_db_mb": RETENTION_MAX_DB_MB,
+        "db_bytes": file_bytes,
+        "db_used_bytes": used_bytes,
+        "partitions": {table: len(list_partitions(table)) for table in RETENTION},
+        "last_run": dict(_last_run)
+    }
+
+
+def query_archive(table="alerts", start=None, end=None, limit=100, **filters):
+    """
+    Read archived rows, newest first.
+
+    Args:
+        table: Archived table (key of RETENTION)
+        start: Optional datetime; rows at or after it
+        end: Optional datetime; rows before it
+        limit: Maximum rows
+        **filters: Column equality filters (e.g. camera_id="CAM_01"); None is ignored
+
+    Returns:
+        List of dicts (timestamps as ISO strings)
+    """
+    config = RETENTION[table]
+    time_column = config["time_column"]
+    key_names = [c.name for c in config["model"].__table__.primary_key.columns]
+    filters = {k: v for k, v in filters.items() if v is not None}
+    start_iso = start.isoformat() if start else None
+    end_iso = end.isoformat() if end else None
+
+    results = []
+    for partition in reversed(list_partitions(table)):
+        day = partition["day"]
+        if start and day < start.date().isoformat():
+            break
+        if end and day > end.date().isoformat():
+            continue
+        rows = {}
+        with gzip.open(_partition_path(table, date.fromisoformat(day)), "rt", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                stamp = row.get(time_column)
+                if start_iso and (stamp is None or stamp < start_iso):
+                    continue
+                if end_iso and (stamp is None or stamp >= end_iso):
+                    continue
+                if any(row.get(k) != v for k, v in filters.items()):
+                    continue
+                rows[tuple(row.get(k) for k in key_names)] = row  # Re-archived batches appear twice
+        results.extend(sorted(rows.values(), key=lambda r: (r.get(time_column) or "", *(r.get(k) for k in key_names)),
+                              reverse=True))
+        if len(results) >= limit:
+            break
+    return results[:limit]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive and delete expired rows once")
+    parser.add_argument("--enable-incremental-vacuum", action="store_true",
+                        help="Convert the SQLite database to auto_vacuum=INCREMENTAL first "
+                             "(one full VACUUM; stop the pipeline while it runs)")
+    args = parser.parse_args()
+    if args.enable_incremental_vacuum:
+        enable_incremental_vacuum()
+    print(run_retention())
+    print(json.dumps(retention_status(), indent=2))